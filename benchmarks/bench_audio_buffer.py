@@ -0,0 +1,136 @@
+"""Micro-benchmark for the per-speaker audio buffers used by WhisperSink.callback.
+
+Feeds synthetic 20 ms frames for many speakers (interleaved like the voice-recv
+thread sees them) and flushes each speaker at the end of every utterance, the way
+the silence watcher does. Reports callback latency percentiles and peak RSS for the
+old bytes concatenation and the SpeakerBuffer implementation, and for the latter the
+storage its speakers retain for their next utterance at the end of the run.
+
+Usage:
+    python benchmarks/bench_audio_buffer.py [--minutes 10] [--speakers 20]
+"""
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from components.audio_buffer import SpeakerBuffer, FRAME_BYTES, retained_bytes
+
+FRAMES_PER_SECOND = 50
+
+
+def build_schedule(speakers, minutes, seed):
+    """Per speaker list of (speech_frames, pause_frames) covering the whole session"""
+    rng = random.Random(seed)
+    total = minutes * 60 * FRAMES_PER_SECOND
+    schedule = []
+    for _ in range(speakers):
+        bursts = []
+        frames = 0
+        while frames < total:
+            speech = rng.randint(1 * FRAMES_PER_SECOND, 15 * FRAMES_PER_SECOND)
+            pause = rng.randint(FRAMES_PER_SECOND // 2, 5 * FRAMES_PER_SECOND)
+            bursts.append((speech, pause))
+            frames += speech + pause
+        schedule.append(bursts)
+    return schedule, total
+
+
+class BytesBuffers:
+    def __init__(self):
+        self.buffers = {}
+
+    def append(self, key, pcm):
+        if key not in self.buffers:
+            self.buffers[key] = b""
+        self.buffers[key] += pcm
+
+    def flush(self, key):
+        data = self.buffers[key]
+        self.buffers[key] = b""
+        return len(data)
+
+
+class RingBuffers:
+    def __init__(self):
+        self.buffers = {}
+
+    def append(self, key, pcm):
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            buffer = self.buffers[key] = SpeakerBuffer()
+        buffer.append(pcm)
+
+    def flush(self, key):
+        buffer = self.buffers[key]
+        view = buffer.take()
+        size = len(view)
+        buffer.release(view)
+        return size
+
+
+def run(impl, speakers, minutes, seed):
+    schedule, total = build_schedule(speakers, minutes, seed)
+    buffers = BytesBuffers() if impl == "bytes" else RingBuffers()
+    frame = os.urandom(FRAME_BYTES)
+
+    # state per speaker: index of current burst and frame offset inside it
+    burst_index = [0] * speakers
+    burst_offset = [0] * speakers
+    latencies = []
+    flushed = 0
+
+    for _ in range(total):
+        for speaker in range(speakers):
+            speech, pause = schedule[speaker][burst_index[speaker]]
+            offset = burst_offset[speaker]
+            key = (speaker, 1)
+            if offset < speech:
+                start = time.perf_counter_ns()
+                buffers.append(key, frame)
+                latencies.append(time.perf_counter_ns() - start)
+            elif offset == speech:
+                flushed += buffers.flush(key)
+            offset += 1
+            if offset >= speech + pause:
+                burst_index[speaker] += 1
+                offset = 0
+            burst_offset[speaker] = offset
+
+    latencies.sort()
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] / 1000
+
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    retained = f" retained={retained_bytes() / 2**20:.1f}MB" if impl == "buffer" else ""
+    print(f"{impl:>6}: frames={len(latencies)} flushed={flushed / 2**20:.0f}MB "
+          f"p50={pct(0.50):.1f}us p99={pct(0.99):.1f}us max={latencies[-1] / 1000:.1f}us "
+          f"peak_rss={peak_rss_mb:.1f}MB{retained}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=int, default=10)
+    parser.add_argument("--speakers", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--impl", choices=["bytes", "buffer"], help="run a single implementation in this process")
+    args = parser.parse_args()
+
+    if args.impl:
+        run(args.impl, args.speakers, args.minutes, args.seed)
+        return
+
+    # Each implementation runs in its own process so peak RSS is not shared
+    for impl in ("bytes", "buffer"):
+        subprocess.run([sys.executable, __file__, "--impl", impl,
+                        "--minutes", str(args.minutes), "--speakers", str(args.speakers),
+                        "--seed", str(args.seed)], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Event-loop lag while transcribing, thread backend vs process backend.
+
+Runs an asyncio loop that wakes up every --tick-ms and records how late it woke
+up, while a burst of synthetic utterances (48 kHz stereo PCM like WhisperSink
+buffers) is transcribed either by threads in this process (preprocess_pcm plus the
+model, like process_buffer does) or by components.process_backend.ProcessPool.
+
+By default the model is a stub that burns --rtf CPU seconds per audio second in
+pure Python, i.e. while holding the GIL, which is roughly how NumPy/SciPy
+preprocessing and the Python side of decoding behave. Pass --model small (needs
+faster-whisper) to use a real model instead.
+
+Usage:
+    python benchmarks/bench_backends.py [--utterances 40] [--workers 2] [--rtf 0.2] [--model stub]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from components.audio_preprocessing import preprocess_pcm
+from components.process_backend import ProcessPool, load_whisper_model
+
+OPTIONS = {"language": "pl", "beam_size": 1, "without_timestamps": True, "condition_on_previous_text": False}
+
+
+class _Info:
+    language = "pl"
+    language_probability = 1.0
+
+
+class StubModel:
+    """Spends rtf seconds of GIL-holding CPU time per second of audio"""
+
+    def __init__(self, rtf):
+        self.rtf = rtf
+
+    def transcribe(self, audio, **options):
+        deadline = time.thread_time() + len(audio) / 16000 * self.rtf
+        x = 0
+        while time.thread_time() < deadline:
+            x += 1
+        return [], _Info()
+
+
+def load_stub_model(spec):
+    return StubModel(float(spec[0].split(":")[1]))
+
+
+def make_utterances(count, seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    utterances = []
+    for _ in range(count):
+        t = np.arange(int(48000 * seconds)) / 48000
+        tone = 0.2 * np.sin(2 * np.pi * rng.uniform(150, 300) * t) + 0.02 * rng.standard_normal(len(t))
+        stereo = np.repeat((tone * 32767).astype(np.int16)[:, None], 2, axis=1)
+        utterances.append(stereo.tobytes())
+    return utterances
+
+
+async def measure(work, tick):
+    """Run work() in the background, return the loop wake-up lags (seconds) and the work's duration"""
+    lags = []
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    future = loop.run_in_executor(None, work)
+    while not future.done():
+        before = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append(time.perf_counter() - before - tick)
+    await future
+    return np.array(lags), time.perf_counter() - start
+
+
+def run_threads(model, utterances, workers):
+    def transcribe(pcm):
+        audio = preprocess_pcm(pcm)
+        segments, _ = model.transcribe(audio, **OPTIONS)
+        return "".join(segment.text for segment in segments)
+
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(transcribe, utterances))
+
+
+def run_processes(pool, spec, utterances, workers):
+    with ThreadPoolExecutor(workers) as threads:
+        list(threads.map(lambda pcm: pool.transcribe(spec, pcm, OPTIONS), utterances))
+
+
+def report(name, lags, elapsed, audio_seconds):
+    lags_ms = lags * 1000
+    print(f"{name:>8}: loop lag p50={np.percentile(lags_ms, 50):.1f}ms p99={np.percentile(lags_ms, 99):.1f}ms "
+          f"max={lags_ms.max():.1f}ms, {audio_seconds / elapsed:.1f} audio-s/s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--utterances", type=int, default=40)
+    parser.add_argument("--seconds", type=float, default=4.0, help="length of each utterance")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--rtf", type=float, default=0.2, help="stub model CPU seconds per audio second")
+    parser.add_argument("--model", default="stub", help="stub, or a faster-whisper model size")
+    parser.add_argument("--tick-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    utterances = make_utterances(args.utterances, args.seconds)
+    audio_seconds = args.utterances * args.seconds
+    tick = args.tick_ms / 1000
+    if args.model == "stub":
+        spec = (f"stub:{args.rtf}", "cpu", "int8")
+        loader = "bench_backends:load_stub_model"
+        model = load_stub_model(spec)
+    else:
+        spec = (args.model, "cpu", "int8")
+        loader = "components.process_backend:load_whisper_model"
+        model = load_whisper_model(spec)
+
+    idle_lags, _ = await measure(lambda: time.sleep(1.0), tick)
+    report("idle", idle_lags, 1.0, 0)
+
+    lags, elapsed = await measure(lambda: run_threads(model, utterances, args.workers), tick)
+    report("thread", lags, elapsed, audio_seconds)
+
+    pool = ProcessPool(args.workers, loader=loader)
+    await asyncio.get_running_loop().run_in_executor(None, pool.load, spec)
+    try:
+        lags, elapsed = await measure(lambda: run_processes(pool, spec, utterances, args.workers), tick)
+        report("process", lags, elapsed, audio_seconds)
+    finally:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
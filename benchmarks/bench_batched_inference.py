@@ -0,0 +1,98 @@
+"""Throughput benchmark: one whisper call per utterance vs. one batched call.
+
+Cuts a 16 kHz mono WAV (or synthetic noise if none is given) into utterances and
+transcribes them once sequentially with WhisperModel.transcribe and once through
+BatchedInferencePipeline with the same decoding options, the way
+voice_transcriber.process_batch does it. Reports utterances/sec and real-time factor
+(processing seconds per audio second, lower is better).
+
+Usage:
+    python benchmarks/bench_batched_inference.py --audio speech.wav [--model small]
+        [--utterances 8] [--seconds 6] [--beam-size 5]
+"""
+import argparse
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from faster_whisper import WhisperModel, BatchedInferencePipeline
+from components.batched_transcription import transcribe_batch, SAMPLE_RATE
+
+
+def load_wav(path):
+    """Load a 16-bit WAV as 16 kHz mono float32 (naive decimation for other rates)"""
+    with wave.open(path, "rb") as f:
+        channels = f.getnchannels()
+        rate = f.getframerate()
+        audio = np.frombuffer(f.readframes(f.getnframes()), np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        audio = audio[::max(1, rate // SAMPLE_RATE)]
+    return audio
+
+
+def make_utterances(audio, count, seconds):
+    length = int(seconds * SAMPLE_RATE)
+    if audio is None:
+        rng = np.random.default_rng(0)
+        return [(rng.standard_normal(length) * 0.1).astype(np.float32) for _ in range(count)]
+    utterances = []
+    for i in range(count):
+        start = (i * length) % max(1, len(audio) - length)
+        utterances.append(np.ascontiguousarray(audio[start:start + length]))
+    return utterances
+
+
+def report(name, elapsed, utterances):
+    audio_seconds = sum(len(u) for u in utterances) / SAMPLE_RATE
+    print(f"{name:>10}: {len(utterances) / elapsed:.2f} utt/s, RTF {elapsed / audio_seconds:.3f} "
+          f"({elapsed:.1f}s for {audio_seconds:.0f}s of audio)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", help="16-bit WAV file with speech")
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--utterances", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=6.0)
+    parser.add_argument("--beam-size", type=int, default=5)
+    parser.add_argument("--language", default="pl")
+    args = parser.parse_args()
+
+    audio = load_wav(args.audio) if args.audio else None
+    utterances = make_utterances(audio, args.utterances, args.seconds)
+    options = {
+        "language": args.language,
+        "beam_size": args.beam_size,
+        "best_of": args.beam_size,
+        "temperature": 0.0,
+        "without_timestamps": True,
+    }
+
+    model = WhisperModel(args.model, device=args.device, compute_type=args.compute_type)
+    batched = BatchedInferencePipeline(model=model)
+
+    # warm up both paths so one-off initialization is not measured
+    list(model.transcribe(utterances[0], **options)[0])
+    transcribe_batch(batched, utterances[:1], **options)
+
+    start = time.perf_counter()
+    for utterance in utterances:
+        "".join(s.text for s in model.transcribe(utterance, **options)[0])
+    report("sequential", time.perf_counter() - start, utterances)
+
+    start = time.perf_counter()
+    transcribe_batch(batched, utterances, batch_size=len(utterances), **options)
+    report("batched", time.perf_counter() - start, utterances)
+
+
+if __name__ == "__main__":
+    main()
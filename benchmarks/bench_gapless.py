@@ -0,0 +1,155 @@
+"""Measure the silence between two queued songs, before and after prefetching.
+
+before: the old track change. The first song's source runs out, play_next() sleeps
+        0.1 s, then a new FFmpegPCMAudio is started for the next song and the
+        player waits for its first frame.
+after:  a TrackChain whose next song is opened and decoded ahead (ReadAheadSource)
+        --prefetch seconds before the first one ends, spliced or crossfaded in
+        the same read().
+
+Both read frames in real time like discord's player thread. The gap is the time
+from the last frame of the first song to the first frame of the second, minus the
+20 ms a frame lasts; for the chain, underrun (silent) frames count as gap.
+
+The test stream is two generated WAV files (tones of --seconds each) unless
+--input names two files or stream URLs ffmpeg can open (--duration is then the
+first one's length in seconds, the chain needs it to know when to prefetch).
+
+Usage:
+    python benchmarks/bench_gapless.py [--seconds 15] [--prefetch 10] [--crossfade 0] [--rounds 3]
+    python benchmarks/bench_gapless.py --input first.mp3 second.mp3 --duration 214
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import imageio_ffmpeg
+from discord import FFmpegPCMAudio
+
+from components.audio_mixer import SILENCE
+from components.read_ahead import ReadAheadSource
+from components.track_chain import TrackChain
+
+FRAME_SECONDS = 0.02
+FFMPEG_OPTIONS = {
+    "before_options": "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5",
+    "options": "-vn",
+}
+
+
+def write_tone(path, frequency, seconds):
+    t = np.arange(int(48000 * seconds)) / 48000
+    mono = (0.3 * np.sin(2 * np.pi * frequency * t) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(48000)
+        f.writeframes(np.repeat(mono[:, None], 2, axis=1).tobytes())
+
+
+def open_source(url):
+    return FFmpegPCMAudio(url, executable=imageio_ffmpeg.get_ffmpeg_exe(), **FFMPEG_OPTIONS)
+
+
+class Pacer:
+    """Sleeps until the next 20 ms frame is due"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.frames = 0
+
+    def wait(self):
+        self.frames += 1
+        delay = self.start + self.frames * FRAME_SECONDS - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def gap_respawn(first, second):
+    source = open_source(first)
+    pacer = Pacer()
+    while source.read():
+        pacer.wait()
+    ended = time.perf_counter()
+    source.cleanup()
+    time.sleep(0.1)  # play_next()
+    source = open_source(second)
+    source.read()
+    gap = time.perf_counter() - ended - FRAME_SECONDS
+    source.cleanup()
+    return max(0.0, gap)
+
+
+def gap_chain(first, second, duration, prefetch, crossfade):
+    switched = []
+    chain = None
+
+    def near_end():
+        # The bot does this on the event loop; a thread keeps the player thread free here too
+        def open_next():
+            track = ReadAheadSource(open_source(second))
+            track.start()
+            chain.set_next(track)
+        threading.Thread(target=open_next).start()
+
+    chain = TrackChain(ReadAheadSource(open_source(first)), duration, prefetch_seconds=prefetch,
+                       crossfade_seconds=crossfade, on_near_end=near_end, on_switch=lambda track: switched.append(True))
+    pacer = Pacer()
+    # Let the first song start before timing anything
+    while chain.read() == SILENCE:
+        pacer.wait()
+    silent_after_switch = 0
+    while True:
+        data = chain.read()
+        if not data:
+            break
+        if switched:
+            if data != SILENCE:
+                break
+            silent_after_switch += 1
+        pacer.wait()
+    chain.cleanup()
+    return silent_after_switch * FRAME_SECONDS, bool(switched)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", nargs=2, metavar=("FIRST", "SECOND"))
+    parser.add_argument("--duration", type=float, help="length of the first --input song in seconds")
+    parser.add_argument("--seconds", type=float, default=15.0, help="length of each generated song")
+    parser.add_argument("--prefetch", type=float, default=10.0)
+    parser.add_argument("--crossfade", type=float, default=0.0)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.input:
+            first, second = args.input
+            duration = args.duration
+        else:
+            first, second = os.path.join(tmp, "first.wav"), os.path.join(tmp, "second.wav")
+            write_tone(first, 440, args.seconds)
+            write_tone(second, 660, args.seconds)
+            duration = args.seconds
+
+        before = [gap_respawn(first, second) for _ in range(args.rounds)]
+        print(f"before (respawn)  gap p50 {statistics.median(before) * 1000:7.1f} ms  max {max(before) * 1000:7.1f} ms")
+        after = [gap_chain(first, second, duration, args.prefetch, args.crossfade) for _ in range(args.rounds)]
+        gaps = [gap for gap, _ in after]
+        print(f"after (prefetch)  gap p50 {statistics.median(gaps) * 1000:7.1f} ms  max {max(gaps) * 1000:7.1f} ms"
+              + ("" if all(switched for _, switched in after) else "  (next song was not prefetched in time)"))
+        if duration is None:
+            print("without --duration the next song is only opened when the first one ends")
+
+
+if __name__ == "__main__":
+    main()
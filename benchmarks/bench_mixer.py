@@ -0,0 +1,108 @@
+"""Measure what AudioMixer costs per 20 ms frame.
+
+Mixes synthetic 48 kHz stereo inputs the way a guild plays them: background music,
+a YouTube song and one or two TTS voices, with background and music ducked under
+speech (audio_manager.DUCK_UNDER). The inputs are pre-rendered PCM so only the
+mixing is timed, not decoding. Every scenario reads --seconds of frames; with
+--toggle the voices start and stop every --toggle-ms so ducking ramps are part of
+the measurement.
+
+Reports per-frame time (mean, p50, p99, max) and the share of the 20 ms frame
+budget of discord's player thread it uses.
+
+Usage:
+    python benchmarks/bench_mixer.py [--seconds 60] [--toggle-ms 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from components.audio_buffer import FRAME_BYTES
+from components.audio_mixer import AudioMixer
+
+FRAME_SECONDS = 0.02
+DUCK_UNDER = {"background": ("voice", "youtube"), "youtube": ("voice",)}
+
+
+class PCMLoop:
+    """Endless source looping a pre-rendered buffer of 20 ms frames"""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.position = 0
+
+    def read(self):
+        frame = self.frames[self.position]
+        self.position = (self.position + 1) % len(self.frames)
+        return frame
+
+    def cleanup(self):
+        pass
+
+
+def render(frequency, amplitude, seconds=2.0, seed=0):
+    """Tone plus noise as 48 kHz stereo int16 frames"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(48000 * seconds)) / 48000
+    mono = amplitude * (np.sin(2 * np.pi * frequency * t) + 0.1 * rng.standard_normal(len(t)))
+    data = np.repeat(np.clip(mono * 32767, -32768, 32767).astype(np.int16)[:, None], 2, axis=1).tobytes()
+    return [data[i:i + FRAME_BYTES] for i in range(0, len(data), FRAME_BYTES)]
+
+
+SCENARIOS = {
+    "1 input (background)": ["background"],
+    "2 inputs (background, youtube)": ["background", "youtube"],
+    "3 inputs (+ voice)": ["background", "youtube", "voice"],
+    "4 inputs (+ second voice)": ["background", "youtube", "voice", "voice"],
+}
+
+
+def run(kinds, frames, toggle_frames):
+    mixer = AudioMixer()
+    sources = {"background": render(220, 0.2, seed=1), "youtube": render(440, 0.5, seed=2), "voice": render(180, 0.6, seed=3)}
+    for kind in kinds:
+        if kind != "voice" or not toggle_frames:
+            mixer.add(PCMLoop(sources[kind]), kind, duck_under=DUCK_UNDER.get(kind, ()))
+    voices = kinds.count("voice") if toggle_frames else 0
+
+    times = np.empty(frames)
+    for i in range(frames):
+        if voices and i % toggle_frames == 0:
+            if (i // toggle_frames) % 2 == 0:
+                for _ in range(voices):
+                    mixer.add(PCMLoop(sources["voice"]), "voice")
+            else:
+                mixer.remove("voice")
+        start = time.perf_counter()
+        data = mixer.read()
+        times[i] = time.perf_counter() - start
+        assert len(data) == FRAME_BYTES
+    mixer.cleanup()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--toggle-ms", type=int, default=500, help="voices start/stop this often, 0 keeps them on")
+    args = parser.parse_args()
+
+    frames = int(args.seconds / FRAME_SECONDS)
+    toggle_frames = max(1, int(args.toggle_ms / 1000 / FRAME_SECONDS)) if args.toggle_ms else 0
+    print(f"{frames} frames per scenario, voices toggled every {args.toggle_ms} ms" if toggle_frames
+          else f"{frames} frames per scenario, voices always on")
+    for name, kinds in SCENARIOS.items():
+        run(kinds, 50, toggle_frames)  # warm up
+        times = run(kinds, frames, toggle_frames) * 1e6
+        print(f"{name:32s} mean {times.mean():7.1f}us  p50 {np.percentile(times, 50):7.1f}us  "
+              f"p99 {np.percentile(times, 99):7.1f}us  max {times.max():7.1f}us  "
+              f"({times.mean() / (FRAME_SECONDS * 1e6):.2%} of the frame budget)")
+
+
+if __name__ == "__main__":
+    main()
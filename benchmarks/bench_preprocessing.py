@@ -0,0 +1,103 @@
+"""Benchmark of the audio preprocessing done before whisper.
+
+Compares the previous process_buffer chain (FFT resample, filters designed on every
+call, two filtfilt passes) with components.audio_preprocessing.preprocess_pcm on
+synthetic speech-like PCM. Checks that both outputs agree within a tolerance and
+reports time and peak allocation per second of speech.
+
+Usage:
+    python benchmarks/bench_preprocessing.py [--seconds 5 10 30] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from scipy.signal import resample, butter, filtfilt, wiener
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from components.audio_preprocessing import preprocess_pcm, INPUT_RATE
+
+TOLERANCE = 0.05  # max allowed RMS difference relative to the legacy output
+
+
+def legacy_preprocess(raw):
+    """The chain process_buffer used before audio_preprocessing existed"""
+    audio_data = np.frombuffer(raw, np.int16)
+    if audio_data.ndim == 1 and len(audio_data) % 2 == 0:
+        audio_data = audio_data.reshape(-1, 2)
+        audio_data = audio_data.mean(axis=1)
+    audio_data = audio_data.astype(np.float32) / 32768.0
+    rms = np.sqrt(np.mean(audio_data ** 2))
+    if rms < 0.003:
+        return None
+    audio_data = np.clip(audio_data * 15.0, -1.0, 1.0)
+    audio_data = resample(audio_data, int(len(audio_data) * 16000 / 48000))
+    max_val = np.max(np.abs(audio_data))
+    if max_val > 0:
+        audio_data = audio_data / max_val * 0.95
+    b, a = butter(4, 100, btype='high', fs=16000)
+    audio_data = filtfilt(b, a, audio_data)
+    b, a = butter(4, 7000, btype='low', fs=16000)
+    audio_data = filtfilt(b, a, audio_data)
+    audio_data = wiener(audio_data, noise=0.01)
+    return audio_data.astype(np.float32)
+
+
+def synthetic_speech(seconds, seed=0):
+    """Amplitude-modulated harmonics plus noise, as 48 kHz stereo int16 bytes"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * INPUT_RATE)) / INPUT_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / INPUT_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 3 * t)) ** 2
+    mono = 0.02 * voice * envelope + 0.002 * rng.standard_normal(len(t))
+    stereo = np.repeat((mono * 32767).astype(np.int16)[:, None], 2, axis=1)
+    return stereo.tobytes()
+
+
+def measure(function, pcm, repeat):
+    function(pcm)  # warm up caches
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(pcm)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    function(pcm)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, nargs="+", default=[5, 10, 30])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for seconds in args.seconds:
+        pcm = synthetic_speech(seconds)
+        expected = legacy_preprocess(pcm)
+        actual = preprocess_pcm(pcm)
+        # ignore the edges, where FFT and polyphase resampling legitimately differ
+        edge = len(expected) // 50
+        diff = np.sqrt(np.mean((expected[edge:-edge] - actual[edge:-edge]) ** 2))
+        scale = np.sqrt(np.mean(expected[edge:-edge] ** 2))
+        relative = diff / scale
+        status = "ok" if relative <= TOLERANCE else "MISMATCH"
+
+        legacy_time, legacy_peak = measure(legacy_preprocess, pcm, args.repeat)
+        new_time, new_peak = measure(preprocess_pcm, pcm, args.repeat)
+        print(f"{seconds:>5.0f}s audio: legacy {legacy_time / seconds * 1000:.2f} ms/s, "
+              f"{legacy_peak / seconds / 2**20:.2f} MiB/s | new {new_time / seconds * 1000:.2f} ms/s, "
+              f"{new_peak / seconds / 2**20:.2f} MiB/s | speedup {legacy_time / new_time:.1f}x | "
+              f"relative diff {relative:.4f} ({status})")
+
+
+if __name__ == "__main__":
+    main()
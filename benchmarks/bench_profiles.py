@@ -0,0 +1,93 @@
+"""Accuracy/speed benchmark for the transcription quality profiles.
+
+Transcribes a fixed local audio fixture with every profile from
+components/transcription_profiles.py and reports the real-time factor (processing
+seconds per audio second, lower is better) and a word error rate. With --reference
+the WER is computed against that text, otherwise against the archival profile's
+output as a proxy.
+
+Usage:
+    python benchmarks/bench_profiles.py --audio fixture.wav [--reference fixture.txt]
+        [--profiles realtime balanced archival] [--device cpu]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from faster_whisper import WhisperModel
+import components.transcription_profiles as profiles
+from bench_batched_inference import load_wav, SAMPLE_RATE
+
+
+def words(text):
+    return re.findall(r"\w+", text.lower())
+
+
+def word_error_rate(reference, hypothesis):
+    """Levenshtein distance over words divided by the reference length"""
+    ref, hyp = words(reference), words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", required=True, help="16-bit WAV fixture with speech")
+    parser.add_argument("--reference", help="text file with the expected transcript")
+    parser.add_argument("--profiles", nargs="+", default=list(profiles.TRANSCRIPTION_PROFILES))
+    parser.add_argument("--device", choices=["cpu", "cuda"], help="override device detection")
+    parser.add_argument("--language", default="pl")
+    args = parser.parse_args()
+
+    if args.device:
+        profiles._detected_device = args.device
+    audio = load_wav(args.audio)
+    audio_seconds = len(audio) / SAMPLE_RATE
+    reference = open(args.reference, encoding="utf-8").read() if args.reference else None
+
+    # archival goes first when it serves as the WER reference
+    names = sorted(args.profiles, key=lambda name: name != "archival") if reference is None else args.profiles
+    results = {}
+    for name in names:
+        profile = profiles.get_profile(name)
+        start = time.perf_counter()
+        model = WhisperModel(profile["model_size"], device=profile["device"], compute_type=profile["compute_type"])
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        segments, _ = model.transcribe(
+            audio,
+            language=args.language,
+            temperature=0.0,
+            without_timestamps=True,
+            condition_on_previous_text=False,
+            vad_filter=profile["vad_filter"],
+            vad_parameters=profile["vad_parameters"],
+            **profile["options"],
+        )
+        text = "".join(s.text for s in segments).strip()
+        elapsed = time.perf_counter() - start
+        results[name] = text
+        del model
+
+        if reference is None and "archival" not in results:
+            wer = "n/a"
+        else:
+            wer = f"{word_error_rate(reference if reference is not None else results['archival'], text):.3f}"
+        print(f"{name:>9} ({profile['model_size']}, {profile['device']} {profile['compute_type']}): "
+              f"RTF {elapsed / audio_seconds:.3f}, WER{'' if reference else ' proxy'} {wer}, load {load_seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Measure what a long music queue holds, before and after lazy queue entries.
+
+before: every enqueued song was a YTDLSource, an FFmpegPCMAudio (one ffmpeg
+        process with its pipe) plus yt-dlp's full info dict, from the moment it
+        was added until it played.
+after:  a QueueEntry (__slots__ title, uploader, duration, webpage_url); the stream
+        is only extracted and opened right before the song plays.
+
+For --songs queued songs it reports the Python heap the queue keeps alive
+(tracemalloc; the info dicts are made inside the measurement, as extraction does),
+the ffmpeg processes alive and their resident memory (from /proc), and how many of the stream URLs would have expired before their song is reached
+(YouTube stream URLs last about --url-lifetime seconds, songs are --song-seconds
+long on average).
+
+The info dicts are synthetic, sized like yt-dlp's (--formats formats each) unless
+--youtube names a video whose real info dict is used for every song. The ffmpeg
+input is a generated WAV file unless --input names a file or stream URL.
+
+Usage:
+    python benchmarks/bench_queue.py [--songs 50] [--formats 40]
+    python benchmarks/bench_queue.py --songs 50 --youtube https://www.youtube.com/watch?v=...
+"""
+import argparse
+import copy
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import imageio_ffmpeg
+from discord import FFmpegPCMAudio, PCMVolumeTransformer
+
+from components.read_ahead import ReadAheadSource
+from components.youtube_player import QueueEntry
+
+FFMPEG_OPTIONS = {
+    "before_options": "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5",
+    "options": "-vn",
+}
+
+
+def write_silence(path, seconds=5):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(48000)
+        f.writeframes(bytes(48000 * 4 * seconds))
+
+
+def synthetic_info(index, formats):
+    """An info dict shaped like yt-dlp's for a YouTube video"""
+    video_id = f"{index:011d}"
+    url = (f"https://rr1---sn-example.googlevideo.com/videoplayback?expire={int(time.time()) + 21600}"
+           f"&ei=abcdefghijklmnop&ip=203.0.113.7&id=o-{video_id}&itag=251&source=youtube&mime=audio%2Fwebm&dur=213.4")
+    return {
+        "id": video_id,
+        "title": f"Song number {index} (Official Audio)",
+        "uploader": "Some Artist - Topic",
+        "duration": 213,
+        "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+        "url": url,
+        "description": "Provided to YouTube by Some Label\n\n" + "lyrics and credits " * 60,
+        "tags": [f"tag{i}" for i in range(20)],
+        "thumbnails": [{"url": f"https://i.ytimg.com/vi/{video_id}/{i}.jpg", "height": 90 * i, "width": 120 * i, "id": str(i)}
+                       for i in range(40)],
+        "formats": [{"format_id": str(200 + i), "url": url + f"&fmt={i}", "ext": "webm", "acodec": "opus", "vcodec": "none",
+                     "abr": 128.0, "asr": 48000, "filesize": 3400000 + i, "protocol": "https", "format_note": "medium",
+                     "http_headers": {"User-Agent": "Mozilla/5.0", "Accept": "*/*", "Accept-Language": "en-us,en;q=0.5"},
+                     "downloader_options": {"http_chunk_size": 10485760}} for i in range(formats)],
+    }
+
+
+def youtube_info(page_url):
+    import yt_dlp
+    with yt_dlp.YoutubeDL({"format": "bestaudio/best", "quiet": True, "no_warnings": True}) as ytdl:
+        return ytdl.sanitize_info(ytdl.extract_info(page_url, download=False))
+
+
+def ffmpeg_rss(sources):
+    """ffmpeg processes still running and their summed resident memory in bytes"""
+    alive, rss = 0, 0
+    for source in sources:
+        process = getattr(source.original.source, "_process", None)
+        if process is None or process.poll() is not None:
+            continue
+        alive += 1
+        try:
+            with open(f"/proc/{process.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        rss += int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    return alive, rss
+
+
+def queue_live(songs, make_info, url):
+    tracemalloc.start()
+    queue = []
+    for i in range(songs):
+        source = PCMVolumeTransformer(ReadAheadSource(FFmpegPCMAudio(url, executable=imageio_ffmpeg.get_ffmpeg_exe(),
+                                                                     **FFMPEG_OPTIONS)), 0.5)
+        source.data = make_info(i)
+        queue.append(source)
+    time.sleep(0.5)  # let the processes start
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    alive, rss = ffmpeg_rss(queue)
+    for source in queue:
+        source.cleanup()
+    return heap, alive, rss
+
+
+def queue_lazy(songs, make_info):
+    tracemalloc.start()
+    # The info dict is dropped once the entry is made
+    queue = [QueueEntry.from_info(make_info(i)) for i in range(songs)]
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del queue
+    return heap
+
+
+def expired_before_played(songs, song_seconds, lifetime):
+    """Songs whose URL, extracted when enqueued, has expired once playback reaches them"""
+    return sum(1 for position in range(songs) if position * song_seconds >= lifetime)
+
+
+def report(name, heap, alive, rss, expired):
+    print(f"{name:7s} heap {heap / 1024:9.1f} KiB  ffmpeg processes {alive:4d}  ffmpeg RSS {rss / 2 ** 20:8.1f} MiB  "
+          f"expired stream URLs {expired}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--songs", type=int, default=50)
+    parser.add_argument("--formats", type=int, default=40, help="formats per synthetic info dict")
+    parser.add_argument("--youtube", help="video URL whose real info dict is used for every song")
+    parser.add_argument("--input", help="file or stream URL ffmpeg opens for every song")
+    parser.add_argument("--song-seconds", type=float, default=213.0)
+    parser.add_argument("--url-lifetime", type=float, default=21600.0)
+    args = parser.parse_args()
+
+    if args.youtube:
+        info = youtube_info(args.youtube)
+        make_info = lambda i: copy.deepcopy(info)
+    else:
+        make_info = lambda i: synthetic_info(i, args.formats)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.input
+        if url is None:
+            url = os.path.join(tmp, "song.wav")
+            write_silence(url)
+        print(f"{args.songs} queued songs")
+        heap, alive, rss = queue_live(args.songs, make_info, url)
+        report("before", heap, alive, rss, expired_before_played(args.songs, args.song_seconds, args.url_lifetime))
+        # Entries carry no stream URL, each one is extracted right before it plays
+        report("after", queue_lazy(args.songs, make_info), 0, 0, 0)
+
+
+if __name__ == "__main__":
+    main()
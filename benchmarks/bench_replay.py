@@ -0,0 +1,268 @@
+"""Offline replay of a multi-speaker voice session through the transcription pipeline.
+
+Feeds 20 ms frames of 48 kHz stereo PCM into WhisperSink.callback the way the
+voice-recv thread does (one thread, all speakers interleaved, nothing sent while a
+speaker is silent), so the whole pipeline runs: voice activity gate, speaker
+buffers, utterance segmenter, scheduler, preprocessing, whisper, the transcript
+writer and the SQLite store. Needs no Discord connection and no network; the
+transcripts are written to a temporary directory.
+
+Speakers come from one WAV file each (--audio a.wav b.wav, any rate, 16-bit) or are
+synthetic (--speakers N): bursts of harmonic "speech" separated by pauses. --speed
+replays faster than real time; the silence timeout is scaled along so utterances are
+cut the same way.
+
+By default the model is a stub that spends --rtf seconds of GIL-holding CPU time per
+second of audio. --model real loads the guild profile's faster-whisper model, which
+must already be in the local cache (HF_HUB_OFFLINE is set).
+
+Reports the latency from a speaker's last frame to the transcript line, throughput,
+CPU seconds per audio second, the stage timings recorded by components.metrics and
+peak memory.
+
+Usage:
+    python benchmarks/bench_replay.py [--speakers 4] [--minutes 2] [--speed 1] [--workers 2] [--rtf 0.2]
+    python benchmarks/bench_replay.py --audio alice.wav bob.wav --model real --profile realtime
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_vad_gate import TRANSMIT_RMS, load_frames
+from components.audio_buffer import FRAME_BYTES
+
+FRAMES_PER_SECOND = 50
+GUILD_ID = 1
+SAMPLE_RATE = 16000  # rate of the audio the models get
+
+
+class _Segment:
+    __slots__ = ("start", "end", "text")
+
+    def __init__(self, start, end, text):
+        self.start = start
+        self.end = end
+        self.text = text
+
+
+class StubModel:
+    """Spends rtf seconds of GIL-holding CPU time per second of audio, answers with one segment"""
+
+    def __init__(self, rtf):
+        self.rtf = rtf
+
+    def _burn(self, seconds):
+        deadline = time.thread_time() + seconds * self.rtf
+        x = 0
+        while time.thread_time() < deadline:
+            x += 1
+
+    def transcribe(self, audio, clip_timestamps=None, **options):
+        info = SimpleNamespace(language=options.get("language") or "pl", language_probability=1.0)
+        self._burn(len(audio) / SAMPLE_RATE)
+        if clip_timestamps is None:
+            return [_Segment(0.0, len(audio) / SAMPLE_RATE, f" {len(audio) / SAMPLE_RATE:.1f}s of speech")], info
+        # BatchedInferencePipeline: one segment per clip
+        return [_Segment(clip["start"] / SAMPLE_RATE, clip["end"] / SAMPLE_RATE,
+                         f" {(clip['end'] - clip['start']) / SAMPLE_RATE:.1f}s of speech")
+                for clip in clip_timestamps], info
+
+
+def synthetic_speaker(minutes, seed):
+    """Frames of one synthetic speaker: voiced bursts of 1-6 s with 0.5-4 s pauses"""
+    rng = random.Random(seed)
+    total = int(minutes * 60 * FRAMES_PER_SECOND)
+    samples_per_frame = FRAME_BYTES // 4
+    frames = []
+    noise = np.random.default_rng(seed)
+    while len(frames) < total:
+        pause = int(rng.uniform(0.5, 4.0) * FRAMES_PER_SECOND)
+        frames.extend([bytes(FRAME_BYTES)] * pause)  # digital silence, not transmitted
+        # A bit of microphone noise before and after the voice so the gate has a noise floor
+        speech = int(rng.uniform(1.0, 6.0) * FRAMES_PER_SECOND)
+        n = samples_per_frame * (speech + 20)
+        t = np.arange(n) / 48000
+        pitch = rng.uniform(100, 250)
+        voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2  # syllable rate
+        signal = 3000 * voice * envelope
+        signal[:samples_per_frame * 10] = 0
+        signal[-samples_per_frame * 10:] = 0
+        signal += 30 * noise.standard_normal(n)
+        pcm = np.repeat(signal.astype(np.int16)[:, None], 2, axis=1).tobytes()
+        frames.extend(pcm[i:i + FRAME_BYTES] for i in range(0, len(pcm), FRAME_BYTES))
+    return frames[:total]
+
+
+def is_transmitted(pcm):
+    samples = np.frombuffer(pcm, np.int16).astype(np.float32)
+    return np.sqrt(np.mean(samples ** 2)) >= TRANSMIT_RMS
+
+
+def feed(sink, speakers, speed, stop):
+    """Deliver every speaker's frames in 20 ms ticks (scaled by speed) from a single thread"""
+    length = max(len(frames) for _, frames in speakers)
+    tick = 1 / FRAMES_PER_SECOND / speed
+    start = time.perf_counter()
+    for index in range(length):
+        if stop.is_set():
+            return
+        delay = start + index * tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        for user, frames in speakers:
+            if index < len(frames) and frames[index] is not None:
+                sink.callback(user, SimpleNamespace(pcm=frames[index], source=user, packet=None))
+
+
+def describe(values, unit="s"):
+    if not values:
+        return "no data"
+    values = np.asarray(values)
+    return (f"p50 {np.percentile(values, 50):.2f}{unit}, p95 {np.percentile(values, 95):.2f}{unit}, "
+            f"max {values.max():.2f}{unit} (n={len(values)})")
+
+
+def summary_line(summary, unit="s"):
+    stats = summary.stats()
+    if not stats["count"]:
+        return "no data"
+    return f"p50 {stats['p50']:.3f}{unit}, p95 {stats['p95']:.3f}{unit}, max {stats['max']:.3f}{unit} (n={stats['count']})"
+
+
+async def wait_until_idle(voice_transcriber, settle):
+    """Wait for the segmenter to flush every speaker and the scheduler to drain"""
+    idle_since = None
+    while True:
+        stats = voice_transcriber.get_queue_stats()
+        buffered = any(len(buffer) for buffer in list(voice_transcriber.user_audio_buffers.values()))
+        if stats["queued"] == 0 and stats["running"] == 0 and not buffered:
+            idle_since = idle_since or time.perf_counter()
+            if time.perf_counter() - idle_since >= settle:
+                return
+        else:
+            idle_since = None
+        await asyncio.sleep(0.05)
+
+
+async def replay(args, speakers, audio_seconds):
+    import components.voice_transcriber as voice_transcriber
+    from components.model_manager import ModelManager, rss_bytes
+
+    if args.model == "stub":
+        def load_stub(spec):
+            model = StubModel(args.rtf)
+            return model, model
+        voice_transcriber.model_manager = ModelManager(load_stub, lambda spec: None)
+    if args.workers:
+        voice_transcriber.TRANSCRIPTION_WORKERS = args.workers
+
+    voice_transcriber.set_guild_profile(GUILD_ID, args.profile)
+    voice_transcriber.set_guild_language(GUILD_ID, args.language)
+    voice_transcriber.segmenter.silence_timeout = voice_transcriber.SILENCE_TIMEOUT / args.speed
+
+    # Latency from the utterance's last frame to its transcript line
+    latencies = {"final": [], "partial": []}
+    write_transcript_line = voice_transcriber.write_transcript_line
+
+    def timed_write(utterance, text):
+        if text:
+            latencies["partial" if utterance.partial else "final"].append(time.time() - utterance.end_time)
+        write_transcript_line(utterance, text)
+    voice_transcriber.write_transcript_line = timed_write
+
+    await voice_transcriber.set_transcribing(GUILD_ID, True)
+    while (voice_transcriber.get_model_stats(GUILD_ID) or {}).get("state") not in ("ready", None):
+        await asyncio.sleep(0.05)
+    if voice_transcriber.get_model_stats(GUILD_ID) is None:
+        raise SystemExit("model failed to load")
+    voice_transcriber.get_transcript_file(GUILD_ID)
+    voice_transcriber.segmenter.start()
+
+    sink = voice_transcriber.WhisperSink()
+    stop = threading.Event()
+    rss_before = rss_bytes()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, feed, sink, speakers, args.speed, stop)
+    finally:
+        stop.set()
+    fed = time.perf_counter() - start
+    await wait_until_idle(voice_transcriber, settle=voice_transcriber.segmenter.silence_timeout * 2)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    voice_transcriber.segmenter.stop()
+    await loop.run_in_executor(None, voice_transcriber.close_transcript_file, GUILD_ID)
+
+    import components.metrics as metrics
+    vad = voice_transcriber.get_vad_stats(GUILD_ID)
+    speech_seconds = vad["frames_kept"] / FRAMES_PER_SECOND
+    print(f"replayed {audio_seconds:.0f}s of audio from {len(speakers)} speaker(s) at {args.speed}x "
+          f"in {fed:.1f}s, drained after {elapsed:.1f}s")
+    print(f"  speech kept by the gate: {speech_seconds:.0f}s ({1 - vad['dropped_ratio']:.0%} of received frames)")
+    print(f"  latency last frame -> line: {describe(latencies['final'])}")
+    print(f"  latency window end -> partial line: {describe(latencies['partial'])}")
+    print(f"  throughput: {audio_seconds / elapsed:.1f} session-s/s, {speech_seconds / elapsed:.1f} speech-s/s")
+    print(f"  cpu: {cpu:.1f}s, {cpu / max(audio_seconds, 1e-9):.3f} cpu-s per session second, "
+          f"{cpu / max(speech_seconds, 1e-9):.3f} per speech second")
+    print(f"  preprocess: {summary_line(metrics.preprocess_seconds)}")
+    print(f"  inference:  {summary_line(metrics.inference_seconds)}")
+    print(f"  rtf:        {summary_line(metrics.real_time_factor, unit='')}")
+    print(f"  queue wait: avg {voice_transcriber.get_queue_stats()['avg_wait']:.2f}s, "
+          f"p95 {voice_transcriber.get_queue_stats()['p95_wait']:.2f}s")
+    print(f"  memory: peak rss {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}MB, "
+          f"+{(rss_bytes() - rss_before) / 2**20:.0f}MB during the replay")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", nargs="+", help="one 16-bit WAV per speaker")
+    parser.add_argument("--speakers", type=int, default=4, help="synthetic speakers when no --audio is given")
+    parser.add_argument("--minutes", type=float, default=2.0, help="length of the synthetic session")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed, 2 = twice real time")
+    parser.add_argument("--workers", type=int, default=2, help="transcription worker threads")
+    parser.add_argument("--model", choices=["stub", "real"], default="stub")
+    parser.add_argument("--rtf", type=float, default=0.2, help="stub model CPU seconds per audio second")
+    parser.add_argument("--profile", default="realtime")
+    parser.add_argument("--language", default="pl")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive, the silence timeout is measured in wall time")
+
+    if args.audio:
+        tracks = [load_frames(path) for path in args.audio]
+    else:
+        tracks = [synthetic_speaker(args.minutes, args.seed + i) for i in range(args.speakers)]
+    # Discord clients stop sending while their user is silent
+    speakers = []
+    for index, frames in enumerate(tracks):
+        user = SimpleNamespace(id=1000 + index, name=f"speaker{index + 1}", guild=SimpleNamespace(id=GUILD_ID))
+        speakers.append((user, [pcm if is_transmitted(pcm) else None for pcm in frames]))
+    audio_seconds = max(len(frames) for frames in tracks) / FRAMES_PER_SECOND
+
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    with tempfile.TemporaryDirectory(prefix="kv_replay_") as workdir:
+        # voice_transcriber opens transcripts/ relative to the working directory on import
+        os.chdir(workdir)
+        asyncio.run(replay(args, speakers, audio_seconds))
+
+
+if __name__ == "__main__":
+    main()
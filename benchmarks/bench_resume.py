@@ -0,0 +1,132 @@
+"""Measure how long resuming a paused song takes, before and after the read-ahead source.
+
+before: what YTAudio.resume used to do on every resume, spawn a new FFmpegPCMAudio
+        with -ss at the paused position (a new process and, for streams, a new HTTP
+        connection) and wait for its first frame.
+after:  the song stays open while paused (a paused mixer input wrapped in
+        ReadAheadSource), resuming is the next read() from the ring.
+
+Each round plays --play seconds of frames, pauses for --pause seconds and times
+the first audible frame after resuming. --input is a stream URL ffmpeg opens (the
+bot's -reconnect options only apply to http inputs, ffmpeg 7 rejects them for files,
+so serve a local file with `python -m http.server`), --youtube resolves a video's
+stream URL with yt-dlp first, which is what the bot does and where the respawn hurts most.
+
+Usage:
+    python benchmarks/bench_resume.py --input http://127.0.0.1:8000/song.mp3 [--rounds 5] [--play 3] [--pause 2]
+    python benchmarks/bench_resume.py --youtube https://www.youtube.com/watch?v=...
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import imageio_ffmpeg
+from discord import FFmpegPCMAudio
+
+from components.audio_mixer import SILENCE
+from components.read_ahead import ReadAheadSource
+
+FRAME_SECONDS = 0.02
+FFMPEG_OPTIONS = {
+    "before_options": "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5",
+    "options": "-vn",
+}
+
+
+def stream_url(page_url):
+    import yt_dlp
+    with yt_dlp.YoutubeDL({"format": "bestaudio/best", "quiet": True, "no_warnings": True}) as ytdl:
+        return ytdl.extract_info(page_url, download=False)["url"]
+
+
+def open_source(url, seek=0.0):
+    options = dict(FFMPEG_OPTIONS)
+    if seek > 0:
+        options["before_options"] = f"-ss {seek} " + options["before_options"]
+    return FFmpegPCMAudio(url, executable=imageio_ffmpeg.get_ffmpeg_exe(), **options)
+
+
+def play(source, seconds):
+    """Read frames in real time like the voice client does"""
+    start = time.perf_counter()
+    for i in range(int(seconds / FRAME_SECONDS)):
+        if not source.read():
+            raise SystemExit("input ended, use a longer one or fewer rounds")
+        delay = start + (i + 1) * FRAME_SECONDS - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def first_audible(source):
+    """Seconds until read() returns a real (not underrun) frame"""
+    start = time.perf_counter()
+    while True:
+        data = source.read()
+        if not data:
+            raise SystemExit("input ended while resuming")
+        if data != SILENCE:
+            return time.perf_counter() - start
+        time.sleep(0.001)
+
+
+def bench_respawn(url, rounds, play_seconds, pause_seconds):
+    latencies = []
+    position = 0.0
+    source = open_source(url)
+    for _ in range(rounds):
+        play(source, play_seconds)
+        position += play_seconds
+        source.cleanup()
+        time.sleep(pause_seconds)
+        start = time.perf_counter()
+        source = open_source(url, seek=position)
+        source.read()
+        latencies.append(time.perf_counter() - start)
+    source.cleanup()
+    return latencies, rounds + 1
+
+
+def bench_read_ahead(url, rounds, play_seconds, pause_seconds):
+    latencies = []
+    source = ReadAheadSource(open_source(url))
+    first_audible(source)
+    source.underruns = 0  # polls while ffmpeg started are not underruns of playback
+    for _ in range(rounds):
+        play(source, play_seconds)
+        # Paused: nothing reads, the ring fills and ffmpeg blocks on its pipe
+        time.sleep(pause_seconds)
+        latencies.append(first_audible(source))
+    underruns = source.underruns
+    source.cleanup()
+    return latencies, 1, underruns
+
+
+def report(name, latencies, processes):
+    print(f"{name:12s} resume p50 {statistics.median(latencies) * 1000:8.1f} ms  max {max(latencies) * 1000:8.1f} ms  "
+          f"ffmpeg processes spawned: {processes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="file or stream URL ffmpeg can open")
+    source.add_argument("--youtube", help="video URL, its audio stream URL is extracted with yt-dlp")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--play", type=float, default=3.0, help="seconds played between pauses")
+    parser.add_argument("--pause", type=float, default=2.0, help="seconds each pause lasts")
+    args = parser.parse_args()
+
+    url = args.input or stream_url(args.youtube)
+    latencies, processes = bench_respawn(url, args.rounds, args.play, args.pause)
+    report("before", latencies, processes)
+    latencies, processes, underruns = bench_read_ahead(url, args.rounds, args.play, args.pause)
+    report("after", latencies, processes)
+    print(f"read-ahead underruns while playing: {underruns} frame(s)")
+
+
+if __name__ == "__main__":
+    main()
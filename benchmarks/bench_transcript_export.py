@@ -0,0 +1,107 @@
+"""Peak memory of sending a large transcript to Discord.
+
+Writes a synthetic transcript of --size-mb megabytes (random words in the
+"HH:MM:SS - user: text" line format) and prepares it for upload the old way
+(read into a str, encode, wrap in BytesIO) and through transcript_export, which
+gzips and splits it on disk. The upload itself is simulated by reading every
+attachment in 64 KB blocks, the way discord.py streams a file. Each variant runs in
+its own process so peak RSS is not shared.
+
+Usage:
+    python benchmarks/bench_transcript_export.py [--size-mb 300] [--limit-mb 10]
+"""
+import argparse
+import io
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from components import transcript_export
+
+WORDS = ("no", "tak", "ale", "czy", "jest", "gramy", "dzisiaj", "wieczorem", "kto", "idzie",
+         "mid", "jungle", "support", "ulti", "flash", "dobra", "czekaj", "słyszysz", "mnie",
+         "zaraz", "wracam", "przegraliśmy", "wygraliśmy", "następna", "gra", "żółw", "wiesz")
+USERS = ("adbreeker", "kasia", "tomek", "wojtek", "ola")
+
+
+def write_transcript(path, size_mb, seed=0):
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    written = 0
+    second = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# Transcription started at 2025-06-01T00:00:00\n")
+        while written < target:
+            block = []
+            for _ in range(1000):
+                second += rng.randint(1, 4)
+                stamp = f"{second // 3600 % 24:02d}:{second // 60 % 60:02d}:{second % 60:02d}"
+                text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 25)))
+                block.append(f"{stamp} - {rng.choice(USERS)}: {text}\n")
+            data = "".join(block)
+            f.write(data)
+            written += len(data.encode("utf-8"))
+
+
+def upload(fileobj):
+    """Read an attachment the way an HTTP upload streams it"""
+    total = 0
+    while True:
+        block = fileobj.read(64 * 1024)
+        if not block:
+            return total
+        total += len(block)
+
+
+def run(impl, path, limit):
+    start = time.perf_counter()
+    if impl == "legacy":
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        attachments = [io.BytesIO(content.encode("utf-8"))]
+        sizes = [upload(attachments[0])]
+    else:
+        exported, workdir = transcript_export.export_transcript(path, limit)
+        sizes = []
+        for file_path, _ in exported:
+            with open(file_path, "rb") as f:
+                sizes.append(upload(f))
+        transcript_export.cleanup(workdir)
+    elapsed = time.perf_counter() - start
+
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    too_big = sum(size > limit for size in sizes)
+    print(f"{impl:>7}: {len(sizes)} attachment(s), largest {max(sizes) / 2**20:.1f}MB, "
+          f"{too_big} over the {limit / 2**20:.0f}MB limit, {elapsed:.1f}s, peak_rss={peak_rss_mb:.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=300)
+    parser.add_argument("--limit-mb", type=float, default=10)
+    parser.add_argument("--impl", choices=["legacy", "export"], help="run a single implementation in this process")
+    parser.add_argument("--path", help="existing transcript to use (internal)")
+    args = parser.parse_args()
+    limit = int(args.limit_mb * 1024 * 1024)
+
+    if args.impl:
+        run(args.impl, args.path, limit)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "2025-06-01.txt")
+        write_transcript(path, args.size_mb)
+        print(f"synthetic transcript: {os.path.getsize(path) / 2**20:.0f}MB")
+        for impl in ("legacy", "export"):
+            subprocess.run([sys.executable, __file__, "--impl", impl, "--path", path,
+                            "--limit-mb", str(args.limit_mb)], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Measure how much inference the frame level voice activity gate saves.
+
+Replays a recorded session (16-bit WAV, ideally 48 kHz stereo like Discord delivers)
+as 20 ms frames and segments it into utterances the way WhisperSink does: an
+utterance ends SILENCE_TIMEOUT after the last buffered frame. Frames of digital
+silence are treated as not transmitted, like a Discord client does. Compares the
+number of whisper calls and the audio seconds sent to inference with and without
+VoiceActivityGate; CPU seconds are estimated from --rtf (processing seconds per
+audio second of the profile in use) and --call-overhead.
+
+Usage:
+    python benchmarks/bench_vad_gate.py --audio session.wav [--rtf 0.3] [--call-overhead 0.15]
+"""
+import argparse
+import os
+import sys
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from components.audio_buffer import FRAME_BYTES
+from components.audio_preprocessing import RMS_THRESHOLD
+from components.voice_activity import VoiceActivityGate
+
+SILENCE_TIMEOUT_FRAMES = 25  # 0.5 s
+TRANSMIT_RMS = 8  # below this a frame counts as digital silence and is not sent
+
+
+def load_frames(path):
+    """Load a WAV as 48 kHz stereo int16 frames of 20 ms"""
+    with wave.open(path, "rb") as f:
+        channels, rate = f.getnchannels(), f.getframerate()
+        samples = np.frombuffer(f.readframes(f.getnframes()), np.int16).reshape(-1, channels)
+    if channels == 1:
+        samples = np.repeat(samples, 2, axis=1)
+    else:
+        samples = samples[:, :2]
+    if rate != 48000:
+        # nearest-neighbour rate conversion is good enough for energy based gating
+        positions = (np.arange(int(len(samples) * 48000 / rate)) * rate / 48000).astype(np.int64)
+        samples = samples[positions]
+    data = np.ascontiguousarray(samples).tobytes()
+    return [data[i:i + FRAME_BYTES] for i in range(0, len(data) - FRAME_BYTES + 1, FRAME_BYTES)]
+
+
+def utterance_passes_rms(frames):
+    """The RMS check process_buffer applies before calling whisper"""
+    audio = np.frombuffer(b"".join(frames), np.int16).astype(np.float32) / 32768.0
+    return len(audio) > 0 and np.sqrt(np.mean(audio ** 2)) >= RMS_THRESHOLD
+
+
+def segment(frames, use_gate):
+    gate = VoiceActivityGate()
+    utterances = []
+    current = []
+    idle = 0
+    for pcm in frames:
+        transmitted = np.sqrt(np.mean(np.frombuffer(pcm, np.int16).astype(np.float32) ** 2)) >= TRANSMIT_RMS
+        kept = (gate.process(pcm) if use_gate else [pcm]) if transmitted else []
+        if kept:
+            current.extend(kept)
+            idle = 0
+            continue
+        idle += 1
+        if current and idle >= SILENCE_TIMEOUT_FRAMES:
+            utterances.append(current)
+            current = []
+            gate.reset()
+    if current:
+        utterances.append(current)
+    return [u for u in utterances if utterance_passes_rms(u)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", required=True)
+    parser.add_argument("--rtf", type=float, default=0.3)
+    parser.add_argument("--call-overhead", type=float, default=0.15, help="fixed seconds per whisper call")
+    args = parser.parse_args()
+
+    frames = load_frames(args.audio)
+    print(f"session: {len(frames) / 50:.0f}s of audio, {len(frames)} frames")
+    results = {}
+    for name, use_gate in (("no gate", False), ("vad gate", True)):
+        utterances = segment(frames, use_gate)
+        seconds = sum(len(u) for u in utterances) / 50
+        cost = seconds * args.rtf + len(utterances) * args.call_overhead
+        results[name] = (len(utterances), seconds, cost)
+        print(f"{name:>9}: {len(utterances)} whisper calls, {seconds:.0f}s audio to inference, ~{cost:.0f} CPU/GPU-seconds")
+
+    calls = results["no gate"][0] - results["vad gate"][0]
+    cost = results["no gate"][2] - results["vad gate"][2]
+    print(f"    saved: {calls} calls, ~{cost:.0f} CPU/GPU-seconds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import mmap
+import threading
+
+# Discord voice frames are 20 ms of 48 kHz stereo int16 PCM
+FRAME_BYTES = 3840
+INITIAL_BUFFER_BYTES = FRAME_BYTES * 50  # 1 second of audio
+MAX_RETAINED_BYTES = FRAME_BYTES * 50 * 8  # drop storages bigger than 8 seconds of audio instead of keeping them
+MAX_TOTAL_RETAINED_BYTES = FRAME_BYTES * 50 * 30  # storages kept by all speakers together, 30 seconds of audio
+
+EMPTY = b""  # storage of a speaker that has nothing buffered and no spare picked up yet
+
+# Bytes of storage retained by every SpeakerBuffer for its speaker's next utterance
+_retained_lock = threading.Lock()
+_retained_bytes = 0
+
+
+def _retain(size, replaced=0):
+    """Count a storage kept for reuse (in place of one of `replaced` bytes), False if over the budget"""
+    global _retained_bytes
+    with _retained_lock:
+        if _retained_bytes - replaced + size > MAX_TOTAL_RETAINED_BYTES:
+            return False
+        _retained_bytes += size - replaced
+        return True
+
+
+def _unretain(size):
+    global _retained_bytes
+    with _retained_lock:
+        _retained_bytes -= size
+
+
+def retained_bytes():
+    """Bytes of storage all speaker buffers currently keep for reuse"""
+    return _retained_bytes
+
+
+class SpeakerBuffer:
+    """Growable PCM buffer for a single (user, guild) speaker.
+
+    Frames are copied into an anonymous mmap that doubles when full, so appending a
+    frame is amortized O(1) instead of re-copying the whole utterance. Pages of the
+    mapping only take memory once audio is written to them and a dropped storage is
+    unmapped at once, so the unused tail of a doubled storage costs nothing and
+    freed storages do not fragment the heap.
+    take() hands the filled region out as a zero-copy memoryview, release() gives
+    the storage back once the utterance was processed and the speaker's next
+    utterance is written into it instead of allocating again.
+
+    Each speaker retains at most one storage. Storages over MAX_RETAINED_BYTES, or
+    over what is left of MAX_TOTAL_RETAINED_BYTES for all speakers together, are
+    freed instead, so idle speakers cannot pile up memory.
+    """
+
+    __slots__ = ("_data", "_size", "_spare", "_lock")
+
+    def __init__(self):
+        self._data = EMPTY
+        self._size = 0
+        self._spare = None  # storage of an earlier utterance, counted in _retained_bytes
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def _take_spare(self):
+        """The retained storage, no longer counted as retained once it is written to again"""
+        spare, self._spare = self._spare, None
+        if spare is not None:
+            _unretain(len(spare))
+        return spare
+
+    def append(self, pcm):
+        """Append a PCM frame, growing the storage if needed"""
+        with self._lock:
+            end = self._size + len(pcm)
+            if end > len(self._data):
+                grown = self._take_spare() if self._spare is not None and len(self._spare) >= end else None
+                if grown is None:
+                    capacity = max(INITIAL_BUFFER_BYTES, len(self._data) * 2)
+                    while capacity < end:
+                        capacity *= 2
+                    grown = mmap.mmap(-1, capacity)
+                grown[:self._size] = memoryview(self._data)[:self._size]
+                self._data = grown
+            self._data[self._size:end] = pcm
+            self._size = end
+
+    def view(self):
+        """Zero-copy view of the audio buffered so far"""
+        with self._lock:
+            return memoryview(self._data)[:self._size]
+
+    def take(self, upto=None, carry=0):
+        """Hand out the buffered audio as a memoryview and start a new utterance.
+
+        With `upto` only the first `upto` bytes are handed out, the rest stays buffered,
+        together with the last `carry` handed out bytes so consecutive windows overlap.
+        """
+        with self._lock:
+            upto = self._size if upto is None else min(upto, self._size)
+            start = max(0, upto - carry)
+            remaining = self._size - start
+            old = self._data
+            view = memoryview(old)[:upto]
+            if remaining:
+                spare = self._take_spare() if self._spare is not None and len(self._spare) >= remaining else None
+                if spare is None:
+                    capacity = INITIAL_BUFFER_BYTES
+                    while capacity < remaining:
+                        capacity *= 2
+                    spare = mmap.mmap(-1, capacity)
+                self._data = spare
+                self._data[:remaining] = memoryview(old)[start:self._size]
+            else:
+                # The spare is picked up by the next append, until then it counts as retained
+                self._data = EMPTY
+            self._size = remaining
+            return view
+
+    def release(self, view):
+        """Return storage handed out by take() so it can be reused"""
+        storage = view.obj
+        try:
+            view.release()
+        except BufferError:
+            # Something (e.g. a numpy array) still references the audio, don't reuse it
+            return
+        if len(storage) > MAX_RETAINED_BYTES:
+            return
+        with self._lock:
+            spare = len(self._spare) if self._spare is not None else 0
+            if len(storage) > max(spare, len(self._data)) and _retain(len(storage), replaced=spare):
+                self._spare = storage
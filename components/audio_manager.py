@@ -1,12 +1,16 @@
+import logging
 import asyncio
 import discord
 import imageio_ffmpeg
 from mutagen.mp3 import MP3
-from components.voice_transcriber import is_transcribing
-from datetime import datetime
 from gtts import gTTS
+from components.bot_logging import context
+from components.audio_mixer import AudioMixer
+from components.read_ahead import ReadAheadSource
 import io
 
+log = logging.getLogger(__name__)
+
 # Global audio state management
 current_background_music = {}  # guild_id: background_music_source
 current_voice_sources = {}  # guild_id: audio_source
@@ -14,9 +18,44 @@ music_volumes = {}  # guild_id: volume (0.0-1.0)
 background_volumes = {}  # guild_id: float
 
 # Music queue system
-music_queues = {}  # guild_id: list of (YTDLSource, title, uploader)
+music_queues = {}  # guild_id: list of youtube_player.QueueEntry
 current_youtube_players = {}  # guild_id: current_youtube_source
 
+# Everything a guild hears goes through one mixer, so speech, music and background play at once
+mixers = {}  # guild_id: AudioMixer playing on the guild's voice client
+DUCK_UNDER = {  # kind: kinds it is turned down under
+    "background": ("voice", "youtube"),
+    "youtube": ("voice",),
+}
+
+def mix(voice_client, source, kind, after=None, replace=False):
+    """Play source on the guild's mixer next to whatever already plays there.
+
+    kind is "voice", "youtube" or "background"; with replace, the source takes the
+    place of the one of that kind that is playing. after(error) is called once the
+    source finished or was removed, like with voice_client.play().
+    """
+    guild_id = voice_client.guild.id
+    mixer = mixers.get(guild_id)
+    if mixer is not None and mixer.add(source, kind, duck_under=DUCK_UNDER.get(kind, ()), after=after, replace=replace):
+        return
+    # No mixer yet or it ended because nothing was left to play
+    mixer = AudioMixer()
+    mixer.add(source, kind, duck_under=DUCK_UNDER.get(kind, ()), after=after)
+    mixers[guild_id] = mixer
+
+    def mixer_done(error):
+        if error:
+            log.error(f"Mixer error: {error}", extra=context(guild_id=guild_id))
+        if mixers.get(guild_id) is mixer:
+            mixers.pop(guild_id, None)
+
+    if voice_client.is_playing():
+        # The old mixer returned its last frame but the player has not stopped yet.
+        # stop_playing() leaves voice receive (transcription) running, plain clients only have stop()
+        getattr(voice_client, "stop_playing", voice_client.stop)()
+    voice_client.play(mixer, after=mixer_done)
+
 def is_playing_youtube(guild_id):
     """Check if YouTube music is currently playing"""
     return guild_id in current_youtube_players and current_youtube_players[guild_id] is not None
@@ -41,85 +80,73 @@ def get_current_audio_type(guild_id):
         return None
     
 def stop_audio(voice_client):
-    guild_id = voice_client.guild.id
-    is_transcribing_now = is_transcribing(guild_id)
-    
-    if is_transcribing_now:
-        # If transcribing, only stop the audio source, don't call voice_client.stop()
-        if voice_client.is_playing():
-            # Get the current source and stop it manually
-            for storage in [current_background_music, current_voice_sources, current_youtube_players]:
-                source = storage.get(guild_id)
-                if source:
-                    try:
-                        if storage is current_youtube_players:
-                            source.source.cleanup()
-                        else:
-                            source.cleanup()
-                    except Exception as e:
-                        print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Error stopping source: {e}")
-            # Force stop by setting internal state (this is a workaround)
-            voice_client._player = None
-        # Keep the voice receiver active - don't restart listening
-    else:
-        # If not transcribing, use the normal stop method
-        voice_client.stop()
+    """Stop the music and speech playing in the guild, the background music keeps going.
+
+    The voice client itself keeps playing the mixer, so voice receive is never disturbed;
+    its is_playing() stays True with only background music left. Returns whether any
+    music or speech (paused included) was stopped.
+    """
+    mixer = mixers.get(voice_client.guild.id)
+    if mixer is None:
+        return False
+    return mixer.remove("youtube") + mixer.remove("voice") > 0
 
 def pause_music(voice_client):
+    """Pause the song, its stream stays open on the mixer. False if no song is playing"""
     guild_id = voice_client.guild.id
-    if voice_client.is_playing() and is_playing_youtube(guild_id):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Pausing yt music in {voice_client.channel.name}")
+    mixer = mixers.get(guild_id)
+    if is_playing_youtube(guild_id) and mixer is not None and mixer.pause("youtube"):
+        log.info(f"Pausing yt music in {voice_client.channel.name}", extra=context(guild_id=guild_id))
         current_youtube_players[guild_id].pause()
-        voice_client.pause()
-    else:
-        print(f"[WARNING - {datetime.now().strftime('%H:%M:%S')}] Cannot pause yt music, not playing YouTube or no source found in {voice_client.channel.name}")
+        return True
+    log.warning(f"Cannot pause yt music, not playing YouTube or already paused in {voice_client.channel.name}",
+                extra=context(guild_id=guild_id))
+    return False
 
-async def resume_music(voice_client):
+def resume_music(voice_client):
+    """Continue a paused song from the frames decoded ahead. False if no song is paused"""
     guild_id = voice_client.guild.id
-    if voice_client.is_paused():
-        voice_client.resume()
-    else:
-        if current_youtube_players.get(guild_id):
-            print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Resuming yt music in {voice_client.channel.name}")
-            await current_youtube_players[guild_id].resume(voice_client)
+    yt_audio = current_youtube_players.get(guild_id)
+    mixer = mixers.get(guild_id)
+    if yt_audio is None or mixer is None or not mixer.resume("youtube"):
+        return False
+    log.info(f"Resuming yt music in {voice_client.channel.name}", extra=context(guild_id=guild_id))
+    yt_audio.unpause()
+    return True
 
 
 async def play_background(voice_client):
     ffmpeg_path = imageio_ffmpeg.get_ffmpeg_exe()
     mp3_path = "assets/sounds/flute-background.mp3"
     guild_id = voice_client.guild.id
-    print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Preparing to play background music in {voice_client.channel.name}")
+    log.info(f"Preparing to play background music in {voice_client.channel.name}")
 
-    async def play_next(counter):
+    async def play_next():
         await asyncio.sleep(0.5)
         if voice_client.is_connected():
-            if voice_client.is_playing():
-                if counter % 60 == 0:
-                    print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Waiting to start background music in {voice_client.channel.name}")
-                await asyncio.sleep(1)
-                await play_next(counter+1)
-            else:
-                print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Playing background music in {voice_client.channel.name}")
-                volume = background_volumes.get(guild_id, 0.0)
-                ffmpeg_source = discord.FFmpegPCMAudio(
-                    mp3_path,
-                    executable=ffmpeg_path,
-                    pipe=False,
-                )
-                source = discord.PCMVolumeTransformer(ffmpeg_source, volume=volume)
-                current_background_music[guild_id] = source
-                loop = asyncio.get_running_loop()
-                def after_callback(e):
-                    # Clean up the source reference
+            log.info(f"Playing background music in {voice_client.channel.name}")
+            volume = background_volumes.get(guild_id, 0.0)
+            ffmpeg_source = discord.FFmpegPCMAudio(
+                mp3_path,
+                executable=ffmpeg_path,
+                pipe=False,
+            )
+            # Decoded ahead, the mixer never waits for ffmpeg to start
+            source = discord.PCMVolumeTransformer(ReadAheadSource(ffmpeg_source), volume=volume)
+            current_background_music[guild_id] = source
+            loop = asyncio.get_running_loop()
+            def after_callback(e):
+                # Loop the track, unless another play_background() replaced this source
+                if current_background_music.get(guild_id) is source:
                     current_background_music.pop(guild_id, None)
-                    # Don't restart listening - it's already active during transcription
-                    asyncio.run_coroutine_threadsafe(play_next(0), loop)
-                voice_client.play(source, after=after_callback)
+                    asyncio.run_coroutine_threadsafe(play_next(), loop)
+            # Plays under music and speech (ducked), one background per guild
+            mix(voice_client, source, "background", after=after_callback, replace=True)
         else:
-            print(f"[WARNING - {datetime.now().strftime('%H:%M:%S')}] Voice client is not connected in {voice_client.channel.name}, stopping background music.")
+            log.warning(f"Voice client is not connected in {voice_client.channel.name}, stopping background music.")
             return
 
-    await play_next(0)
+    await play_next()
 
 def set_background_volume(guild_id, volume):
     background_volumes[guild_id] = volume
@@ -129,14 +156,14 @@ def set_background_volume(guild_id, volume):
             try:
                 source.volume = volume
             except Exception as e:
-                print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Error setting background volume: {e}")
+                log.error(f"Error setting background volume: {e}")
 
 async def say_text(voice_client, text, language):
     """Convert text to speech and play it on the voice client without temp files"""
     guild_id = voice_client.guild.id
     
     if not voice_client.is_connected():
-        print(f"[WARNING - {datetime.now().strftime('%H:%M:%S')}] Voice client is not connected in {voice_client.channel.name}, cannot play TTS.")
+        log.warning(f"Voice client is not connected in {voice_client.channel.name}, cannot play TTS.")
         return False
     
     try:
@@ -150,12 +177,7 @@ async def say_text(voice_client, text, language):
         tts.write_to_fp(mp3_buffer)
         mp3_buffer.seek(0)
 
-        # Check if YouTube music is playing and pause it
-        was_playing_youtube = is_playing_youtube(guild_id) and voice_client.is_playing()
-        if was_playing_youtube:
-            pause_music(voice_client)
-        
-        # Play the TTS audio from memory
+        # Play the TTS audio from memory, music keeps playing ducked under it
         ffmpeg_path = imageio_ffmpeg.get_ffmpeg_exe()
         volume = music_volumes.get(guild_id, 0.5)
         
@@ -164,24 +186,22 @@ async def say_text(voice_client, text, language):
             executable=ffmpeg_path,
             pipe=True,
         )
-        source = discord.PCMVolumeTransformer(ffmpeg_source, volume=volume)
+        # Decoded ahead: the first read would block the player thread, and with it the music, until ffmpeg started
+        source = discord.PCMVolumeTransformer(ReadAheadSource(ffmpeg_source), volume=volume)
         current_voice_sources[guild_id] = source
         
-        loop = asyncio.get_running_loop()
         def after_callback(e):
             # Clean up
-            current_voice_sources.pop(guild_id, None)
+            if current_voice_sources.get(guild_id) is source:
+                current_voice_sources.pop(guild_id, None)
             mp3_buffer.close()
-            # Resume YouTube music if it was playing before
-            if was_playing_youtube:
-                asyncio.run_coroutine_threadsafe(resume_music(voice_client), loop)
             if e:
-                print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] TTS playback error: {e}")
+                log.error(f"TTS playback error: {e}")
         
-        voice_client.play(source, after=after_callback)
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Playing TTS in {voice_client.channel.name}: '{text[:50]}{'...' if len(text) > 50 else ''}'")
+        mix(voice_client, source, "voice", after=after_callback)
+        log.info(f"Playing TTS in {voice_client.channel.name}: '{text[:50]}{'...' if len(text) > 50 else ''}'")
         return True
         
     except Exception as e:
-        print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Error in TTS: {e}")
+        log.error(f"Error in TTS: {e}")
         return False
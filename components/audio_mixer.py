@@ -0,0 +1,191 @@
+import logging
+import threading
+import discord
+import numpy as np
+from components.audio_buffer import FRAME_BYTES
+
+log = logging.getLogger(__name__)
+
+FRAME_SAMPLES = FRAME_BYTES // 4  # per channel of a 20 ms 48 kHz stereo frame
+DUCK_GAIN = 0.3  # gain of a ducked input while something it ducks under plays
+DUCK_RAMP_FRAMES = 8  # frames (20 ms each) a duck or unduck fades over
+
+SILENCE = bytes(FRAME_BYTES)
+
+
+class MixerInput:
+    """One source playing on a mixer"""
+    __slots__ = ("source", "kind", "gain", "duck_under", "after", "paused", "duck")
+
+    def __init__(self, source, kind, gain, duck_under, after):
+        self.source = source
+        self.kind = kind
+        self.gain = gain
+        self.duck_under = duck_under  # kinds this input is turned down under
+        self.after = after  # after(error) once the source finished or was removed
+        self.paused = False
+        self.duck = 1.0  # current ducking gain, moves towards DUCK_GAIN or 1.0 a ramp step per frame
+
+
+class AudioMixer(discord.AudioSource):
+    """Plays several PCM sources on one voice client at the same time.
+
+    The voice client only plays the mixer. Sources are added and removed while it
+    plays, each 20 ms frame is the sum of one frame of every unpaused input, scaled
+    by the input's gain. An input with `duck_under` kinds is faded down to
+    `duck_gain` while an input of one of those kinds plays (music under speech).
+    A source that runs out is cleaned up and its `after` callback called, like
+    voice_client.play(source, after=...) would. When the last input is gone the
+    mixer ends; add() then returns None and a new mixer has to be played.
+    """
+
+    def __init__(self, duck_gain=DUCK_GAIN, duck_ramp_frames=DUCK_RAMP_FRAMES):
+        self.duck_gain = duck_gain
+        self.duck_step = (1.0 - duck_gain) / max(1, duck_ramp_frames)
+        self._inputs = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._mix = np.zeros(FRAME_SAMPLES * 2, dtype=np.float32)
+        self._ramp = np.linspace(0.0, 1.0, FRAME_SAMPLES, endpoint=False, dtype=np.float32)
+
+    def add(self, source, kind, gain=1.0, duck_under=(), after=None, replace=False):
+        """Start playing source, with replace instead of any input of the same kind.
+
+        Returns the MixerInput, None if the mixer already ended.
+        """
+        item = MixerInput(source, kind, gain, tuple(duck_under), after)
+        with self._lock:
+            if self._closed:
+                return None
+            replaced = [i for i in self._inputs if i.kind == kind] if replace else []
+            self._inputs = [i for i in self._inputs if i not in replaced] + [item]
+        for old in replaced:
+            self._finish(old)
+        return item
+
+    def remove(self, kind):
+        """Stop every input of a kind, returns how many were playing"""
+        with self._lock:
+            removed = [i for i in self._inputs if i.kind == kind]
+            self._inputs = [i for i in self._inputs if i.kind != kind]
+        for item in removed:
+            self._finish(item)
+        return len(removed)
+
+    def set_gain(self, kind, gain):
+        with self._lock:
+            for item in self._inputs:
+                if item.kind == kind:
+                    item.gain = gain
+
+    def pause(self, kind):
+        """Stop reading inputs of a kind, their sources stay open. False if none plays"""
+        return self._set_paused(kind, True)
+
+    def resume(self, kind):
+        """Continue paused inputs of a kind. False if none is paused"""
+        return self._set_paused(kind, False)
+
+    def _set_paused(self, kind, paused):
+        changed = False
+        with self._lock:
+            for item in self._inputs:
+                if item.kind == kind and item.paused != paused:
+                    item.paused = paused
+                    changed = True
+        return changed
+
+    def kinds(self):
+        """Kinds of the inputs currently playing (paused ones included)"""
+        with self._lock:
+            return [item.kind for item in self._inputs]
+
+    def is_opus(self):
+        return False
+
+    def read(self):
+        with self._lock:
+            if not self._inputs:
+                self._closed = True
+                return b""
+            inputs = list(self._inputs)
+        playing = {item.kind for item in inputs if not item.paused}
+
+        frames = []  # (item, pcm) of inputs that produced a frame
+        finished = []  # (item, error)
+        for item in inputs:
+            if item.paused:
+                continue
+            try:
+                data = item.source.read()
+            except Exception as e:
+                log.error(f"Mixer input {item.kind} failed: {e}")
+                finished.append((item, e))
+                continue
+            if not data:
+                finished.append((item, None))
+                continue
+            if len(data) < FRAME_BYTES:
+                data += bytes(FRAME_BYTES - len(data))
+            frames.append((item, data))
+
+        if finished:
+            ended = [item for item, _ in finished]
+            with self._lock:
+                self._inputs = [i for i in self._inputs if i not in ended]
+            for item, error in finished:
+                self._finish(item, error)
+
+        if not frames:
+            # Only paused inputs (or the last ones just ended): keep the player alive
+            return SILENCE
+        ducks = [self._step_duck(item, playing) for item, _ in frames]
+        if len(frames) == 1 and frames[0][0].gain == 1.0 and ducks[0] == (1.0, 1.0):
+            return frames[0][1]  # nothing to mix
+
+        mix = self._mix
+        mix.fill(0.0)
+        for (item, data), (start, end) in zip(frames, ducks):
+            pcm = np.frombuffer(data, dtype=np.int16)
+            if start == end:
+                gain = item.gain * end
+                if gain == 1.0:
+                    mix += pcm
+                elif gain > 0.0:
+                    mix += pcm * np.float32(gain)
+            else:
+                # Fade across the frame so a duck does not click
+                ramp = (start + (end - start) * self._ramp) * np.float32(item.gain)
+                mix.reshape(-1, 2)[:] += pcm.reshape(-1, 2) * ramp[:, None]
+        np.clip(mix, -32768, 32767, out=mix)
+        return mix.astype(np.int16).tobytes()
+
+    def _step_duck(self, item, playing):
+        """Move an input's ducking gain one ramp step, returns its gain at frame start and end"""
+        start = item.duck
+        target = self.duck_gain if any(kind in playing for kind in item.duck_under) else 1.0
+        if start < target:
+            item.duck = min(target, start + self.duck_step)
+        elif start > target:
+            item.duck = max(target, start - self.duck_step)
+        return start, item.duck
+
+    def _finish(self, item, error=None):
+        try:
+            item.source.cleanup()
+        except Exception as e:
+            log.error(f"Error cleaning up mixer input {item.kind}: {e}")
+        if item.after is not None:
+            try:
+                item.after(error)
+            except Exception as e:
+                log.error(f"Error in after callback of mixer input {item.kind}: {e}")
+
+    def cleanup(self):
+        """Called by the voice client when the mixer stops playing, ends every input"""
+        with self._lock:
+            self._closed = True
+            inputs = self._inputs
+            self._inputs = []
+        for item in inputs:
+            self._finish(item)
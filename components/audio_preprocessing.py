@@ -0,0 +1,91 @@
+import numpy as np
+from scipy.signal import butter, firwin, resample_poly, sosfiltfilt
+
+INPUT_RATE = 48000
+TARGET_RATE = 16000
+DECIMATION = INPUT_RATE // TARGET_RATE
+GAIN = 15.0
+RMS_THRESHOLD = 0.003  # skip very quiet audio (adjust as needed)
+
+# Everything below is designed once at import instead of on every utterance.
+# Anti-aliasing filter for the 3:1 decimation, same design resample_poly uses by default
+_RESAMPLE_TAPS = firwin(2 * 10 * DECIMATION + 1, 1.0 / DECIMATION, window=("kaiser", 5.0)).astype(np.float32)
+# High-pass 100 Hz (remove low-frequency noise) and low-pass 7 kHz (remove high-frequency
+# noise) cascaded into a single SOS filter so only one forward-backward pass is needed
+_BANDPASS_SOS = np.vstack([
+    butter(4, 100, btype="high", fs=TARGET_RATE, output="sos"),
+    butter(4, 7000, btype="low", fs=TARGET_RATE, output="sos"),
+])
+
+
+def _wiener(audio, noise):
+    """3-sample Wiener filter equivalent to scipy.signal.wiener(audio, noise=noise).
+
+    Works in float32 with a handful of buffers instead of scipy's float64 temporaries.
+    """
+    padded = np.zeros(len(audio) + 2, np.float32)
+    padded[1:-1] = audio
+
+    # local mean over the window (zero padded at the edges like scipy)
+    mean = padded[:-2] + padded[1:-1]
+    mean += padded[2:]
+    mean *= 1.0 / 3.0
+
+    # local variance, reusing the padded buffer for the squares
+    np.square(padded, out=padded)
+    var = padded[:-2] + padded[1:-1]
+    var += padded[2:]
+    var *= 1.0 / 3.0
+    var -= mean * mean
+    quiet = var < noise
+
+    # audio = mean + (1 - noise / var) * (audio - mean), or just mean where var < noise
+    np.maximum(var, noise, out=var)
+    np.divide(noise, var, out=var)
+    np.subtract(1.0, var, out=var)
+    audio -= mean
+    audio *= var
+    audio += mean
+    np.copyto(audio, mean, where=quiet)
+    return audio
+
+
+def preprocess_pcm(pcm):
+    """Turn raw 48 kHz stereo int16 PCM into enhanced 16 kHz mono float32 for whisper.
+
+    Returns None when the audio is too quiet to be worth transcribing.
+    """
+    samples = np.frombuffer(pcm, np.int16)
+    if len(samples) == 0:
+        return None
+
+    # Downmix straight into a single float32 array, scaled to [-1, 1)
+    if len(samples) % 2 == 0:
+        stereo = samples.reshape(-1, 2)
+        audio = stereo[:, 0].astype(np.float32)
+        audio += stereo[:, 1]
+        audio *= 0.5 / 32768.0
+    else:
+        audio = samples.astype(np.float32)
+        audio *= 1.0 / 32768.0
+    del samples
+
+    rms = np.sqrt(np.dot(audio, audio) / len(audio))
+    if rms < RMS_THRESHOLD:
+        return None
+
+    audio *= GAIN
+    np.clip(audio, -1.0, 1.0, out=audio)
+
+    # Polyphase 48k -> 16k decimation, only computes the samples that are kept
+    audio = resample_poly(audio, 1, DECIMATION, window=_RESAMPLE_TAPS)
+
+    # Normalize to prevent clipping
+    peak = max(float(audio.max()), -float(audio.min()))
+    if peak > 0:
+        audio *= 0.95 / peak
+
+    audio = sosfiltfilt(_BANDPASS_SOS, audio).astype(np.float32)
+
+    # Wiener filter for noise reduction
+    return _wiener(audio, 0.01)
@@ -0,0 +1,62 @@
+from bisect import bisect_right
+import numpy as np
+
+SAMPLE_RATE = 16000
+MAX_CLIP_SECONDS = 30  # whisper's window, longer utterances are split into several clips
+
+
+def speech_clips(audio, vad_filter=False, vad_parameters=None):
+    """(start, end) sample ranges of one utterance to decode, at most MAX_CLIP_SECONDS each.
+
+    With vad_filter the ranges are the speech Silero VAD finds (with the profile's
+    vad_parameters, as WhisperModel.transcribe does for a single utterance), so an
+    utterance without speech gives no clip. Otherwise the whole utterance is cut into
+    MAX_CLIP_SECONDS pieces.
+    """
+    if vad_filter:
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+        parameters = dict(vad_parameters or {}, max_speech_duration_s=MAX_CLIP_SECONDS)
+        return [(chunk["start"], chunk["end"]) for chunk in get_speech_timestamps(audio, VadOptions(**parameters))]
+    max_clip = MAX_CLIP_SECONDS * SAMPLE_RATE
+    return [(start, min(start + max_clip, len(audio))) for start in range(0, len(audio), max_clip)]
+
+
+def transcribe_batch(batched_model, audios, batch_size=8, vad_filter=False, vad_parameters=None, **options):
+    """Transcribe several independent utterances in one batched whisper call.
+
+    `batched_model` is a faster_whisper BatchedInferencePipeline (1.2 or newer, which
+    takes clip_timestamps in seconds) and `audios` a list of 16 kHz float32 arrays. The
+    utterances are laid out back to back in one array and passed as clip_timestamps, so
+    every clip becomes one item of the decoding batch. The pipeline ignores vad_filter
+    when clips are given, so the VAD is run here per utterance (see speech_clips).
+    Each returned segment is routed back to the utterance its start time falls into.
+    Returns one text per input audio (empty string if nothing was recognized).
+    """
+    clips = []  # {"start": seconds, "end": seconds}
+    owners = []  # utterance index for every clip
+    offset = 0
+    for index, audio in enumerate(audios):
+        for start, end in speech_clips(audio, vad_filter, vad_parameters):
+            clips.append({"start": (offset + start) / SAMPLE_RATE, "end": (offset + end) / SAMPLE_RATE})
+            owners.append(index)
+        offset += len(audio)
+
+    texts = [[] for _ in audios]
+    if not clips:
+        return ["" for _ in audios]
+
+    audio = np.concatenate(audios).astype(np.float32, copy=False)
+    segments, _ = batched_model.transcribe(
+        audio,
+        clip_timestamps=clips,
+        batch_size=batch_size,
+        **options,
+    )
+
+    clip_starts = [clip["start"] for clip in clips]
+    for segment in segments:
+        # small tolerance because segment times are rounded by the decoder
+        clip_index = max(0, bisect_right(clip_starts, segment.start + 0.01) - 1)
+        texts[owners[clip_index]].append(segment.text)
+
+    return ["".join(parts).strip() for parts in texts]
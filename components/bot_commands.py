@@ -1,3 +1,4 @@
+import logging
 import discord
 from discord import app_commands
 import components.voice_transcriber as voice_transcriber
@@ -7,12 +8,16 @@ import components.audio_manager as audio_mgr
 import components.utilis as utils
 from datetime import datetime
 import components.opgg_api as opgg_api
+import components.metrics as metrics
+from components.bot_logging import context
+
+log = logging.getLogger(__name__)
 
 def setup_commands(bot):
 #help command ----------------------------------------------------------------------------------------------------- help command
     @bot.tree.command(name="kv_help", description="Shows all available commands and their usage")
     async def help(interaction: discord.Interaction):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_help' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})")
+        log.info(f"Command 'kv_help' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})", extra=context(interaction))
         
         embed = discord.Embed(
             title="🤖 Komivoyager Help Page",
@@ -37,6 +42,7 @@ def setup_commands(bot):
             name="🛡️ Admin Commands",
             value=(
                 "`/kv_clearchat <1-100>` - Delete messages from chat (Admin/Owner only)\n"
+                "`/kv_stats` - Show event loop, voice pipeline and request latency metrics (Admin/Owner only)\n"
             ),
             inline=False
         )
@@ -56,10 +62,11 @@ def setup_commands(bot):
         embed.add_field(
             name="📝 Transcription Commands",
             value=(
-                "`/kv_transcript on` - Enable voice transcription\n"
+                "`/kv_transcript on [profile] [language]` - Enable voice transcription (realtime/balanced/archival, pl/en/.../auto)\n"
                 "`/kv_transcript off` - Disable voice transcription\n"
                 "`/kv_transcript status` - Check transcription status\n"
                 "`/kv_transcript get` - Choose one of saved transcripts and get it as attachment\n"
+                "`/kv_transcript search <query>` - Find what was said, with the surrounding lines\n"
             ),
             inline=False
         )
@@ -70,10 +77,12 @@ def setup_commands(bot):
             value=(
                 "`/kv_play` - Starts playing from queue if queue is not empty\n"
                 "`/kv_play <query>` - Play song instantly (stops current music)\n"
-                "`/kv_enqueue <query>` - Add song to queue\n"
+                "`/kv_enqueue <query>` - Add songs or a playlist to queue (several queries separated by `;`)\n"
                 "`/kv_clearqueue` - Clear the music queue\n"
                 "`/kv_queue` - Show current queue\n"
                 "`/kv_nowplaying` - Show current song\n"
+                "`/kv_pause` - Pause the current song\n"
+                "`/kv_resume` - Resume the paused song\n"
                 "`/kv_skip` - Skip current sound/music\n"
                 "`/kv_stop` - Stop current sound/music and clear queue\n"
                 "`/kv_volume <0-100>` - Set music volume\n"
@@ -123,14 +132,14 @@ def setup_commands(bot):
 #hello command ----------------------------------------------------------------------------------------------------- hello command
     @bot.tree.command(name="kv_hello", description="Greets you back!")
     async def hello(interaction: discord.Interaction):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_hello' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})")
+        log.info(f"Command 'kv_hello' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})", extra=context(interaction))
         await interaction.response.send_message(f"Hello {interaction.user.mention}!")
 
 #echo command ----------------------------------------------------------------------------------------------------- echo command
     @bot.tree.command(name="kv_echo", description="Replies with your message.")
     @app_commands.describe(message="The message to echo")
     async def echo(interaction: discord.Interaction, message: str):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_echo' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with message: '{message}'")
+        log.info(f"Command 'kv_echo' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with message: '{message}'", extra=context(interaction))
         await interaction.response.send_message("✓", ephemeral=True, delete_after=0)
         await interaction.channel.send(message)
 
@@ -138,7 +147,7 @@ def setup_commands(bot):
     @bot.tree.command(name="kv_demokracja", description="Creates a quick poll.")
     @app_commands.describe(question="The poll question")
     async def demokracja(interaction: discord.Interaction, question: str):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_demokracja' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with question: '{question}'")
+        log.info(f"Command 'kv_demokracja' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with question: '{question}'", extra=context(interaction))
         embed = discord.Embed(title="Demokracja!", description=question, color=0x00ff00)
         poll_message = await interaction.channel.send(embed=embed)
         await poll_message.add_reaction('👍')
@@ -148,7 +157,7 @@ def setup_commands(bot):
 #join command ----------------------------------------------------------------------------------------------------- join command
     @bot.tree.command(name="kv_join", description="Joins a voice channel.")
     async def join(interaction: discord.Interaction):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_join' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})")
+        log.info(f"Command 'kv_join' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})", extra=context(interaction))
         
         if interaction.user.voice:
             channel = interaction.user.voice.channel
@@ -168,7 +177,7 @@ def setup_commands(bot):
 #leave command ----------------------------------------------------------------------------------------------------- leave command
     @bot.tree.command(name="kv_leave", description="Leaves the voice channel.")
     async def leave(interaction: discord.Interaction):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_leave' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})")
+        log.info(f"Command 'kv_leave' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})", extra=context(interaction))
         
         voice_client = interaction.guild.voice_client
         if voice_client and voice_client.is_connected():
@@ -181,7 +190,7 @@ def setup_commands(bot):
     @bot.tree.command(name="kv_say", description="Make the bot speak text in voice channel")
     @app_commands.describe(text="Text to speak", language="Language (pl/en)")
     async def say(interaction: discord.Interaction, text: str, language: str):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_say' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with text: '{text[:50]}{'...' if len(text) > 50 else ''}' language: '{language}'")
+        log.info(f"Command 'kv_say' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with text: '{text[:50]}{'...' if len(text) > 50 else ''}' language: '{language}'", extra=context(interaction))
         
         # Validate language
         if language.lower() not in ['pl', 'en']:
@@ -204,15 +213,42 @@ def setup_commands(bot):
 
 #transcript command ----------------------------------------------------------------------------------------------------- transcript command
     @bot.tree.command(name="kv_transcript", description="Enable or disable voice transcription.")
-    @app_commands.describe(action="on, off, status, or get")
-    async def transcript(interaction: discord.Interaction, action: str):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_transcript' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with action: '{action}'")
+    @app_commands.describe(action="on, off, status, get or search", profile="Quality profile for 'on': realtime, balanced or archival (optional)", language="Language spoken for 'on', e.g. pl or en, auto detects it per speaker (optional)", query="Words to look for with 'search'")
+    async def transcript(interaction: discord.Interaction, action: str, profile: str = "", language: str = "", query: str = ""):
+        log.info(f"Command 'kv_transcript' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with action: '{action}' profile: '{profile}' language: '{language}' query: '{query}'", extra=context(interaction))
         
         guild_id = interaction.guild.id
         
         if action.lower() == "status":            
             if voice_transcriber.is_transcribing(guild_id):
-                await interaction.response.send_message("Transcription is currently enabled.", ephemeral=True, delete_after=5)
+                stats = voice_transcriber.get_queue_stats()
+                guild_profile = voice_transcriber.get_guild_profile(guild_id)
+                model_stats = voice_transcriber.get_model_stats(guild_id)
+                all_models = voice_transcriber.get_model_stats()
+                model_info = "not loaded"
+                if model_stats is not None:
+                    model_info = f"{model_stats['spec'][0]} {model_stats['state']}"
+                    if model_stats['load_seconds'] is not None:
+                        model_info += f", loaded in {model_stats['load_seconds']:.1f}s, {model_stats['memory_mb']:.0f}MB resident"
+                model_info += f" ({len(all_models['models'])} models loaded, {all_models['memory_mb']:.0f}/{all_models['memory_budget_mb']}MB)"
+                backpressure = voice_transcriber.get_backpressure_stats(guild_id)
+                shedding = f", shedding: {backpressure['strategy']}" if backpressure['strategy'] else ""
+                language_info = guild_profile['language']
+                detected = voice_transcriber.get_speaker_languages(guild_id)
+                if language_info == "auto" and detected:
+                    language_info += " - " + ", ".join(f"{name}: {code}" for name, code in detected.items())
+                await interaction.response.send_message(
+                    f"Transcription is currently enabled.\n"
+                    f"Profile: {guild_profile['name']} ({guild_profile['model_size']}, {guild_profile['device']} {guild_profile['compute_type']})\n"
+                    f"Language: {language_info}\n"
+                    f"Model: {model_info}\n"
+                    f"Queue: {stats['queued']} waiting, {stats['running']}/{stats['workers']} workers busy, "
+                    f"avg wait {stats['avg_wait']:.1f}s (p95 {stats['p95_wait']:.1f}s)\n"
+                    f"Lag: {backpressure['lag']:.1f}s, {backpressure['queued_seconds']:.0f}/{backpressure['max_queued_seconds']:.0f}s of audio queued{shedding}\n"
+                    f"Load shedding: {backpressure['degraded']} utterance(s) degraded, {backpressure['dropped']} dropped "
+                    f"({backpressure['dropped_seconds']:.0f}s of audio)\n"
+                    f"Voice activity gate: {voice_transcriber.get_vad_stats(guild_id)['dropped_ratio']:.0%} of received audio skipped as non-speech",
+                    ephemeral=True, delete_after=15)
             else:
                 await interaction.response.send_message("Transcription is currently disabled.", ephemeral=True, delete_after=5)
             return
@@ -220,44 +256,72 @@ def setup_commands(bot):
         if action.lower() == "get":
             await interaction.response.defer(ephemeral=True)
             
-            transcript_files = voice_transcriber.get_transcripts(guild_id)
+            transcript_count = voice_transcriber.get_transcript_count(guild_id)
             
-            if not transcript_files:
+            if not transcript_count:
                 await interaction.followup.send("❌ No transcript files found for this guild.", ephemeral=True)
                 return
             
-            options = voice_transcriber.get_transcripts(guild_id)
+            pages = (transcript_count - 1) // voice_transcriber.TRANSCRIPTS_PER_PAGE + 1
             
-            # Create dropdown view
+            # Create dropdown view, one page of files at a time
             class TranscriptSelect(discord.ui.View):
                 def __init__(self):
                     super().__init__(timeout=60)
+                    self.page = 0
+                    self.show_page()
                 
-                @discord.ui.select(
-                    placeholder="Choose a transcript file...",
-                    options=options,
-                    min_values=1,
-                    max_values=1
-                )
-                async def select_transcript(self, select_interaction: discord.Interaction, select: discord.ui.Select):
-                    selected_file = select.values[0]
+                def show_page(self):
+                    self.clear_items()
+                    select = discord.ui.Select(
+                        placeholder=f"Choose a transcript file... (page {self.page + 1}/{pages})",
+                        options=voice_transcriber.get_transcripts(guild_id, self.page),
+                        min_values=1,
+                        max_values=1
+                    )
+                    select.callback = self.select_transcript
+                    self.add_item(select)
+                    if pages > 1:
+                        previous_button = discord.ui.Button(label="◀ Newer", disabled=self.page == 0)
+                        previous_button.callback = self.previous_page
+                        self.add_item(previous_button)
+                        next_button = discord.ui.Button(label="Older ▶", disabled=self.page >= pages - 1)
+                        next_button.callback = self.next_page
+                        self.add_item(next_button)
+                
+                async def previous_page(self, button_interaction: discord.Interaction):
+                    self.page = max(0, self.page - 1)
+                    self.show_page()
+                    await button_interaction.response.edit_message(view=self)
+                
+                async def next_page(self, button_interaction: discord.Interaction):
+                    self.page = min(pages - 1, self.page + 1)
+                    self.show_page()
+                    await button_interaction.response.edit_message(view=self)
+                
+                async def select_transcript(self, select_interaction: discord.Interaction):
+                    selected_file = select_interaction.data["values"][0]
+                    await select_interaction.response.defer(ephemeral=True, thinking=True)
                     
-                    discord_file = utils.get_file_as_discord_file(selected_file)
-                    if discord_file is None:
-                        await select_interaction.response.send_message(
-                            "❌ Error reading transcript file. It may be too large or corrupted.",
-                            ephemeral=True,
-                            delete_after=5
-                        )
-                    else:
-                        file_name = discord_file.filename
-                        await select_interaction.response.send_message(
-                            f"📄 **Transcript: {file_name}**",
-                            file=discord_file,
-                            ephemeral=True
-                        )
+                    # Large transcripts arrive gzipped, or split into parts by time when still too big
+                    try:
+                        attachments, workdir = await utils.get_transcript_attachments(selected_file, interaction.guild.filesize_limit)
+                    except Exception as e:
+                        log.error(f"Error preparing transcript file '{selected_file}': {e}", extra=context(select_interaction))
+                        await select_interaction.followup.send("❌ Error reading transcript file. It may be corrupted.", ephemeral=True)
+                        return
+                    try:
+                        for part, discord_file in enumerate(attachments, start=1):
+                            counter = f" ({part}/{len(attachments)})" if len(attachments) > 1 else ""
+                            await select_interaction.followup.send(
+                                f"📄 **Transcript: {discord_file.filename}**{counter}",
+                                file=discord_file,
+                                ephemeral=True
+                            )
+                    finally:
+                        await utils.close_transcript_attachments(attachments, workdir)
                             
-                        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Transcript file '{file_name}' sent to {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})")
+                    log.info(f"Transcript file '{selected_file}' sent as {len(attachments)} attachment(s) to {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})", extra=context(interaction))
                 
                 async def on_timeout(self):
                     # Disable all components when timeout occurs
@@ -267,7 +331,7 @@ def setup_commands(bot):
             view = TranscriptSelect()
             embed = discord.Embed(
                 title="📄 Available Transcripts",
-                description=f"Found **{len(transcript_files)}** transcript files for this guild.\nSelect one to view:",
+                description=f"Found **{transcript_count}** transcript files for this guild.\nSelect one to view:",
                 color=0x00ff00
             )
             embed.set_footer(text="Selection expires in 60 seconds")
@@ -275,6 +339,31 @@ def setup_commands(bot):
             await interaction.followup.send(embed=embed, view=view, ephemeral=True)
             return
 
+        if action.lower() == "search":
+            if not query.strip():
+                await interaction.response.send_message("❌ Tell me what to look for: `/kv_transcript search <query>`", ephemeral=True, delete_after=10)
+                return
+            await interaction.response.defer(ephemeral=True)
+            results = await voice_transcriber.search_transcripts(guild_id, query)
+            if not results:
+                await interaction.followup.send(f"❌ Nothing found for '{query}'.", ephemeral=True)
+                return
+
+            embed = discord.Embed(title=f"🔎 Transcript search: {query}"[:256], color=0x00ff00)
+            for before, match, after in results:
+                def format_line(line, bold=False):
+                    text = f"**{line['text']}**" if bold else line['text']
+                    start, end = (datetime.fromtimestamp(line[field]).strftime('%H:%M:%S') for field in ("start_time", "end_time"))
+                    return f"`{start}-{end}` {line['user_name']}: {text}"
+                lines = [format_line(line) for line in before] + [format_line(match, bold=True)] + [format_line(line) for line in after]
+                embed.add_field(
+                    name=datetime.fromtimestamp(match['start_time']).strftime("%Y-%m-%d %H:%M"),
+                    value="\n".join(lines)[:1024],
+                    inline=False
+                )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+
         # transcribe on/off actions
         if not interaction.user.voice or not interaction.user.voice.channel:
             await interaction.response.send_message("You must be in a voice channel.", ephemeral=True, delete_after=5)
@@ -282,13 +371,36 @@ def setup_commands(bot):
         
         voice_client = interaction.guild.voice_client
         if action.lower() == "on":
+            previous_profile = voice_transcriber.get_guild_profile(guild_id)
+            if profile and not voice_transcriber.set_guild_profile(guild_id, profile.lower()):
+                profiles = ", ".join(voice_transcriber.TRANSCRIPTION_PROFILES)
+                await interaction.response.send_message(f"❌ Unknown profile '{profile}'! Available profiles: {profiles}", ephemeral=True, delete_after=10)
+                return
+            if language and not voice_transcriber.set_guild_language(guild_id, language.lower()):
+                await interaction.response.send_message(f"❌ Unknown language '{language}'! Use a language code like pl or en, or auto.", ephemeral=True, delete_after=10)
+                return
             await interaction.response.defer(ephemeral=True)
-            await voice_transcriber.set_transcribing(guild_id, True)
+            if not await voice_transcriber.set_transcribing(guild_id, True):
+                # Nothing changed, the guild keeps its previous profile and model
+                wanted = voice_transcriber.get_guild_profile(guild_id)
+                voice_transcriber.set_guild_profile(guild_id, previous_profile['name'])
+                if wanted['language'] != previous_profile['language']:
+                    voice_transcriber.set_guild_language(guild_id, previous_profile['language'])
+                all_models = voice_transcriber.get_model_stats()
+                await interaction.followup.send(
+                    f"❌ Not enough memory to load the {wanted['model_size']} model "
+                    f"({all_models['memory_mb']:.0f}/{all_models['memory_budget_mb']}MB in use) and no loaded model can transcribe "
+                    f"'{wanted['language']}'. Try the realtime profile, or try again once other servers stop transcribing.",
+                    ephemeral=True)
+                return
             if voice_client:
                 await voice_client.disconnect() 
             voice_client = await interaction.user.voice.channel.connect(cls=voice_recv.VoiceRecvClient)
             await voice_transcriber.start_recording(voice_client, guild_id)
-            await interaction.followup.send("Transcription enabled.", ephemeral=True)
+            model_stats = voice_transcriber.get_model_stats(guild_id)
+            loading = " Model is loading, speech is buffered until it is ready." if model_stats and model_stats['state'] == "loading" else ""
+            guild_profile = voice_transcriber.get_guild_profile(guild_id)
+            await interaction.followup.send(f"Transcription enabled (profile: {guild_profile['name']}, language: {guild_profile['language']}).{loading}", ephemeral=True)
         elif action.lower() == "off":
             await interaction.response.defer(ephemeral=True)
             await voice_transcriber.set_transcribing(guild_id, False)
@@ -298,13 +410,13 @@ def setup_commands(bot):
                 voice_client = await interaction.user.voice.channel.connect()
             await interaction.followup.send("Transcription disabled.", ephemeral=True)
         else:
-            await interaction.response.send_message("Wrong command!\nUsage: /kv_transcript {on/off/status/get}", ephemeral=True, delete_after=15)
+            await interaction.response.send_message("Wrong command!\nUsage: /kv_transcript {on/off/status/get/search}", ephemeral=True, delete_after=15)
 
 #play command (instant play) ----------------------------------------------------------------------------------------------------- play command
     @bot.tree.command(name="kv_play", description="Play a song instantly (stops current music)")
     @app_commands.describe(query="YouTube URL or search query (optional - leave empty to play from queue)")
     async def play(interaction: discord.Interaction, query: str = ""):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_play' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with query: '{query if query else 'empty (play from queue)'}'")
+        log.info(f"Command 'kv_play' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with query: '{query if query else 'empty (play from queue)'}'", extra=context(interaction))
         
         if not interaction.user.voice:
             await interaction.response.send_message("❌ You must be in a voice channel!", ephemeral=True, delete_after=5)
@@ -337,34 +449,52 @@ def setup_commands(bot):
         await interaction.followup.send(embed=embed)
 
 #enqueue command (add to queue) ----------------------------------------------------------------------------------------------------- enqueue command
-    @bot.tree.command(name="kv_enqueue", description="Add a song to the queue")
-    @app_commands.describe(query="YouTube URL or search query")
+    @bot.tree.command(name="kv_enqueue", description="Add songs or a playlist to the queue")
+    @app_commands.describe(query="YouTube URL, playlist or search query; separate several with ;")
     async def enqueue(interaction: discord.Interaction, query: str):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_enqueue' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with query: '{query}'")
+        log.info(f"Command 'kv_enqueue' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with query: '{query}'", extra=context(interaction))
         
         await interaction.response.defer(ephemeral=True)
-        
-        # Add to queue
-        title, uploader = await yt_player.add_to_queue(interaction.guild.id, query)
-        if not title:
-            await interaction.followup.send(f"❌ Failed to load the '{query}'! Please check the URL or search term.")
+
+        async def progress(added, failed, done, total):
+            await interaction.edit_original_response(content=f"⏳ Loading... {done}/{total} queries done, {added} songs added" + (f", {failed} failed" if failed else ""))
+
+        # Add to queue, playlists and several queries are listed concurrently
+        queries = yt_player.split_queries(query)
+        added, positions, failed = await yt_player.enqueue_many(interaction.guild.id, queries, on_progress=progress)
+        if not added:
+            await interaction.edit_original_response(content=f"❌ Failed to load the '{query}'! Please check the URL or search term.")
             return
         
-        queue_pos = len(yt_player.get_queue(interaction.guild.id))
-        embed = discord.Embed(
-            title="📋 Added to Queue",
-            description=f"**{title}**",
-            color=0x00ff00
-        )
-        if uploader:
-            embed.add_field(name="Uploader", value=uploader, inline=True)
-        embed.add_field(name="Position", value=f"#{queue_pos}", inline=True)
-        await interaction.followup.send(embed=embed)
+        if len(added) == 1:
+            embed = discord.Embed(
+                title="📋 Added to Queue",
+                description=f"**{added[0].title}**",
+                color=0x00ff00
+            )
+            if added[0].uploader:
+                embed.add_field(name="Uploader", value=added[0].uploader, inline=True)
+            embed.add_field(name="Position", value=f"#{positions[0]}" if positions[0] else "Playing", inline=True)
+        else:
+            titles = "\n".join(f"{position or '▶'}. **{entry.title}**" for entry, position in zip(added[:5], positions))
+            if len(added) > 5:
+                titles += f"\n... and {len(added) - 5} more songs"
+            embed = discord.Embed(
+                title=f"📋 Added {len(added)} Songs to Queue",
+                description=titles,
+                color=0x00ff00
+            )
+            queued = [position for position in positions if position]
+            if queued:
+                embed.add_field(name="Position", value=f"#{min(queued)}-#{max(queued)}" if len(queued) > 1 else f"#{queued[0]}", inline=True)
+        if failed:
+            embed.add_field(name="Failed", value=f"{len(failed)} unavailable or not found", inline=True)
+        await interaction.edit_original_response(content=None, embed=embed)
 
 #clearqueue command ----------------------------------------------------------------------------------------------------- clearqueue command
     @bot.tree.command(name="kv_clearqueue", description="Clear the music queue")
     async def clearqueue(interaction: discord.Interaction):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_clearqueue' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})")
+        log.info(f"Command 'kv_clearqueue' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})", extra=context(interaction))
         
         guild_id = interaction.guild.id
         queue_list = yt_player.get_queue(guild_id)
@@ -384,7 +514,7 @@ def setup_commands(bot):
 #queue command ----------------------------------------------------------------------------------------------------- queue command
     @bot.tree.command(name="kv_queue", description="Show the current music queue")
     async def queue(interaction: discord.Interaction):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_queue' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})")
+        log.info(f"Command 'kv_queue' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})", extra=context(interaction))
         
         guild_id = interaction.guild.id
         current_title, current_uploader, current_time, duration = yt_player.get_current_song_info(guild_id)
@@ -402,10 +532,10 @@ def setup_commands(bot):
         
         if queue_list:
             queue_text = ""
-            for i, source in enumerate(queue_list[:10]):
-                queue_text += f"{i+1}. **{source.title}**"
-                if source.uploader:
-                    queue_text += f" - {source.uploader}"
+            for i, entry in enumerate(queue_list[:10]):
+                queue_text += f"{i+1}. **{entry.title}**"
+                if entry.uploader:
+                    queue_text += f" - {entry.uploader}"
                 queue_text += "\n"
             
             if len(queue_list) > 10:
@@ -423,7 +553,7 @@ def setup_commands(bot):
 #nowplaying command ----------------------------------------------------------------------------------------------------- nowplaying command
     @bot.tree.command(name="kv_nowplaying", description="Show what's currently playing")
     async def nowplaying(interaction: discord.Interaction):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_nowplaying' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})")
+        log.info(f"Command 'kv_nowplaying' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})", extra=context(interaction))
         
         guild_id = interaction.guild.id
         current_title, current_uploader, current_time, duration = yt_player.get_current_song_info(guild_id)
@@ -452,14 +582,37 @@ def setup_commands(bot):
         else:
             await interaction.response.send_message("❌ Nothing is currently playing!", ephemeral=True, delete_after=5)
 
+#pause command ----------------------------------------------------------------------------------------------------- pause command
+    @bot.tree.command(name="kv_pause", description="Pause the current song")
+    async def pause(interaction: discord.Interaction):
+        log.info(f"Command 'kv_pause' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})", extra=context(interaction))
+        
+        voice_client = interaction.guild.voice_client
+        # The song's stream stays open while paused, speech and background music keep playing
+        if voice_client and audio_mgr.pause_music(voice_client):
+            await interaction.response.send_message("⏸️ Paused the song! Use `/kv_resume` to continue.", delete_after=5)
+        else:
+            await interaction.response.send_message("❌ No song is playing!", ephemeral=True, delete_after=5)
+
+#resume command ----------------------------------------------------------------------------------------------------- resume command
+    @bot.tree.command(name="kv_resume", description="Resume the paused song")
+    async def resume(interaction: discord.Interaction):
+        log.info(f"Command 'kv_resume' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})", extra=context(interaction))
+        
+        voice_client = interaction.guild.voice_client
+        if voice_client and audio_mgr.resume_music(voice_client):
+            await interaction.response.send_message("▶️ Resumed the song!", delete_after=5)
+        else:
+            await interaction.response.send_message("❌ No song is paused!", ephemeral=True, delete_after=5)
+
 #skip command ----------------------------------------------------------------------------------------------------- skip command
     @bot.tree.command(name="kv_skip", description="Skip the current sound/music")
     async def skip(interaction: discord.Interaction):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_skip' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})")
+        log.info(f"Command 'kv_skip' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})", extra=context(interaction))
         
         voice_client = interaction.guild.voice_client
-        if voice_client and voice_client.is_playing():
-            audio_mgr.stop_audio(voice_client)
+        # The mixer keeps the voice client playing background music, only music and speech can be skipped
+        if voice_client and audio_mgr.stop_audio(voice_client):
             await interaction.response.send_message("⏭️ Skipped current sound!", delete_after=5)
         else:
             await interaction.response.send_message("❌ Nothing is playing!", ephemeral=True, delete_after=5)
@@ -467,22 +620,20 @@ def setup_commands(bot):
 #stop command ----------------------------------------------------------------------------------------------------- stop command
     @bot.tree.command(name="kv_stop", description="Stop music and clear queue")
     async def stop_music(interaction: discord.Interaction):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_stop' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})")
+        log.info(f"Command 'kv_stop' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})", extra=context(interaction))
         
         voice_client = interaction.guild.voice_client
-        if voice_client and voice_client.is_playing():
-            yt_player.clear_queue(interaction.guild.id)
-            audio_mgr.stop_audio(voice_client)
+        yt_player.clear_queue(interaction.guild.id)
+        if voice_client and audio_mgr.stop_audio(voice_client):
             await interaction.response.send_message("⏹️ Stopped current sound and cleared queue!", delete_after=5)
         else:
-            yt_player.clear_queue(interaction.guild.id)
             await interaction.response.send_message("❌ Nothing is playing!", ephemeral=True, delete_after=5)
 
 #volume command ----------------------------------------------------------------------------------------------------- volume command
     @bot.tree.command(name="kv_volume", description="Set music volume (0-100)")
     @app_commands.describe(volume="Volume level (0-100)")
     async def volume(interaction: discord.Interaction, volume: int):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_volume' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with volume: {volume}")
+        log.info(f"Command 'kv_volume' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with volume: {volume}", extra=context(interaction))
         
         if not 0 <= volume <= 100:
             await interaction.response.send_message("❌ Volume must be between 0-100!", ephemeral=True, delete_after=15)
@@ -499,7 +650,7 @@ def setup_commands(bot):
     @bot.tree.command(name="kv_background", description="Set background music volume (0-100)")
     @app_commands.describe(volume="Volume level (0-100)")
     async def background(interaction: discord.Interaction, volume: int):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_background' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with volume: {volume}")
+        log.info(f"Command 'kv_background' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with volume: {volume}", extra=context(interaction))
         
         if not 0 <= volume <= 100:
             await interaction.response.send_message("Volume must be between 0-100", ephemeral=True, delete_after=15)
@@ -514,13 +665,13 @@ def setup_commands(bot):
     @bot.tree.command(name="kv_clearchat", description="Delete messages from chat (Admin only)")
     @app_commands.describe(amount="Number of messages to delete (1-100)")
     async def clearchat(interaction: discord.Interaction, amount: int):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_clearchat' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with amount: {amount}")
+        log.info(f"Command 'kv_clearchat' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with amount: {amount}", extra=context(interaction))
         
         # Check permissions
         if not (interaction.user.guild_permissions.administrator or 
                 interaction.user.name == "adbreeker" or
                 interaction.user.id == interaction.guild.owner_id):
-            print(f"[WARNING - {datetime.now().strftime('%H:%M:%S')}] User {interaction.user.name} ({interaction.user.id}) tried to use kv_clearchat without permission")
+            log.warning(f"User {interaction.user.name} ({interaction.user.id}) tried to use kv_clearchat without permission", extra=context(interaction))
             await interaction.response.send_message("❌ You don't have permission to use this command!", ephemeral=True, delete_after=5)
             return
         
@@ -540,7 +691,7 @@ def setup_commands(bot):
             # Delete messages
             deleted = await interaction.channel.purge(limit=amount)
             
-            print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Successfully deleted {len(deleted)} messages in channel {interaction.channel.name} ({interaction.channel.id})")
+            log.info(f"Successfully deleted {len(deleted)} messages in channel {interaction.channel.name} ({interaction.channel.id})", extra=context(interaction))
             
             # Send confirmation
             embed = discord.Embed(
@@ -553,20 +704,63 @@ def setup_commands(bot):
             await interaction.followup.send(embed=embed, ephemeral=True)
             
         except discord.Forbidden:
-            print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Failed to delete messages - Forbidden permission")
+            log.error("Failed to delete messages - Forbidden permission", extra=context(interaction))
             await interaction.followup.send("❌ I don't have permission to delete messages!", ephemeral=True)
         except discord.HTTPException as e:
-            print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] HTTP error during message deletion: {str(e)}")
+            log.error(f"HTTP error during message deletion: {str(e)}", extra=context(interaction))
             await interaction.followup.send(f"❌ Failed to delete messages: {str(e)}", ephemeral=True)
         except Exception as e:
-            print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Unexpected error during message deletion: {str(e)}")
+            log.error(f"Unexpected error during message deletion: {str(e)}", extra=context(interaction))
             await interaction.followup.send(f"❌ An error occurred: {str(e)}", ephemeral=True)
 
+#stats command ----------------------------------------------------------------------------------------------------- stats command
+    @bot.tree.command(name="kv_stats", description="Show performance metrics (Admin only)")
+    async def stats(interaction: discord.Interaction):
+        log.info(f"Command 'kv_stats' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id})", extra=context(interaction))
+
+        # Check permissions
+        if not (interaction.user.guild_permissions.administrator or
+                interaction.user.name == "adbreeker" or
+                interaction.user.id == interaction.guild.owner_id):
+            log.warning(f"User {interaction.user.name} ({interaction.user.id}) tried to use kv_stats without permission", extra=context(interaction))
+            await interaction.response.send_message("❌ You don't have permission to use this command!", ephemeral=True, delete_after=5)
+            return
+
+        def latency(summary, unit="ms", scale=1000):
+            s = summary.stats()
+            if not s["count"]:
+                return "no data"
+            return f"p50 {s['p50'] * scale:.1f}{unit}, p95 {s['p95'] * scale:.1f}{unit}, max {s['max'] * scale:.1f}{unit} ({s['count']:,} samples)"
+
+        embed = discord.Embed(title="📊 Bot Statistics", color=0x00ff00)
+        embed.add_field(name="⏱️ Event loop lag", value=latency(metrics.loop_lag), inline=False)
+
+        frame_rates = voice_transcriber.get_frame_rates(interaction.guild.id)
+        frames = ", ".join(f"{name}: {rate:.0f}/s" for name, rate in sorted(frame_rates.items())) or "nobody is speaking"
+        queue_stats = voice_transcriber.get_queue_stats()
+        embed.add_field(
+            name="🎤 Voice pipeline",
+            value=(
+                f"**Frames:** {frames}\n"
+                f"**Queue:** {queue_stats['queued']} waiting, {queue_stats['running']}/{queue_stats['workers']} workers busy\n"
+                f"**Preprocessing:** {latency(metrics.preprocess_seconds)}\n"
+                f"**Inference:** {latency(metrics.inference_seconds)}\n"
+                f"**Real-time factor:** {latency(metrics.real_time_factor, unit='', scale=1)}"
+            ),
+            inline=False
+        )
+        embed.add_field(name="🎵 yt-dlp extraction", value=latency(metrics.ytdlp_seconds), inline=False)
+        opgg = "\n".join(f"**{tool}:** {latency(opgg_api.request_latency(tool))}"
+                         for tool in ("lol-champion-analysis", "lol-champion-meta-data"))
+        embed.add_field(name="🏆 OP.GG requests", value=opgg, inline=False)
+        embed.set_footer(text="Percentiles over the most recent samples")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
 #lolchampion command ----------------------------------------------------------------------------------------------------- lolchampion command
     @bot.tree.command(name="kv_lolchampion-data", description="Get champion metadata from OP.GG")
     @app_commands.describe(champion="Champion name")
     async def lolchampion(interaction: discord.Interaction, champion: str):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_lolchampion-data' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with champion: '{champion}'")
+        log.info(f"Command 'kv_lolchampion-data' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with champion: '{champion}'", extra=context(interaction))
         
         # Parse and validate inputs
         champion_formatted = champion.upper().replace(' ', '_')
@@ -694,14 +888,14 @@ def setup_commands(bot):
             await interaction.followup.send(embed=embed)
 
         except Exception as e:
-            print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Error in lolchampion command: {str(e)}")
+            log.error(f"Error in lolchampion command: {str(e)}", extra=context(interaction))
             await interaction.followup.send(f"❌ An error occurred: {str(e)}")
 
 #lolchampion command ----------------------------------------------------------------------------------------------------- lolchampion command
     @bot.tree.command(name="kv_lolchampion-analysis", description="Get champion analysis from OP.GG")
     @app_commands.describe(champion="Champion name", lane="Lane (top/jungle/mid/adc/support)")
     async def lolchampion(interaction: discord.Interaction, champion: str, lane: str):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_lolchampion-analysis' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with champion: '{champion}' lane: '{lane}'")
+        log.info(f"Command 'kv_lolchampion-analysis' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with champion: '{champion}' lane: '{lane}'", extra=context(interaction))
         
         # Parse and validate inputs
         champion_formatted = champion.upper().replace(' ', '_')
@@ -895,14 +1089,14 @@ def setup_commands(bot):
                 await interaction.followup.send(embed=embed)
                 
         except Exception as e:
-            print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Error in lolchampion command: {str(e)}")
+            log.error(f"Error in lolchampion command: {str(e)}", extra=context(interaction))
             await interaction.followup.send(f"❌ An error occurred: {str(e)}")
 
 #lolmatchup command ----------------------------------------------------------------------------------------------------- lolmatchup command  
     @bot.tree.command(name="kv_lolmatchup", description="Get champion matchup information (counters)")
     @app_commands.describe(champion="Champion name", lane="Lane (top/jungle/mid/adc/support)")
     async def lolmatchup(interaction: discord.Interaction, champion: str, lane: str):
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Command 'kv_lolmatchup' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with champion: '{champion}' lane: '{lane}'")
+        log.info(f"Command 'kv_lolmatchup' used by {interaction.user.name} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) with champion: '{champion}' lane: '{lane}'", extra=context(interaction))
         
         # Parse and validate inputs
         champion_formatted = champion.upper().replace(' ', '_')
@@ -972,5 +1166,5 @@ def setup_commands(bot):
                 await interaction.followup.send(embed=embed)
                 
         except Exception as e:
-            print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Error in lolmatchup command: {str(e)}")
+            log.error(f"Error in lolmatchup command: {str(e)}", extra=context(interaction))
             await interaction.followup.send(f"❌ An error occurred: {str(e)}")
\ No newline at end of file
@@ -1,9 +1,11 @@
+import logging
 import discord
 import asyncio
 import components.voice_transcriber as voice_transcriber
 from components.audio_manager import play_background, say_text
 import components.utilis as utils
-from datetime import datetime
+
+log = logging.getLogger(__name__)
 
 def setup_events(bot):
     @bot.event
@@ -37,14 +39,14 @@ def setup_events(bot):
                 if message.author.id == bot.user.id:
                     user = bot.get_user(payload.user_id)
                     await message.delete()
-                    print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Message deleted by {user.name} via reaction in {channel.name}")
+                    log.info(f"Message deleted by {user.name} via reaction in {channel.name}")
                     
             except discord.errors.NotFound:
-                print(f"[WARNING - {datetime.now().strftime('%H:%M:%S')}] Message already deleted")
+                log.warning("Message already deleted")
             except discord.errors.Forbidden:
-                print(f"[WARNING - {datetime.now().strftime('%H:%M:%S')}] Cannot delete message - missing permissions")
+                log.warning("Cannot delete message - missing permissions")
             except Exception as e:
-                print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Error deleting message via reaction: {e}")
+                log.error(f"Error deleting message via reaction: {e}")
 
     @bot.event
     async def on_voice_state_update(member, before, after):
@@ -54,7 +56,7 @@ def setup_events(bot):
         # bot state changes
         if member == bot.user:
             if after.channel is not None:
-                print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] {member.name} joined {voice_client.channel.name}")
+                log.info(f"{member.name} joined {voice_client.channel.name}")
                 # Wait until the bot is fully connected to voice
                 while not voice_client.is_connected():
                     await asyncio.sleep(0.1)
@@ -62,14 +64,14 @@ def setup_events(bot):
                 bot.loop.create_task(play_background(voice_client))
 
             if after.channel is None and voice_client:
-                print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] {member.name} left from {voice_client.channel.name}")
+                log.info(f"{member.name} left from {voice_client.channel.name}")
                 if voice_transcriber.is_transcribing(guild_id):
                     await voice_transcriber.stop_recording(voice_client, guild_id)
 
         # user state changes
         elif member is not bot.user:
             if voice_client and after.channel is voice_client.channel and after.channel is not None:
-                print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] {member.name} joined {after.channel.name}")
+                log.info(f"{member.name} joined {after.channel.name}")
                 await asyncio.sleep(0.5)
                 await say_text(voice_client, utils.get_greeting(member), 'en')
                 
@@ -0,0 +1,165 @@
+"""Logging setup shared by the bot and all components.
+
+Log calls only put the record on a queue (QueueHandler), a QueueListener thread
+does the formatting and the console/file I/O, so logging never blocks the event
+loop or the voice threads. Two outputs:
+
+- the console, in the usual "[INFO - HH:MM:SS] message" format (discord.py's own
+  records only from WARNING up)
+- logs/bot.jsonl, one JSON object per record with the guild/user/channel/command
+  fields passed through extra=context(...), rotated by size
+
+Levels are set per logger, LOG_LEVELS in .env overrides them, e.g.
+LOG_LEVELS=discord=DEBUG,components.audio_manager=WARNING.
+
+High-frequency messages can be sampled: a record logged with
+extra={"sample": key} is emitted at most once per SAMPLE_INTERVAL seconds per key,
+the next emitted one says how many were suppressed in between.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+LOG_DIR = "logs"
+LOG_FILE = "bot.jsonl"
+MAX_BYTES = 10 * 1024 * 1024  # rotate the JSON log at this size
+BACKUP_COUNT = 5  # rotated files kept
+SAMPLE_INTERVAL = 60.0  # seconds between two emitted records of the same sample key
+CONSOLE_FORMAT = "[%(levelname)s - %(asctime)s] %(message)s"
+
+DEFAULT_LEVELS = {
+    "": logging.INFO,
+    "discord": logging.INFO,
+    "discord.gateway": logging.WARNING,  # heartbeats and reconnects
+    "discord.http": logging.WARNING,
+}
+
+CONTEXT_FIELDS = ("guild_id", "user_id", "channel_id", "command")
+
+_listener = None
+
+
+def context(interaction=None, **fields):
+    """extra= fields for a log record, taken from a discord interaction and/or given explicitly"""
+    if interaction is not None:
+        fields.setdefault("guild_id", interaction.guild_id)
+        fields.setdefault("user_id", interaction.user.id)
+        if interaction.command is not None:
+            fields.setdefault("command", interaction.command.name)
+    return fields
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and the context fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Let through one record per `sample` key every `interval` seconds"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__()
+        self.interval = interval
+        self._last = {}  # key: (last emitted monotonic time, records suppressed since)
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, "sample", None)
+        if key is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._last.get(key, (None, 0))
+            if last is not None and now - last < self.interval:
+                self._last[key] = (last, suppressed + 1)
+                return False
+            self._last[key] = (now, 0)
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar message(s) suppressed)"
+            record.args = None
+        return True
+
+
+class _ConsoleFilter(logging.Filter):
+    """Keep discord.py's chatter out of the console, it still goes to the JSON log"""
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or not record.name.startswith("discord")
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.rpartition("=")
+        levels["" if name in ("root", "") else name] = level.strip().upper()
+    return levels
+
+
+def setup_logging(log_dir=LOG_DIR, console=True, levels=None):
+    """Route all logging through a queue to the console and a rotating JSON-lines file.
+
+    Safe to call more than once, only the first call configures anything.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    os.makedirs(log_dir, exist_ok=True)
+
+    handlers = []
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT, datefmt="%H:%M:%S"))
+        console_handler.addFilter(_ConsoleFilter())
+        handlers.append(console_handler)
+    file_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(log_dir, LOG_FILE), maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8")
+    file_handler.setFormatter(JsonFormatter())
+    handlers.append(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # Dropped records never reach the queue
+    queue_handler.addFilter(SamplingFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    all_levels = dict(DEFAULT_LEVELS)
+    all_levels.update(levels or {})
+    all_levels.update(_parse_levels(os.getenv("LOG_LEVELS", "")))
+    for name, level in all_levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush the queue and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+EXTRACT_WORKERS = 4  # yt-dlp extractions running at once
+EXTRACT_INTERVAL = 0.25  # seconds between the starts of two extractions
+
+
+class ExtractionPool:
+    """Runs blocking yt-dlp calls on a few dedicated threads, rate limited.
+
+    At most `workers` calls run at once and their starts are spaced at least
+    `min_interval` seconds apart, so a 50-song playlist neither floods YouTube
+    nor takes every thread of the default executor the rest of the bot uses.
+    Calls are started in the order they were submitted; a call whose caller was
+    cancelled before it started is skipped.
+
+    `per_thread(key, factory)` keeps one object per worker thread (a YoutubeDL
+    instance is not safe to share between threads).
+    """
+
+    def __init__(self, workers=EXTRACT_WORKERS, min_interval=EXTRACT_INTERVAL):
+        self.workers = workers
+        self.min_interval = min_interval
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="yt-dlp")
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+        self._queued = 0
+        self._running = 0
+        self._local = threading.local()
+
+    def _wait_turn(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def _call(self, func, claimed):
+        self._wait_turn()
+        with self._lock:
+            if claimed.is_set():
+                return None  # the caller was cancelled while this waited, nobody wants the result
+            claimed.set()
+            self._queued -= 1
+            self._running += 1
+        try:
+            return func()
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    async def run(self, func):
+        """Await func() on one of the pool's threads"""
+        claimed = threading.Event()  # set by whichever side takes the call off the queued count
+        with self._lock:
+            self._queued += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, func, claimed)
+        finally:
+            with self._lock:
+                if not claimed.is_set():
+                    # Cancelled before the call started, it is skipped (or never picked up)
+                    claimed.set()
+                    self._queued -= 1
+
+    def per_thread(self, key, factory):
+        """The calling worker thread's own object for `key`, made by factory() on first use"""
+        objects = self._local.__dict__.setdefault("objects", {})
+        if key not in objects:
+            objects[key] = factory()
+        return objects[key]
+
+    def get_stats(self):
+        with self._lock:
+            return {"queued": self._queued, "running": self._running}
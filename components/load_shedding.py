@@ -0,0 +1,108 @@
+import logging
+import threading
+from components.transcription_profiles import TRANSCRIPTION_PROFILES
+from components.bot_logging import context
+import components.metrics as metrics
+
+log = logging.getLogger(__name__)
+
+MAX_QUEUED_SECONDS = 120.0  # audio per guild waiting for a transcription worker before utterances are dropped
+SKIP_BEAM_AT = 0.5  # share of the budget queued from which decoding is greedy
+DOWNGRADE_AT = 0.75  # share of the budget queued from which the fastest profile's settings are used
+SHED_STRATEGIES = ("skip_beam", "downgrade", "drop_shortest")
+FAST_PROFILE = "realtime"
+GREEDY_OPTIONS = {"beam_size": 1, "best_of": 1, "patience": 1.0}
+
+degraded_total = metrics.counter("transcription_utterances_degraded", "Utterances transcribed with a cheaper profile under load")
+dropped_total = metrics.counter("transcription_utterances_dropped", "Queued utterances dropped over the queue budget")
+
+
+class LoadShedder:
+    """Backpressure policy for the transcription queue, per guild.
+
+    The load of a guild is the audio it has waiting for a transcription worker,
+    as a share of `max_queued_seconds`. The more of the budget is used, the
+    cheaper the next utterances are transcribed:
+
+    - "skip_beam": from `skip_beam_at`, greedy decoding instead of beam search
+    - "downgrade": from `downgrade_at`, the `fast_profile` settings (greedy, no
+      second VAD pass) on the model that is already loaded
+    - "drop_shortest": over the budget, queued utterances are dropped shortest
+      first until the rest fits; short ones carry the least speech per job
+
+    Only the strategies listed in `strategies` are applied. Counts of degraded and
+    dropped utterances are kept per guild for /kv_transcript status.
+    """
+
+    def __init__(self, max_queued_seconds=MAX_QUEUED_SECONDS, strategies=SHED_STRATEGIES, fast_profile=FAST_PROFILE,
+                 skip_beam_at=SKIP_BEAM_AT, downgrade_at=DOWNGRADE_AT):
+        self.max_queued_seconds = max_queued_seconds
+        self.strategies = tuple(strategies)
+        self.fast_profile = fast_profile
+        self.skip_beam_at = skip_beam_at
+        self.downgrade_at = downgrade_at
+        self._lock = threading.Lock()
+        self._degraded = {}  # guild_id: utterances transcribed with a cheaper profile
+        self._dropped = {}  # guild_id: (utterances, audio seconds) dropped
+
+    def strategy(self, queued_seconds):
+        """Which degradation applies at this much queued audio, None for the full profile"""
+        load = queued_seconds / self.max_queued_seconds
+        if "downgrade" in self.strategies and self.fast_profile in TRANSCRIPTION_PROFILES and load >= self.downgrade_at:
+            return "downgrade"
+        if "skip_beam" in self.strategies and load >= self.skip_beam_at:
+            return "skip_beam"
+        return None
+
+    def degrade(self, guild_id, profile, queued_seconds, count=1):
+        """The profile to transcribe `count` utterances of the guild with at the current load"""
+        strategy = self.strategy(queued_seconds)
+        if strategy == "downgrade" and profile["name"] != self.fast_profile:
+            fast = TRANSCRIPTION_PROFILES[self.fast_profile]
+            profile = dict(profile, name=f"{profile['name']}>{self.fast_profile}", options=fast["options"],
+                           vad_filter=fast["vad_filter"], vad_parameters=fast["vad_parameters"])
+        elif strategy is not None and profile["options"].get("beam_size", 1) > 1:
+            profile = dict(profile, name=f"{profile['name']}>greedy", options={**profile["options"], **GREEDY_OPTIONS})
+        else:
+            return profile
+        with self._lock:
+            self._degraded[guild_id] = self._degraded.get(guild_id, 0) + count
+        degraded_total.inc(count)
+        return profile
+
+    def pick_drops(self, guild_id, queued):
+        """Of a guild's queued (job, audio_seconds), the jobs to drop to get back under the budget"""
+        if "drop_shortest" not in self.strategies:
+            return []
+        excess = sum(seconds for _, seconds in queued) - self.max_queued_seconds
+        drops = []
+        dropped_seconds = 0.0
+        for job, seconds in sorted(queued, key=lambda item: item[1]):
+            if excess <= 0:
+                break
+            drops.append(job)
+            dropped_seconds += seconds
+            excess -= seconds
+        if drops:
+            with self._lock:
+                count, total = self._dropped.get(guild_id, (0, 0.0))
+                self._dropped[guild_id] = (count + len(drops), total + dropped_seconds)
+            dropped_total.inc(len(drops))
+            log.warning(f"Transcription over its {self.max_queued_seconds:.0f}s queue budget, dropped {len(drops)} "
+                        f"utterance(s) ({dropped_seconds:.1f}s of audio)",
+                        extra=context(guild_id=guild_id, sample=f"shed:{guild_id}"))
+        return drops
+
+    def get_stats(self, guild_id):
+        with self._lock:
+            dropped, dropped_seconds = self._dropped.get(guild_id, (0, 0.0))
+            return {
+                "degraded": self._degraded.get(guild_id, 0),
+                "dropped": dropped,
+                "dropped_seconds": dropped_seconds,
+            }
+
+    def reset(self, guild_id):
+        with self._lock:
+            self._degraded.pop(guild_id, None)
+            self._dropped.pop(guild_id, None)
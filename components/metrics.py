@@ -0,0 +1,294 @@
+"""In-process metrics for the event loop, the voice pipeline and outbound requests.
+
+Metrics live in a module-level registry keyed by name and labels. Summaries keep
+their last SAMPLE_WINDOW observations for percentiles plus a running count and sum,
+rate meters count events per key over a sliding window, and gauges are either set
+directly or read from a callback when the metrics are rendered. Everything is thread
+safe, the voice receive thread and the transcription workers record from outside the
+event loop.
+
+The numbers are shown by /kv_stats and, when METRICS_PORT is set in .env, served in
+the Prometheus text format on http://127.0.0.1:<port>/metrics.
+"""
+import logging
+import asyncio
+import contextlib
+import math
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+SAMPLE_WINDOW = 1024  # recent observations a summary keeps for its percentiles
+QUANTILES = (0.5, 0.95, 0.99)
+LOOP_LAG_INTERVAL = 0.25  # seconds between event loop lag probes
+RATE_WINDOW = 5.0  # seconds a rate meter averages over
+
+_registry = {}  # (name, labels): metric
+_registry_lock = threading.Lock()
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Summary:
+    """Latency-style observations: count, sum and percentiles of the recent ones"""
+
+    kind = "summary"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.count = 0
+        self.total = 0.0
+        self._samples = deque(maxlen=SAMPLE_WINDOW)
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self._samples.append(value)
+
+    @contextlib.contextmanager
+    def time(self):
+        """Observe the duration of the block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def stats(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total = self.count, self.total
+        result = {"count": count, "sum": total, "avg": total / count if count else 0.0,
+                  "max": samples[-1] if samples else 0.0}
+        for q in QUANTILES:
+            result[f"p{round(q * 100)}"] = samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+        return result
+
+    def samples(self):
+        stats = self.stats()
+        for q in QUANTILES:
+            yield "", {"quantile": str(q)}, stats[f"p{round(q * 100)}"]
+        yield "_sum", {}, stats["sum"]
+        yield "_count", {}, stats["count"]
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        yield "", {}, self.value
+
+
+class Gauge:
+    """A current value, set() directly or read from `func` whenever it is rendered"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), func=None):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.func = func
+        self._value = 0.0
+
+    def set(self, value):
+        self._value = value
+
+    @property
+    def value(self):
+        if self.func is not None:
+            try:
+                return self.func()
+            except Exception:
+                return math.nan
+        return self._value
+
+    def samples(self):
+        yield "", {}, self.value
+
+
+class RateMeter:
+    """Events per second per key (e.g. frames per speaker), averaged over `window` seconds.
+
+    mark() is cheap enough for every received voice frame. Keys that stopped marking
+    for a whole window are dropped.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, help, label_names, labels=(), window=RATE_WINDOW):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.labels = labels
+        self.window = window
+        self._meters = {}  # key: [window_start, count, last_mark, rate]
+        self._lock = threading.Lock()
+
+    def mark(self, key):
+        now = time.monotonic()
+        with self._lock:
+            meter = self._meters.get(key)
+            if meter is None:
+                self._meters[key] = [now, 1, now, None]
+                return
+            elapsed = now - meter[0]
+            if elapsed >= self.window:
+                meter[3] = meter[1] / elapsed
+                meter[0] = now
+                meter[1] = 0
+            meter[1] += 1
+            meter[2] = now
+
+    def rates(self):
+        """key: events per second, for the keys that are still active"""
+        now = time.monotonic()
+        result = {}
+        with self._lock:
+            for key, (start, count, last_mark, rate) in list(self._meters.items()):
+                if now - last_mark > self.window:
+                    del self._meters[key]
+                    continue
+                elapsed = now - start
+                if rate is None or elapsed >= self.window:
+                    # A key seen for less than a second would report bursts as huge rates
+                    rate = count / max(elapsed, 1.0)
+                result[key] = rate
+        return result
+
+    def samples(self):
+        for key, rate in self.rates().items():
+            yield "", dict(zip(self.label_names, key if isinstance(key, tuple) else (key,))), rate
+
+
+def _get_or_create(cls, name, help, labels, **kwargs):
+    label_key = _label_key(labels)
+    with _registry_lock:
+        metric = _registry.get((name, label_key))
+        if metric is None:
+            metric = _registry[(name, label_key)] = cls(name, help, labels=label_key, **kwargs)
+        return metric
+
+
+def summary(name, help, **labels):
+    return _get_or_create(Summary, name, help, labels)
+
+
+def counter(name, help, **labels):
+    return _get_or_create(Counter, name, help, labels)
+
+
+def gauge(name, help, func=None, **labels):
+    return _get_or_create(Gauge, name, help, labels, func=func)
+
+
+def rate_meter(name, help, label_names, window=RATE_WINDOW):
+    return _get_or_create(RateMeter, name, help, {}, label_names=label_names, window=window)
+
+
+# Metrics shared by several modules
+loop_lag = summary("event_loop_lag_seconds", "How late the event loop woke up from a sleep")
+voice_frames = rate_meter("voice_frames_per_second", "Voice frames received per speaker", ("user_id", "guild_id"))
+preprocess_seconds = summary("transcription_preprocess_seconds", "Time to resample and filter an utterance")
+inference_seconds = summary("transcription_inference_seconds", "Whisper time per utterance (per batch when batched)")
+real_time_factor = summary("transcription_real_time_factor", "Preprocessing plus inference time per second of audio")
+ytdlp_seconds = summary("ytdlp_extract_seconds", "yt-dlp extract_info latency")
+
+
+def observe_transcription(audio_seconds, preprocess_times, inference):
+    """Record one transcription call over audio_seconds of speech.
+
+    preprocess_times holds the preprocessing time of each utterance in the call (one
+    for a single utterance, several for a batch).
+    """
+    for preprocess in preprocess_times:
+        preprocess_seconds.observe(preprocess)
+    inference_seconds.observe(inference)
+    if audio_seconds > 0:
+        real_time_factor.observe((sum(preprocess_times) + inference) / audio_seconds)
+
+
+async def _monitor_loop_lag(interval):
+    while True:
+        before = time.perf_counter()
+        await asyncio.sleep(interval)
+        loop_lag.observe(max(0.0, time.perf_counter() - before - interval))
+
+
+_loop_monitor = None
+
+
+def start_loop_monitor(interval=LOOP_LAG_INTERVAL):
+    """Start probing the running event loop's lag (once, later calls are ignored)"""
+    global _loop_monitor
+    if _loop_monitor is None or _loop_monitor.done():
+        _loop_monitor = asyncio.get_running_loop().create_task(_monitor_loop_lag(interval))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda metric: metric.name)
+    lines = []
+    described = set()
+    for metric in metrics:
+        if metric.name not in described:
+            described.add(metric.name)
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for suffix, extra_labels, value in metric.samples():
+            labels = metric.labels + tuple(extra_labels.items())
+            value = value if isinstance(value, int) else float(value)
+            lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {value!r}")
+    return "\n".join(lines) + "\n"
+
+
+_http_runner = None
+
+
+async def start_http_server(port, host="127.0.0.1"):
+    """Serve render_prometheus() on http://host:port/metrics (once, later calls are ignored)"""
+    global _http_runner
+    if _http_runner is not None:
+        return
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(text=render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    _http_runner = runner
+    log.info(f"Serving metrics on http://{host}:{port}/metrics")
@@ -0,0 +1,266 @@
+import logging
+import asyncio
+import contextlib
+import os
+import resource
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+IDLE_GRACE_SECONDS = 300  # how long an unused model stays loaded for the next /kv_transcript on
+MEMORY_BUDGET_MB = 6000  # models are evicted (least recently used first) to stay under this
+
+# Rough resident size of a model in float16, used to plan evictions before a model was ever loaded
+ESTIMATED_MEMORY_MB = {"tiny": 150, "base": 300, "small": 700, "medium": 1800, "turbo": 1900, "large-v3": 3500}
+COMPUTE_TYPE_FACTOR = {"int8": 0.5, "int8_float16": 0.6, "int8_float32": 0.6, "float16": 1.0, "float32": 2.0}
+
+
+def rss_bytes(pid="self"):
+    """Resident memory of a process, this one by default (current on Linux, peak elsewhere)"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        if pid != "self":
+            return 0
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def estimate_memory_mb(spec):
+    """Expected resident size of a (model_size, device, compute_type) spec"""
+    model_size, _, compute_type = spec
+    base = ESTIMATED_MEMORY_MB.get(model_size.removesuffix(".en"), 2000)
+    return base * COMPUTE_TYPE_FACTOR.get(compute_type, 1.0)
+
+
+class _ModelEntry:
+    __slots__ = ("spec", "estimate_mb", "model", "state", "guilds", "in_use", "cond",
+                 "task", "idle_handle", "load_seconds", "memory_bytes")
+
+    def __init__(self, spec, estimate_mb):
+        self.spec = spec
+        self.estimate_mb = estimate_mb  # used until the load measured the real size
+        self.model = None
+        self.state = "loading"  # loading, ready, idle or failed
+        self.guilds = set()  # guild_ids currently using the model
+        self.in_use = 0  # transcriptions running with the model
+        self.cond = threading.Condition()
+        self.task = None
+        self.idle_handle = None
+        self.load_seconds = None
+        self.memory_bytes = None  # resident memory the load added
+
+    def memory_mb(self):
+        if self.memory_bytes:
+            return self.memory_bytes / 2**20
+        return self.estimate_mb
+
+
+class ModelManager:
+    """Registry of loaded Whisper models, keyed by spec, and their lifecycle.
+
+    Guilds acquire() the model spec they need and release() it when they stop.
+    Loading runs in an executor (one load at a time) so the event loop keeps serving
+    commands. use() never waits for a load, the caller holds the guild's audio back
+    until the task acquire() returned is done. A model nobody uses stays loaded as a warm
+    standby for `idle_grace` seconds. Loading a model that would exceed
+    `memory_budget_mb` first evicts unused models, least recently used first; when
+    everything loaded is in use the guild shares the most recently used model its
+    `can_share(spec)` accepts instead, and is refused when there is none.
+
+    `load(spec)` builds a model in a worker thread. `free(spec)` runs in an executor
+    after the last transcription using an unloaded model finished, so it can be collected.
+    A model's memory is what `memory()` (bytes, this process's RSS by default) grew by
+    while it loaded; when models live in other processes, `memory` has to cover them
+    and `copies` says how many copies of each model are loaded.
+    """
+
+    def __init__(self, load, free, idle_grace=IDLE_GRACE_SECONDS, memory_budget_mb=MEMORY_BUDGET_MB,
+                 memory=rss_bytes, copies=1):
+        self._load = load
+        self._free = free
+        self._memory = memory
+        self.copies = copies
+        self.idle_grace = idle_grace
+        self.memory_budget_mb = memory_budget_mb
+        self._models = OrderedDict()  # spec: _ModelEntry, least recently used first
+        self._guild_specs = {}  # guild_id: spec of the model the guild is routed to
+        self._load_lock = None  # asyncio.Lock, created on the loop on first use
+
+    def acquire(self, guild_id, spec, can_share=lambda spec: True):
+        """Reference a model for a guild, loading it in the background.
+
+        Returns a task that resolves to True once the guild's model is ready, None when
+        spec does not fit the budget and no loaded model passes can_share(spec); the
+        guild then keeps the model it had. Must be called from the event loop.
+        """
+        previous = self._guild_specs.get(guild_id)
+        entry = self._models.get(spec)
+        if entry is None and not self._fits(spec, guild_id):
+            # Evicting would not be enough, keep the warm models and share one
+            entry = next((entry for entry in reversed(self._models.values()) if can_share(entry.spec)), None)
+            if entry is None:
+                log.warning(f"Model {spec} does not fit the {self.memory_budget_mb}MB budget and no loaded model can stand in for it")
+                return None
+            log.warning(f"Model {spec} does not fit the {self.memory_budget_mb}MB budget, using loaded model {entry.spec} instead")
+        if previous is not None and previous != (entry.spec if entry is not None else spec):
+            self.release(guild_id)
+
+        if entry is None:
+            self._make_room(spec)
+            entry = self._models[spec] = _ModelEntry(spec, estimate_memory_mb(spec) * self.copies)
+            entry.task = asyncio.ensure_future(self._load_entry(entry))
+        self._models.move_to_end(entry.spec)
+        self._cancel_idle(entry)
+        entry.guilds.add(guild_id)
+        if entry.state == "idle":
+            entry.state = "ready"
+        self._guild_specs[guild_id] = entry.spec
+        return entry.task
+
+    def release(self, guild_id):
+        """Drop a guild's reference, an unused model is freed after the idle grace period"""
+        entry = self._models.get(self._guild_specs.get(guild_id))
+        if entry is None:
+            return
+        entry.guilds.discard(guild_id)
+        if not entry.guilds and entry.state == "ready":
+            self._start_idle(entry)
+
+    @contextlib.contextmanager
+    def use(self, guild_id):
+        """Worker threads: the guild's model for the duration of the block.
+
+        None if the guild has no model or it is still loading, this never blocks.
+        """
+        entry = self._models.get(self._guild_specs.get(guild_id))
+        model = None
+        if entry is not None:
+            with entry.cond:
+                model = entry.model
+                if model is not None:
+                    entry.in_use += 1
+        try:
+            yield model
+        finally:
+            if model is not None:
+                with entry.cond:
+                    entry.in_use -= 1
+                    entry.cond.notify_all()
+
+    def loaded_specs(self):
+        """Specs of every model loaded or loading, safe to call from any thread"""
+        return list(self._models)
+
+    def guild_spec(self, guild_id):
+        """Spec of the model a guild's utterances are routed to"""
+        return self._guild_specs.get(guild_id)
+
+    def get_stats(self):
+        models = [{
+            "spec": entry.spec,
+            "state": entry.state,
+            "guilds": len(entry.guilds),
+            "load_seconds": entry.load_seconds,
+            "memory_mb": entry.memory_mb(),
+        } for entry in reversed(self._models.values())]
+        return {
+            "models": models,
+            "memory_mb": sum(model["memory_mb"] for model in models),
+            "memory_budget_mb": self.memory_budget_mb,
+        }
+
+    def model_stats(self, guild_id):
+        """get_stats() entry of the guild's model, None if it has none"""
+        spec = self._guild_specs.get(guild_id)
+        return next((model for model in self.get_stats()["models"] if model["spec"] == spec), None)
+
+    def _fits(self, spec, guild_id):
+        """Whether spec fits the budget once unused models (or ones only guild_id uses) are evicted.
+
+        A model larger than the whole budget still loads when no other model is in use.
+        """
+        needed = estimate_memory_mb(spec) * self.copies
+        kept = sum(entry.memory_mb() for entry in self._models.values()
+                   if entry.guilds - {guild_id} or entry.state == "loading")
+        return not kept or kept + needed <= self.memory_budget_mb
+
+    def _make_room(self, spec):
+        """Evict unused models, least recently used first, until spec fits the budget"""
+        needed = estimate_memory_mb(spec) * self.copies
+        used = sum(entry.memory_mb() for entry in self._models.values())
+        for entry in [entry for entry in self._models.values() if not entry.guilds and entry.state != "loading"]:
+            if used + needed <= self.memory_budget_mb:
+                break
+            used -= entry.memory_mb()
+            self._unload(entry)
+
+    def _get_load_lock(self):
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        return self._load_lock
+
+    async def _load_entry(self, entry):
+        # One load at a time so the resident memory difference belongs to this model
+        async with self._get_load_lock():
+            log.info(f"Loading Whisper model {entry.spec} in the background")
+            loop = asyncio.get_running_loop()
+            rss_before = self._memory()
+            start = time.perf_counter()
+            try:
+                model = await loop.run_in_executor(None, self._load, entry.spec)
+            except Exception as e:
+                log.error(f"Failed to load Whisper model {entry.spec}: {e}")
+                entry.state = "failed"
+                if self._models.get(entry.spec) is entry:
+                    del self._models[entry.spec]
+                return False
+            with entry.cond:
+                entry.model = model
+            entry.load_seconds = time.perf_counter() - start
+            entry.memory_bytes = max(0, self._memory() - rss_before)
+            entry.state = "ready"
+            log.info(f"Whisper model {entry.spec} loaded in {entry.load_seconds:.1f}s (+{entry.memory_bytes / 2**20:.0f}MB resident)")
+            if not entry.guilds:
+                # Everyone left while it was loading
+                self._start_idle(entry)
+            return True
+
+    def _start_idle(self, entry):
+        entry.state = "idle"
+        self._cancel_idle(entry)
+        loop = asyncio.get_running_loop()
+        entry.idle_handle = loop.call_later(self.idle_grace, self._unload_if_idle, entry)
+
+    def _cancel_idle(self, entry):
+        if entry.idle_handle is not None:
+            entry.idle_handle.cancel()
+            entry.idle_handle = None
+
+    def _unload_if_idle(self, entry):
+        entry.idle_handle = None
+        if not entry.guilds and self._models.get(entry.spec) is entry:
+            self._unload(entry)
+
+    def _unload(self, entry):
+        """Forget a model, it is freed once the transcriptions still using it finished"""
+        self._cancel_idle(entry)
+        del self._models[entry.spec]
+        for guild_id, spec in list(self._guild_specs.items()):
+            if spec == entry.spec:
+                del self._guild_specs[guild_id]
+        with entry.cond:
+            entry.model = None
+        log.info(f"Unloading Whisper model {entry.spec}")
+        asyncio.get_running_loop().run_in_executor(None, self._free_when_unused, entry)
+
+    def _free_when_unused(self, entry):
+        try:
+            with entry.cond:
+                entry.cond.wait_for(lambda: entry.in_use == 0)
+            self._free(entry.spec)
+            log.info(f"Whisper model {entry.spec} unloaded successfully")
+        except Exception as e:
+            log.error(f"Critical error during model unloading: {e}")
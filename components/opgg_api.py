@@ -3,6 +3,12 @@ import asyncio
 from typing import List, Dict, Optional
 import json
 import re
+import time
+import components.metrics as metrics
+
+def request_latency(tool):
+    """Latency metric of requests to one OP.GG MCP tool"""
+    return metrics.summary("opgg_request_seconds", "OP.GG API request latency", tool=tool)
 
 class OpGGAPI:
     def __init__(self):
@@ -36,6 +42,7 @@ class OpGGAPI:
             "User-Agent": "DiscordBot/1.0"
         }
         
+        start = time.perf_counter()
         try:
             async with self.session.post(self.base_url, json=payload, headers=headers) as response:
                 if response.status == 200:
@@ -57,6 +64,8 @@ class OpGGAPI:
         
         except (aiohttp.ClientError, json.JSONDecodeError) as e:
             return {"error": f"API error: {str(e)}"}
+        finally:
+            request_latency(payload["params"]["name"]).observe(time.perf_counter() - start)
 
     async def get_champion_metadata(self, champion_name: str) -> Dict:
         payload = {
@@ -75,6 +84,7 @@ class OpGGAPI:
             "User-Agent": "DiscordBot/1.0"
         }
         
+        start = time.perf_counter()
         try:
             async with self.session.post(self.base_url, json=payload, headers=headers) as response:
                 if response.status == 200:
@@ -96,6 +106,8 @@ class OpGGAPI:
         
         except (aiohttp.ClientError, json.JSONDecodeError) as e:
             return {"error": f"API error: {str(e)}"}
+        finally:
+            request_latency(payload["params"]["name"]).observe(time.perf_counter() - start)
 
 class ChampionAnalyzer:
     def __init__(self, data: Dict):
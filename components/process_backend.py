@@ -0,0 +1,219 @@
+"""Out-of-process transcription backend.
+
+Preprocessing and inference run in worker processes that each hold their own
+model, so they neither compete with the event loop and the voice threads for the
+GIL nor take the bot down when native code crashes. PCM is handed over through
+multiprocessing.shared_memory instead of being pickled, results come back over a
+per-process queue, and a worker that dies is replaced by a fresh one.
+"""
+import logging
+import gc
+import importlib
+import multiprocessing
+import queue
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from components.model_manager import rss_bytes
+
+log = logging.getLogger(__name__)
+
+MAX_MODELS_PER_PROCESS = None  # None keeps every model the ModelManager loaded until it unloads it (by its memory budget)
+RESULT_POLL_SECONDS = 1.0  # how often a waiting thread checks that its worker is still alive
+DEFAULT_LOADER = "components.process_backend:load_whisper_model"
+
+
+def load_whisper_model(spec):
+    from faster_whisper import WhisperModel
+    model_size, device, compute_type = spec
+    return WhisperModel(model_size, device=device, compute_type=compute_type)
+
+
+def _resolve(qualified_name):
+    module_name, _, attribute = qualified_name.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def _worker_main(loader_name, tasks, results, max_models):
+    """Worker process: load models and transcribe PCM from shared memory until told to stop"""
+    from components.audio_preprocessing import preprocess_pcm
+
+    loader = _resolve(loader_name)
+    models = OrderedDict()  # spec: model
+
+    def get_model(spec):
+        if spec not in models:
+            while max_models is not None and len(models) >= max_models:
+                models.popitem(last=False)
+                gc.collect()
+            models[spec] = loader(spec)
+        models.move_to_end(spec)
+        return models[spec]
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        kind, job_id, spec = task[:3]
+        try:
+            if kind == "load":
+                get_model(spec)
+                results.put((job_id, None))
+            elif kind == "unload":
+                if models.pop(spec, None) is not None:
+                    gc.collect()
+                results.put((job_id, None))
+            elif kind == "transcribe":
+                shm_name, nbytes, options = task[3:]
+                start = time.perf_counter()
+                shm = shared_memory.SharedMemory(name=shm_name)
+                try:
+                    pcm = shm.buf[:nbytes]
+                    try:
+                        audio = preprocess_pcm(pcm)
+                    finally:
+                        pcm.release()
+                finally:
+                    shm.close()
+                preprocess = time.perf_counter() - start
+                if audio is None:
+                    results.put((job_id, ("", None, 0.0, preprocess, 0.0)))
+                    continue
+                start = time.perf_counter()
+                segments, info = get_model(spec).transcribe(audio, **options)
+                text = "".join(segment.text for segment in segments).strip()
+                inference = time.perf_counter() - start
+                results.put((job_id, (text, info.language, info.language_probability, preprocess, inference)))
+        except Exception as e:
+            results.put((job_id, e))
+
+
+class _Worker:
+    def __init__(self, context, loader_name, index, max_models):
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        self.process = context.Process(
+            target=_worker_main, args=(loader_name, self.tasks, self.results, max_models),
+            name=f"transcription-process-{index}", daemon=True,
+        )
+        self.process.start()
+
+    def stop(self):
+        if self.process.is_alive():
+            self.tasks.put(None)
+            self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+
+
+class ProcessPool:
+    """Fixed number of transcription worker processes.
+
+    transcribe() is blocking and meant to be called from the transcription scheduler's
+    worker threads; each call checks out an idle process for the duration of the job.
+    `loader` names the "module:function" building a model from a spec in the workers.
+    Every process keeps each loaded spec until unload() (at most `max_models`, least
+    recently used dropped first), the ModelManager decides what stays loaded.
+    """
+
+    def __init__(self, processes=2, loader=DEFAULT_LOADER, max_models=MAX_MODELS_PER_PROCESS):
+        self.size = processes
+        self.loader = loader
+        self.max_models = max_models
+        self.restarts = 0
+        self._context = multiprocessing.get_context("spawn")  # fork is unsafe once CUDA is initialized
+        self._workers = []
+        self._idle = queue.Queue()
+        self._job_ids = iter(range(1 << 62))
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._workers:
+                return
+            for index in range(self.size):
+                worker = _Worker(self._context, self.loader, index, self.max_models)
+                self._workers.append(worker)
+                self._idle.put(worker)
+
+    def stop(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._idle = queue.Queue()
+        for worker in workers:
+            worker.stop()
+
+    def rss_bytes(self):
+        """Resident memory of all worker processes together"""
+        with self._lock:
+            workers = list(self._workers)
+        return sum(rss_bytes(worker.process.pid) for worker in workers if worker.process.is_alive())
+
+    def load(self, spec):
+        """Load spec in every worker process (blocks until all of them are done)"""
+        self._broadcast("load", spec)
+
+    def unload(self, spec):
+        self._broadcast("unload", spec)
+
+    def transcribe(self, spec, pcm, options):
+        """Preprocess and transcribe 48 kHz stereo int16 PCM in a worker process.
+
+        Returns (text, detected_language, language_probability, preprocess_seconds,
+        inference_seconds), the timings as measured inside the worker.
+        """
+        self.start()
+        nbytes = len(pcm)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+        try:
+            shm.buf[:nbytes] = pcm
+            return self._run(("transcribe", next(self._job_ids), spec, shm.name, nbytes, options))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _broadcast(self, kind, spec):
+        self.start()
+        # Check out every process so the command runs once in each of them
+        workers = [self._idle.get() for _ in range(self.size)]
+        try:
+            for worker in workers:
+                worker.tasks.put((kind, next(self._job_ids), spec))
+            for worker in workers:
+                self._wait(worker)
+        finally:
+            for worker in workers:
+                self._check_in(worker)
+
+    def _run(self, task):
+        worker = self._idle.get()
+        try:
+            worker.tasks.put(task)
+            return self._wait(worker)
+        finally:
+            self._check_in(worker)
+
+    def _wait(self, worker):
+        while True:
+            try:
+                _, result = worker.results.get(timeout=RESULT_POLL_SECONDS)
+            except queue.Empty:
+                if not worker.process.is_alive():
+                    raise RuntimeError(f"{worker.process.name} died with exit code {worker.process.exitcode}")
+                continue
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+    def _check_in(self, worker):
+        """Give a worker back to the pool, replacing it first if its process crashed"""
+        with self._lock:
+            if worker not in self._workers:
+                return  # pool was stopped meanwhile
+            if not worker.process.is_alive():
+                log.warning(f"{worker.process.name} crashed (exit code {worker.process.exitcode}), restarting it")
+                index = self._workers.index(worker)
+                worker = self._workers[index] = _Worker(self._context, self.loader, index, self.max_models)
+                self.restarts += 1
+            self._idle.put(worker)
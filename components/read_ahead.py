@@ -0,0 +1,84 @@
+import logging
+import threading
+from collections import deque
+import discord
+from components.audio_mixer import SILENCE
+
+log = logging.getLogger(__name__)
+
+READ_AHEAD_FRAMES = 500  # 10 s of decoded PCM kept ahead of playback
+
+
+class ReadAheadSource(discord.AudioSource):
+    """Decodes a PCM source ahead of playback into a bounded ring of 20 ms frames.
+
+    From the first read() on, a thread reads the wrapped source (an FFmpegPCMAudio)
+    until `max_frames` are buffered, then waits for playback to catch up. While the
+    mixer does not read (paused), the ring fills and ffmpeg simply blocks on its
+    pipe: the process and its connection stay alive, and resuming plays the
+    buffered frames at once.
+    read() never waits for the network; on an underrun it returns silence, so a
+    slow stream cannot stall the other inputs of the mixer.
+    """
+
+    def __init__(self, source, max_frames=READ_AHEAD_FRAMES):
+        self.source = source
+        self.max_frames = max_frames
+        self.underruns = 0
+        self._frames = deque()
+        self._cond = threading.Condition()
+        self._eof = False
+        self._closed = False
+        self._thread = None  # started on the first read, a queued song does not buffer yet
+
+    def _fill(self):
+        while True:
+            with self._cond:
+                while len(self._frames) >= self.max_frames and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            try:
+                data = self.source.read()
+            except Exception as e:
+                log.error(f"Read-ahead source failed: {e}")
+                data = b""
+            with self._cond:
+                if not data:
+                    self._eof = True
+                    return
+                self._frames.append(data)
+
+    def start(self):
+        """Start decoding ahead before the first read, e.g. for the next song in the queue"""
+        with self._cond:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._fill, name="read-ahead", daemon=True)
+                self._thread.start()
+
+    def buffered_frames(self):
+        with self._cond:
+            return len(self._frames)
+
+    def is_opus(self):
+        return False
+
+    def read(self):
+        self.start()
+        with self._cond:
+            if self._frames:
+                data = self._frames.popleft()
+                self._cond.notify()
+                return data
+            if self._eof or self._closed:
+                return b""
+        self.underruns += 1
+        return SILENCE
+
+    def cleanup(self):
+        with self._cond:
+            self._closed = True
+            self._frames.clear()
+            self._cond.notify_all()
+        # Kills ffmpeg, which also ends a read the fill thread is blocked in
+        self.source.cleanup()
@@ -0,0 +1,52 @@
+import re
+import numpy as np
+from components.audio_buffer import FRAME_BYTES
+
+BYTES_PER_SECOND = FRAME_BYTES * 50
+
+# A speaker who keeps talking gets transcribed in windows of at most STREAM_WINDOW_SECONDS,
+# cut at the quietest frame of the window's last PAUSE_SEARCH_SECONDS. Consecutive windows
+# overlap by OVERLAP_SECONDS so words at the cut are not lost, duplicates are removed by stitch().
+STREAM_WINDOW_SECONDS = 20
+PAUSE_SEARCH_SECONDS = 5
+OVERLAP_SECONDS = 1.0
+
+STREAM_WINDOW_BYTES = STREAM_WINDOW_SECONDS * BYTES_PER_SECOND
+OVERLAP_BYTES = int(OVERLAP_SECONDS * 50) * FRAME_BYTES
+MAX_OVERLAP_WORDS = 12
+
+_WORD = re.compile(r"\w+")
+
+
+def find_pause(pcm, start, end):
+    """Byte offset in the middle of the quietest 20 ms frame between start and end"""
+    start -= start % FRAME_BYTES
+    end -= end % FRAME_BYTES
+    if end - start < FRAME_BYTES:
+        return end
+    frames = np.frombuffer(pcm[start:end], np.int16).astype(np.float32).reshape(-1, FRAME_BYTES // 2)
+    energy = np.einsum("ij,ij->i", frames, frames)
+    return start + int(np.argmin(energy)) * FRAME_BYTES + FRAME_BYTES // 2
+
+
+def find_window_cut(pcm):
+    """Where to cut a streaming window out of a speaker buffer"""
+    end = min(len(pcm), STREAM_WINDOW_BYTES)
+    return find_pause(pcm, end - PAUSE_SEARCH_SECONDS * BYTES_PER_SECOND, end)
+
+
+def _normalize(word):
+    return "".join(_WORD.findall(word.lower()))
+
+
+def stitch(previous, text, max_overlap_words=MAX_OVERLAP_WORDS):
+    """Drop words at the start of `text` that repeat the end of the previous window's text"""
+    if not previous or not text:
+        return text
+    tail = [_normalize(word) for word in previous.split()[-max_overlap_words:]]
+    words = text.split()
+    head = [_normalize(word) for word in words[:max_overlap_words]]
+    for size in range(min(len(tail), len(head)), 0, -1):
+        if tail[-size:] == head[:size]:
+            return " ".join(words[size:])
+    return text
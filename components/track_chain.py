@@ -0,0 +1,144 @@
+import logging
+import threading
+import discord
+import numpy as np
+from components.audio_mixer import FRAME_SAMPLES
+
+log = logging.getLogger(__name__)
+
+FRAME_SECONDS = 0.02
+PREFETCH_SECONDS = 10.0  # the next track is opened and decoded ahead this long before the current one ends
+CROSSFADE_SECONDS = 0.0  # 0 splices the tracks back to back
+
+
+class TrackChain(discord.AudioSource):
+    """Plays tracks back to back as one source, without a gap between them.
+
+    `on_near_end()` is called (from the player thread) `prefetch_seconds` before the
+    current track's duration is reached, the owner then opens the next track,
+    starts decoding it ahead and hands it over with set_next(). When the current
+    track runs out, the next one's first frame is returned by the same read(), so
+    not a single silent frame is inserted; `on_switch(track)` tells the owner it
+    started. With `crossfade_seconds`, the last seconds of the current track are
+    faded into the first seconds of the next one instead. Without a next track the
+    chain ends like a single source would.
+
+    Tracks are PCM sources with their duration in seconds (None when unknown, such
+    a track is only followed after it ended). A track handed over with set_next()
+    belongs to the chain: it is cleaned up when the chain is, or handed back by
+    set_next() when it is replaced before it started.
+    """
+
+    def __init__(self, track, duration=None, prefetch_seconds=PREFETCH_SECONDS, crossfade_seconds=CROSSFADE_SECONDS,
+                 on_near_end=None, on_switch=None):
+        self.prefetch_frames = int(prefetch_seconds / FRAME_SECONDS)
+        self.crossfade_frames = int(crossfade_seconds / FRAME_SECONDS)
+        self.on_near_end = on_near_end
+        self.on_switch = on_switch
+        self._lock = threading.Lock()
+        self._current = track
+        self._remaining = self._frames(duration)  # frames left of the current track, None if unknown
+        self._next = None
+        self._next_duration = None
+        self._next_played = 0  # frames of the next track already played during a crossfade
+        self._near_end_sent = False
+        self._closed = False
+        self._ramp = np.linspace(0.0, 1.0, FRAME_SAMPLES, endpoint=False, dtype=np.float32)[:, None]
+
+    @staticmethod
+    def _frames(duration):
+        return int(duration / FRAME_SECONDS) if duration else None
+
+    @property
+    def upcoming(self):
+        """The track set to follow the current one, None if there is none yet"""
+        return self._next
+
+    def near_end(self):
+        """Whether the current track is within prefetch_seconds of its end"""
+        return self._near_end_sent
+
+    def set_next(self, track, duration=None):
+        """Queue the track that follows the current one, None takes a not yet started one back.
+
+        Returns the not yet started track this replaced (the caller cleans it up), or None.
+        """
+        with self._lock:
+            if track is not None and track is self._current:
+                return None  # already playing, e.g. its own prefetch raced the switch
+            if self._closed:
+                replaced, track = track, None  # the chain is gone, nothing will start it
+            else:
+                replaced = self._next
+            self._next = track
+            self._next_duration = duration
+            self._next_played = 0
+        return replaced
+
+    def is_opus(self):
+        return False
+
+    def read(self):
+        with self._lock:
+            current, upcoming = self._current, self._next
+        data = current.read()
+        if self._remaining is not None:
+            self._remaining -= 1
+            if not self._near_end_sent and self._remaining <= self.prefetch_frames:
+                self._near_end_sent = True
+                if self.on_near_end is not None:
+                    self.on_near_end()
+
+        if upcoming is not None and self.crossfade_frames and self._remaining is not None:
+            if data and self._remaining > 0 and self._remaining < self.crossfade_frames:
+                return self._crossfade(data, upcoming)
+            if data and self._remaining <= 0:
+                data = b""  # the fade is over, the rest of the current track is not heard anymore
+        if data:
+            return data
+        if upcoming is None or not self._switch(upcoming):
+            return b""
+        return upcoming.read()
+
+    def _crossfade(self, data, upcoming):
+        incoming = upcoming.read()
+        self._next_played += 1
+        if not incoming:
+            return data
+        # Linear fade across this frame, from where the previous frame ended
+        start = 1.0 - (self._remaining + 1) / self.crossfade_frames
+        fade = start + self._ramp / self.crossfade_frames
+        outgoing = np.frombuffer(data, dtype=np.int16).reshape(-1, 2)
+        incoming = np.frombuffer(incoming, dtype=np.int16).reshape(-1, 2)
+        mixed = outgoing * (1.0 - fade) + incoming * fade
+        return np.clip(mixed, -32768, 32767).astype(np.int16).tobytes()
+
+    def _switch(self, upcoming):
+        """Make the next track the current one, False if it was taken back meanwhile"""
+        with self._lock:
+            if self._next is not upcoming:
+                return False
+            previous = self._current
+            self._current = upcoming
+            self._remaining = self._frames(self._next_duration)
+            if self._remaining is not None:
+                self._remaining -= self._next_played + 1  # the frame read right after this
+            self._next = None
+            self._next_played = 0
+            self._near_end_sent = False
+        try:
+            previous.cleanup()
+        except Exception as e:
+            log.error(f"Error cleaning up finished track: {e}")
+        if self.on_switch is not None:
+            self.on_switch(upcoming)
+        return True
+
+    def cleanup(self):
+        with self._lock:
+            current, upcoming = self._current, self._next
+            self._next = None
+            self._closed = True
+        current.cleanup()
+        if upcoming is not None:
+            upcoming.cleanup()
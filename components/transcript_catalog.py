@@ -0,0 +1,108 @@
+import logging
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+
+class TranscriptCatalog:
+    """In-memory list of every guild's transcript files with their size and mtime.
+
+    Kept up to date by the transcriber as files are opened, written and closed, so
+    listing transcripts never globs or stats the guild folder. Each guild's catalog
+    is saved to a small manifest in its folder and read back after a restart; the
+    folder is only scanned when no manifest exists yet. Entries whose file was
+    deleted or rotated away outside the bot are dropped when the manifest is read.
+    """
+
+    def __init__(self, root="transcripts"):
+        self.root = root
+        self._guilds = {}  # guild_id: {file_path: [mtime, size]}
+        self._lock = threading.Lock()
+
+    def _folder(self, guild_id):
+        return os.path.join(self.root, f"Guild_{guild_id}")
+
+    def _load(self, guild_id):
+        """The guild's entries, read from its manifest (or a one time scan) on first use"""
+        entries = self._guilds.get(guild_id)
+        if entries is None:
+            entries = self._read_manifest(guild_id)
+            if entries is None:
+                entries = self._guilds[guild_id] = self._scan(guild_id)
+                self._save(guild_id)
+            else:
+                missing = [path for path in entries if not os.path.isfile(path)]
+                for path in missing:
+                    del entries[path]
+                self._guilds[guild_id] = entries
+                if missing:
+                    log.info(f"Dropped {len(missing)} missing transcript files from the manifest of guild {guild_id}")
+                    self._save(guild_id)
+        return entries
+
+    def _read_manifest(self, guild_id):
+        folder = self._folder(guild_id)
+        try:
+            with open(os.path.join(folder, MANIFEST_NAME), encoding="utf-8") as f:
+                return {os.path.join(folder, name): [mtime, size] for name, (mtime, size) in json.load(f).items()}
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as e:
+            log.warning(f"Rebuilding broken transcript manifest of guild {guild_id}: {e}")
+            return None
+
+    def _scan(self, guild_id):
+        entries = {}
+        folder = self._folder(guild_id)
+        if os.path.isdir(folder):
+            for file_path in Path(folder).glob("*.txt"):
+                stat = file_path.stat()
+                entries[str(file_path)] = [stat.st_mtime, stat.st_size]
+        return entries
+
+    def _save(self, guild_id):
+        folder = self._folder(guild_id)
+        entries = self._guilds.get(guild_id)
+        if entries is None or not os.path.isdir(folder):
+            return
+        manifest = {os.path.basename(path): entry for path, entry in entries.items()}
+        tmp_path = os.path.join(folder, MANIFEST_NAME + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(folder, MANIFEST_NAME))
+
+    def register(self, guild_id, file_path):
+        """A transcript file was opened for writing (it may already exist)"""
+        with self._lock:
+            entries = self._load(guild_id)
+            try:
+                stat = os.stat(file_path)
+                entries[file_path] = [stat.st_mtime, stat.st_size]
+            except FileNotFoundError:
+                entries[file_path] = [time.time(), 0]
+            self._save(guild_id)
+
+    def record_write(self, guild_id, file_path, nbytes):
+        """nbytes were appended to a transcript file, memory only until the next save"""
+        with self._lock:
+            entry = self._load(guild_id).setdefault(file_path, [0.0, 0])
+            entry[0] = time.time()
+            entry[1] += nbytes
+
+    def save(self, guild_id):
+        """Persist the guild's manifest, called when its transcript is closed"""
+        with self._lock:
+            self._save(guild_id)
+
+    def entries(self, guild_id):
+        """(file_path, mtime, size) of the guild's transcripts, newest first"""
+        with self._lock:
+            entries = [(path, mtime, size) for path, (mtime, size) in self._load(guild_id).items()]
+        entries.sort(key=lambda entry: entry[1], reverse=True)
+        return entries
@@ -0,0 +1,133 @@
+"""Prepare transcript files for upload to Discord without loading them into memory.
+
+Small files are sent straight from disk. Bigger ones are gzipped into a temporary
+directory, and when even the compressed file exceeds the upload limit the transcript
+is split into several gzipped parts at line boundaries, each named after the time
+range it covers. Everything here is blocking file work meant for an executor.
+"""
+import gzip
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+COMPRESS_THRESHOLD = 1024 * 1024  # files above this are gzipped before upload
+DEFAULT_UPLOAD_LIMIT = 10 * 1024 * 1024  # upload limit of guilds without boosts
+SIZE_MARGIN = 0.9  # fill parts up to this share of the limit, zlib still buffers some output
+CHUNK_SIZE = 256 * 1024
+
+# A line's start time and, on lines with a start-end stamp, its end time
+TIME_PATTERN = re.compile(rb"^(\d{2}):(\d{2}):(\d{2})(?:-(\d{2}):(\d{2}):(\d{2}))?", re.MULTILINE)
+
+
+def _time_range(first_chunk, last_chunk):
+    """Start of the first and end of the last timestamped line of a part as HH-MM-SS_HH-MM-SS"""
+    first = TIME_PATTERN.search(first_chunk)
+    last = None
+    for last in TIME_PATTERN.finditer(last_chunk):
+        pass
+    if first is None or last is None:
+        return None
+    end = last.groups()[3:] if last.group(4) is not None else last.groups()[:3]
+    return "-".join(g.decode() for g in first.groups()[:3]) + "_" + "-".join(g.decode() for g in end)
+
+
+class _GzipPart:
+    """One gzipped part of a split transcript, remembers its first and last chunk for naming"""
+
+    def __init__(self, path):
+        self.path = path
+        self.raw = open(path, "wb")
+        self.gz = gzip.GzipFile(fileobj=self.raw, mode="wb", compresslevel=6)
+        self.first = None
+        self.last = b""
+
+    def write(self, data):
+        if self.first is None:
+            self.first = data
+        self.last = data
+        self.gz.write(data)
+
+    def compressed_size(self):
+        return self.raw.tell()
+
+    def finish(self, name):
+        self.gz.close()
+        self.raw.close()
+        final_path = os.path.join(os.path.dirname(self.path), name)
+        os.replace(self.path, final_path)
+        return final_path, name
+
+
+def _line_chunks(file_path):
+    """Read a file in chunks of about CHUNK_SIZE that end at line boundaries"""
+    with open(file_path, "rb") as src:
+        rest = b""
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                if rest:
+                    yield rest
+                return
+            data = rest + chunk
+            cut = data.rfind(b"\n") + 1
+            if cut == 0:
+                rest = data
+                continue
+            yield data[:cut]
+            rest = data[cut:]
+
+
+def _split_gzip(file_path, limit, workdir):
+    """Gzip file_path into parts whose compressed size stays under limit"""
+    stem = Path(file_path).stem
+    budget = int(limit * SIZE_MARGIN)
+    parts = []
+    part = None
+
+    def finish():
+        time_range = _time_range(part.first, part.last)
+        name = f"{stem}_part{len(parts) + 1}" + (f"_{time_range}" if time_range else "") + ".txt.gz"
+        parts.append(part.finish(name))
+
+    for data in _line_chunks(file_path):
+        if part is None:
+            part = _GzipPart(os.path.join(workdir, f".part{len(parts) + 1}.tmp"))
+        part.write(data)
+        if part.compressed_size() >= budget:
+            finish()
+            part = None
+    if part is not None:
+        finish()
+    return parts
+
+
+def export_transcript(file_path, limit=DEFAULT_UPLOAD_LIMIT, compress_threshold=COMPRESS_THRESHOLD):
+    """Files to upload for a transcript as (path, filename) pairs, plus the temporary
+    directory holding generated files (None if the original is sent as is).
+
+    The caller removes the directory with cleanup() once the upload is done.
+    """
+    size = os.path.getsize(file_path)
+    name = Path(file_path).name
+    if size <= min(compress_threshold, limit):
+        return [(str(file_path), name)], None
+
+    workdir = tempfile.mkdtemp(prefix="kv_transcript_")
+    try:
+        # Compressed in a single pass, a transcript that fits in one part keeps its own name
+        parts = _split_gzip(file_path, limit, workdir)
+        if len(parts) == 1:
+            gz_path = os.path.join(workdir, name + ".gz")
+            os.replace(parts[0][0], gz_path)
+            return [(gz_path, name + ".gz")], workdir
+        return parts, workdir
+    except Exception:
+        cleanup(workdir)
+        raise
+
+
+def cleanup(workdir):
+    if workdir is not None:
+        shutil.rmtree(workdir, ignore_errors=True)
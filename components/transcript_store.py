@@ -0,0 +1,199 @@
+"""SQLite store of transcript lines with a full text index.
+
+Lines are written next to the plain .txt transcripts by the transcript writer thread.
+Existing .txt files can be backfilled with:
+
+    python -m components.transcript_store import [transcripts_folder]
+"""
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join("transcripts", "transcripts.db")
+SEARCH_LIMIT = 5  # matching lines returned by a search
+CONTEXT_LINES = 2  # lines shown before and after each match
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lines (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER,
+    user_id INTEGER,
+    user_name TEXT NOT NULL,
+    start_time REAL NOT NULL,
+    end_time REAL NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lines_guild_time ON lines (guild_id, end_time);
+"""
+
+# External content FTS5 table kept in sync by triggers, diacritics folded so "zrob" finds "zrób"
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts USING fts5(
+    text, content='lines', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS lines_ai AFTER INSERT ON lines BEGIN
+    INSERT INTO lines_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS lines_ad AFTER DELETE ON lines BEGIN
+    INSERT INTO lines_fts (lines_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+# "12:34:50-12:34:56 - name: text" (start-end) as written by write_transcript_line,
+# older files only have the end time: "12:34:56 - name: text"
+LINE_PATTERN = re.compile(r"^(\d{2}:\d{2}:\d{2})(?:-(\d{2}:\d{2}:\d{2}))? - (.+?): (.*)$")
+
+
+def fts_query(text):
+    """Turn user input into an FTS5 query matching all words, without FTS syntax errors.
+
+    Words match as prefixes so inflected Polish forms are found too ("kot" finds "kota").
+    """
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class TranscriptStore:
+    """Transcript lines in SQLite, safe to use from several threads (one connection each)"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self.fts = True
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            # WAL lets searches read while the writer thread inserts
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._init_lock:
+                if not self._initialized:
+                    self._create_schema(conn)
+                    self._initialized = True
+        return conn
+
+    def _create_schema(self, conn):
+        conn.executescript(SCHEMA)
+        try:
+            conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            self.fts = False
+            log.warning(f"SQLite has no FTS5, transcript search falls back to a slow scan: {e}")
+        conn.commit()
+
+    def add_lines(self, rows):
+        """Insert (guild_id, channel_id, user_id, user_name, start_time, end_time, text) rows"""
+        if not rows:
+            return
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO lines (guild_id, channel_id, user_id, user_name, start_time, end_time, text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def search(self, guild_id, text, limit=SEARCH_LIMIT, context=CONTEXT_LINES):
+        """Newest lines of a guild matching all words of text, each with its surrounding lines.
+
+        Returns a list of (before, match, after), lines being dicts of the row's columns.
+        """
+        conn = self._connection()
+        conn.row_factory = sqlite3.Row
+        if self.fts:
+            query = fts_query(text)
+            if not query:
+                return []
+            matches = conn.execute(
+                "SELECT lines.* FROM lines_fts JOIN lines ON lines.id = lines_fts.rowid "
+                "WHERE lines_fts MATCH ? AND lines.guild_id = ? ORDER BY lines.end_time DESC LIMIT ?",
+                (query, guild_id, limit),
+            ).fetchall()
+        else:
+            matches = conn.execute(
+                "SELECT * FROM lines WHERE guild_id = ? AND text LIKE ? ORDER BY end_time DESC LIMIT ?",
+                (guild_id, f"%{text}%", limit),
+            ).fetchall()
+
+        results = []
+        for match in matches:
+            before = conn.execute(
+                "SELECT * FROM lines WHERE guild_id = ? AND end_time <= ? AND id != ? ORDER BY end_time DESC LIMIT ?",
+                (guild_id, match["end_time"], match["id"], context),
+            ).fetchall()
+            after = conn.execute(
+                "SELECT * FROM lines WHERE guild_id = ? AND end_time >= ? AND id != ? ORDER BY end_time LIMIT ?",
+                (guild_id, match["end_time"], match["id"], context),
+            ).fetchall()
+            results.append(([dict(row) for row in reversed(before)], dict(match), [dict(row) for row in after]))
+        return results
+
+    def import_file(self, guild_id, file_path):
+        """Backfill one transcript .txt, skipping lines the store already has. Returns lines added."""
+        conn = self._connection()
+        day = datetime.strptime(Path(file_path).stem, "%Y-%m-%d")
+        rows = []
+        with open(file_path, encoding="utf-8") as f:
+            for line in f:
+                match = LINE_PATTERN.match(line.rstrip("\n"))
+                if match is None:
+                    continue
+                start_clock, end_clock, user_name, text = match.groups()
+                stamp = datetime.combine(day, datetime.strptime(end_clock or start_clock, "%H:%M:%S").time()).timestamp()
+                start = stamp
+                if end_clock is not None:
+                    start = datetime.combine(day, datetime.strptime(start_clock, "%H:%M:%S").time()).timestamp()
+                    if start > stamp:
+                        start -= 86400  # started before midnight
+                # Lines written live carry sub-second end times, the file only has whole seconds
+                exists = conn.execute(
+                    "SELECT 1 FROM lines WHERE guild_id = ? AND end_time >= ? AND end_time < ? AND user_name = ? AND text = ?",
+                    (guild_id, stamp, stamp + 1, user_name, text),
+                ).fetchone()
+                if exists is None:
+                    rows.append((guild_id, None, None, user_name, start, stamp, text))
+        self.add_lines(rows)
+        return len(rows)
+
+    def import_folder(self, root="transcripts"):
+        """Backfill every transcripts/Guild_<id>/<date>.txt file. Returns lines added."""
+        added = 0
+        for folder in sorted(Path(root).glob("Guild_*")):
+            try:
+                guild_id = int(folder.name[len("Guild_"):])
+            except ValueError:
+                continue
+            for file_path in sorted(folder.glob("*.txt")):
+                try:
+                    count = self.import_file(guild_id, file_path)
+                except ValueError:
+                    log.warning(f"Skipping {file_path}, not a dated transcript")
+                    continue
+                log.info(f"Imported {count} lines from {file_path}")
+                added += count
+        return added
+
+
+if __name__ == "__main__":
+    from components.bot_logging import CONSOLE_FORMAT
+    logging.basicConfig(level=logging.INFO, format=CONSOLE_FORMAT, datefmt="%H:%M:%S")
+    if len(sys.argv) < 2 or sys.argv[1] != "import":
+        print(__doc__)
+        sys.exit(1)
+    root = sys.argv[2] if len(sys.argv) > 2 else "transcripts"
+    total = TranscriptStore(os.path.join(root, "transcripts.db")).import_folder(root)
+    log.info(f"Backfill finished, {total} lines added")
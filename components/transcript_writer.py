@@ -0,0 +1,173 @@
+import logging
+import heapq
+import itertools
+import os
+import queue
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+REORDER_WINDOW = 3.0  # longest a line is held waiting for lines of utterances that started earlier
+WATERMARK_POLL = 0.25  # how often held lines re-check the watermark
+FLUSH_INTERVAL = 1.0  # seconds between flushes of the open handles
+FLUSH_LINES = 64  # flush earlier once this many lines were written
+
+
+class TranscriptWriter:
+    """Single writer thread for every guild's transcript file.
+
+    Transcription workers only put lines on a queue. The writer thread keeps one
+    buffered handle open per guild and writes lines in the order the utterances
+    started, not in the order workers finished them. `watermark(guild_id)` returns
+    the start time of the earliest utterance that may still produce a line (being
+    spoken or being transcribed, None if there is none); a line is held until it
+    started before the watermark, but never longer than `reorder_window` seconds, so
+    one endless speaker cannot stall everyone else's lines. Without a watermark every
+    line is held for reorder_window. Handles are flushed on a time/size threshold,
+    close() writes everything still pending and fsyncs the file; lines that arrive
+    for a guild that is not open are dropped. With a `store`,
+    each line's record is also inserted into it whenever the files are flushed.
+    """
+
+    def __init__(self, reorder_window=REORDER_WINDOW, flush_interval=FLUSH_INTERVAL, flush_lines=FLUSH_LINES,
+                 store=None, watermark=None):
+        self.store = store
+        self.watermark = watermark
+        self.reorder_window = reorder_window
+        self.flush_interval = flush_interval
+        self.flush_lines = flush_lines
+        self._queue = queue.SimpleQueue()
+        self._files = {}  # guild_id: open file handle
+        self._pending = {}  # guild_id: heap of (start_time, seq, line, record, hold_until)
+        self._records = []  # written records not yet in the store
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self._seq = itertools.count()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def open(self, guild_id, file_path, header):
+        """Start appending a guild's lines to file_path, writing header first"""
+        self._put(("open", guild_id, file_path, header))
+
+    def write(self, guild_id, start_time, line, record=None):
+        """Queue a transcript line of an utterance that started at start_time (unix seconds)"""
+        self._put(("line", guild_id, start_time, line, record))
+
+    def close(self, guild_id, footer, timeout=10.0):
+        """Write pending lines and footer, fsync and close the guild's file (blocks until done)"""
+        done = threading.Event()
+        self._put(("close", guild_id, footer, done))
+        return done.wait(timeout)
+
+    def _put(self, command):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="transcript-writer", daemon=True)
+                    self._thread.start()
+        self._queue.put(command)
+
+    def _next_timeout(self):
+        """Seconds until something is due, None to block until the next command"""
+        now = time.time()
+        timeouts = [min(entry[4] for entry in heap) - now for heap in self._pending.values() if heap]
+        if timeouts and self.watermark is not None:
+            # The watermark moves without telling the writer (e.g. an utterance that had no text)
+            timeouts.append(WATERMARK_POLL)
+        if self._unflushed:
+            timeouts.append(self._last_flush + self.flush_interval - time.monotonic())
+        if not timeouts:
+            return None
+        return max(0.0, min(timeouts))
+
+    def _run(self):
+        while True:
+            try:
+                command = self._queue.get(timeout=self._next_timeout())
+            except queue.Empty:
+                command = None
+            # Drain everything that queued up so lines are written in batches
+            while command is not None:
+                try:
+                    self._handle(command)
+                except Exception as e:
+                    log.error(f"Transcript writer failed on '{command[0]}' for guild {command[1]}: {e}")
+                    if command[0] == "close":
+                        command[3].set()
+                try:
+                    command = self._queue.get_nowait()
+                except queue.Empty:
+                    command = None
+            for guild_id in list(self._pending):
+                self._emit(guild_id)
+            if self._unflushed and (self._unflushed >= self.flush_lines
+                                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush()
+
+    def _handle(self, command):
+        kind, guild_id = command[0], command[1]
+        if kind == "open":
+            _, _, file_path, header = command
+            if guild_id not in self._files:
+                self._files[guild_id] = open(file_path, "a", encoding="utf-8", buffering=64 * 1024)
+                self._pending.setdefault(guild_id, [])
+            self._files[guild_id].write(header)
+            self._unflushed += 1
+        elif kind == "line":
+            _, _, start_time, line, record = command
+            if guild_id not in self._files:
+                # Queued by a worker just before close(); held with no handle it would never be written
+                log.warning(f"Dropping transcript line for guild {guild_id}, its transcript is closed: {line.strip()}")
+                return
+            entry = (start_time, next(self._seq), line, record, time.time() + self.reorder_window)
+            heapq.heappush(self._pending[guild_id], entry)
+        elif kind == "close":
+            _, _, footer, done = command
+            self._emit(guild_id, flush_all=True)
+            handle = self._files.pop(guild_id, None)
+            self._pending.pop(guild_id, None)
+            if handle is not None:
+                handle.write(footer)
+                handle.flush()
+                os.fsync(handle.fileno())
+                handle.close()
+            self._store_records()
+            done.set()
+
+    def _emit(self, guild_id, flush_all=False):
+        """Write a guild's held lines that are due, earliest start first"""
+        heap = self._pending.get(guild_id)
+        handle = self._files.get(guild_id)
+        if not heap or handle is None:
+            return
+        cutoff = float("inf")
+        if not flush_all:
+            watermark = self.watermark(guild_id) if self.watermark is not None else float("-inf")
+            if watermark is not None:  # None: nothing in flight, everything can go
+                # A line held too long is written anyway, together with everything that started before it
+                now = time.time()
+                expired = [entry[0] for entry in heap if entry[4] <= now]
+                cutoff = max([watermark] + [start + 1e-6 for start in expired])
+        while heap and heap[0][0] < cutoff:
+            _, _, line, record, _ = heapq.heappop(heap)
+            handle.write(line)
+            if record is not None and self.store is not None:
+                self._records.append(record)
+            self._unflushed += 1
+
+    def _flush(self):
+        for handle in self._files.values():
+            handle.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self._store_records()
+
+    def _store_records(self):
+        records, self._records = self._records, []
+        if records:
+            try:
+                self.store.add_lines(records)
+            except Exception as e:
+                log.error(f"Failed to store {len(records)} transcript lines: {e}")
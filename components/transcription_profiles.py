@@ -0,0 +1,87 @@
+import logging
+
+log = logging.getLogger(__name__)
+
+# Named quality/speed trade-offs for transcription. compute_type is picked per device,
+# "options" are passed to whisper's transcribe() and "vad_parameters" to its Silero VAD.
+# Non-speech frames are already dropped by the frame level gate in voice_activity.py, so the
+# realtime profile skips whisper's own Silero VAD pass.
+TRANSCRIPTION_PROFILES = {
+    "realtime": {
+        "description": "Small model, greedy decoding - keeps up on CPU-only hosts",
+        "model_size": "small",
+        "compute_type": {"cuda": "int8_float16", "cpu": "int8"},
+        "options": {"beam_size": 1, "best_of": 1, "patience": 1.0},
+        "vad_filter": False,
+        "vad_parameters": {"threshold": 0.5, "min_speech_duration_ms": 250, "min_silence_duration_ms": 300},
+    },
+    "balanced": {
+        "description": "Turbo model, small beam - good accuracy at low latency on GPU",
+        "model_size": "turbo",
+        "compute_type": {"cuda": "int8_float16", "cpu": "int8"},
+        "options": {"beam_size": 5, "best_of": 5, "patience": 1.0},
+        "vad_filter": True,
+        "vad_parameters": {"threshold": 0.6, "min_speech_duration_ms": 250, "min_silence_duration_ms": 100},
+    },
+    "archival": {
+        "description": "Turbo model, wide beam search - best quality, slowest",
+        "model_size": "turbo",
+        "compute_type": {"cuda": "float32", "cpu": "int8"},
+        "options": {"beam_size": 25, "best_of": 25, "patience": 2.0},
+        "vad_filter": True,
+        "vad_parameters": {"threshold": 0.6, "min_speech_duration_ms": 250, "min_silence_duration_ms": 100},
+    },
+}
+
+# Sizes that also come as English-only models, they are more accurate for English at the same speed
+ENGLISH_ONLY_SIZES = {"tiny", "base", "small", "medium"}
+DEFAULT_LANGUAGE = "pl"
+
+_detected_device = None
+
+def detect_device():
+    """Return "cuda" if CTranslate2 can see a CUDA device, otherwise "cpu" (cached)"""
+    global _detected_device
+    if _detected_device is None:
+        try:
+            import ctranslate2
+            _detected_device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+        except Exception as e:
+            log.warning(f"CUDA detection failed, using CPU: {e}")
+            _detected_device = "cpu"
+    return _detected_device
+
+def default_profile_name():
+    """Profile used when a guild did not pick one: CPU hosts get the int8 realtime profile"""
+    return "balanced" if detect_device() == "cuda" else "realtime"
+
+def get_profile(name=None, language=DEFAULT_LANGUAGE):
+    """Resolve a profile by name into concrete model_size, device and compute_type.
+
+    language is a whisper language code or "auto"; English gets the English-only
+    variant of the model where one exists.
+    """
+    name = name if name in TRANSCRIPTION_PROFILES else default_profile_name()
+    profile = TRANSCRIPTION_PROFILES[name]
+    device = detect_device()
+    model_size = profile["model_size"]
+    if language == "en" and model_size in ENGLISH_ONLY_SIZES:
+        model_size += ".en"
+    return {
+        "name": name,
+        "language": language,
+        "model_size": model_size,
+        "device": device,
+        "compute_type": profile["compute_type"][device],
+        "options": profile["options"],
+        "vad_filter": profile["vad_filter"],
+        "vad_parameters": profile["vad_parameters"],
+    }
+
+def model_spec(profile):
+    """What has to match for two profiles to share a loaded model"""
+    return (profile["model_size"], profile["device"], profile["compute_type"])
+
+def serves_language(spec, language):
+    """Whether a model of spec can transcribe language ("auto" included), English-only models only serve English"""
+    return language == "en" or not spec[0].endswith(".en")
@@ -0,0 +1,237 @@
+import logging
+import itertools
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+
+class TranscriptionScheduler:
+    """Shared, bounded worker pool for transcription jobs.
+
+    Jobs are queued per key (one key per speaker) and a key is handed to at most one
+    worker at a time, so utterances of the same speaker are transcribed in order
+    while different speakers share `workers` threads. The worker count is also the
+    global cap on concurrent inference calls against the model.
+    Workers start on the first submit() and exit on shutdown(); resize() changes
+    their number while they run. hold() keeps the jobs of matching keys queued
+    without occupying a worker (e.g. while the model they need loads) until unhold().
+
+    With a `batch_handler`, a worker that picks up a job waits up to `batch_window`
+    seconds for other speakers' jobs (one per speaker, at most `max_batch_size`)
+    and hands them to batch_handler(list_of_args) in a single call.
+    """
+
+    def __init__(self, handler, workers=1, batch_handler=None, batch_window=0.0, max_batch_size=1):
+        self.handler = handler
+        self.workers = workers
+        self.batch_handler = batch_handler
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._queues = {}  # key: deque of (submitted_at, args)
+        self._ready = deque()  # keys that have queued jobs and no worker on them
+        self._busy = set()  # keys currently being processed
+        self._holds = {}  # name: match(key), matching keys are not handed to workers
+        self._cond = threading.Condition()
+        self._threads = []
+        self._thread_ids = itertools.count()
+        self._running = False
+        self._wait_times = deque(maxlen=500)  # recent queue wait times in seconds
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, key, *args):
+        """Queue handler(*args) behind any earlier job with the same key"""
+        with self._cond:
+            if not self._running:
+                self._start()
+            queue = self._queues.setdefault(key, deque())
+            queue.append((time.monotonic(), args))
+            if len(queue) == 1 and key not in self._busy and not self._held(key):
+                self._ready.append(key)
+                self._cond.notify()
+
+    def _held(self, key):
+        """Whether a hold covers key, called with the lock held"""
+        return any(match(key) for match in self._holds.values())
+
+    def hold(self, name, match):
+        """Stop handing out jobs of keys for which match(key) is true until unhold(name).
+
+        Their jobs keep queueing (and count as queued), jobs already running finish.
+        """
+        with self._cond:
+            self._holds[name] = match
+            self._ready = deque(key for key in self._ready if not match(key))
+
+    def unhold(self, name):
+        """Hand the jobs held by hold(name) to the workers again"""
+        with self._cond:
+            if self._holds.pop(name, None) is None:
+                return
+            for key, queue in self._queues.items():
+                if queue and key not in self._busy and key not in self._ready and not self._held(key):
+                    self._ready.append(key)
+            self._cond.notify_all()
+
+    def _start(self):
+        self._running = True
+        self._threads = []
+        self._add_workers()
+        log.info(f"Transcription scheduler started with {len(self._threads)} worker(s)")
+
+    def _add_workers(self):
+        """Start threads up to the worker count, called with the lock held"""
+        while len(self._threads) < max(1, self.workers):
+            thread = threading.Thread(target=self._worker, name=f"transcription-worker-{next(self._thread_ids)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _surplus(self):
+        """Whether the calling worker is above the worker count and should exit, called with the lock held"""
+        return threading.current_thread() in self._threads[max(1, self.workers):]
+
+    def resize(self, workers):
+        """Set the worker count, extra workers exit after their current job"""
+        with self._cond:
+            if workers == self.workers:
+                return
+            self.workers = workers
+            if not self._running:
+                return
+            self._add_workers()
+            self._cond.notify_all()
+        log.info(f"Transcription scheduler resized to {max(1, workers)} worker(s)")
+
+    def shutdown(self, only_if_idle=False):
+        """Stop the workers after their current job, dropping anything still queued.
+
+        With only_if_idle, nothing happens while jobs are queued or running. Returns
+        whether the workers were stopped.
+        """
+        with self._cond:
+            if not self._running:
+                return False
+            if only_if_idle and (self._queues or self._busy):
+                return False
+            self._running = False
+            dropped = sum(len(queue) for queue in self._queues.values())
+            self._queues.clear()
+            self._ready.clear()
+            threads = self._threads
+            self._threads = []
+            self._cond.notify_all()
+        for thread in threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        log.info(f"Transcription scheduler stopped, dropped {dropped} queued job(s)")
+        return True
+
+    def get_stats(self):
+        """Queue depth and wait time metrics"""
+        with self._cond:
+            waits = sorted(self._wait_times)
+            return {
+                "workers": len(self._threads),
+                "running": len(self._busy),
+                "queued": sum(len(queue) for queue in self._queues.values()),
+                "speakers_waiting": len(self._ready),
+                "held": sum(len(queue) for key, queue in self._queues.items() if self._held(key)),
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+                "p95_wait": waits[int(len(waits) * 0.95)] if waits else 0.0,
+                "max_wait": waits[-1] if waits else 0.0,
+            }
+
+    def queued_jobs(self):
+        """Snapshot of the jobs waiting for a worker as (key, args), oldest of each key first"""
+        with self._cond:
+            return [(key, args) for key, queue in self._queues.items() for _, args in queue]
+
+    def drop_queued(self, choose):
+        """Remove waiting jobs: choose(queued_jobs) returns the (key, args) to drop.
+
+        Returns the dropped (key, args), the caller cleans up after them.
+        """
+        with self._cond:
+            queued = [(key, args) for key, queue in self._queues.items() for _, args in queue]
+            drop = {id(args) for _, args in choose(queued)}
+            dropped = []
+            for key in list(self._queues):
+                queue = self._queues[key]
+                kept = deque(job for job in queue if id(job[1]) not in drop)
+                dropped.extend((key, args) for _, args in queue if id(args) in drop)
+                if kept:
+                    self._queues[key] = kept
+                    continue
+                if key not in self._busy:
+                    # A busy key's empty queue is cleaned up by its worker
+                    del self._queues[key]
+                    if key in self._ready:  # not there while held
+                        self._ready.remove(key)
+                else:
+                    self._queues[key] = kept
+            return dropped
+
+    def _take_job(self):
+        """Pop the next job of the first ready speaker, called with the lock held"""
+        key = self._ready.popleft()
+        submitted_at, args = self._queues[key].popleft()
+        self._busy.add(key)
+        self._wait_times.append(time.monotonic() - submitted_at)
+        return key, args
+
+    def _collect_batch(self, jobs):
+        """Wait up to batch_window for more speakers to join the batch, called with the lock held"""
+        deadline = time.monotonic() + self.batch_window
+        while self._running and len(jobs) < self.max_batch_size:
+            if self._ready:
+                jobs.append(self._take_job())
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._cond.wait(remaining)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._running and not self._ready and not self._surplus():
+                    self._cond.wait()
+                if not self._running:
+                    return
+                if self._surplus():
+                    self._threads.remove(threading.current_thread())
+                    if self._ready:
+                        self._cond.notify()  # the wakeup may have been meant for a remaining worker
+                    return
+                jobs = [self._take_job()]
+                if self.batch_handler is not None and self.max_batch_size > 1:
+                    self._collect_batch(jobs)
+
+            failed = False
+            try:
+                if len(jobs) > 1:
+                    self.batch_handler([args for _, args in jobs])
+                else:
+                    self.handler(*jobs[0][1])
+            except Exception as e:
+                failed = True
+                log.error(f"Transcription job for {[key for key, _ in jobs]} failed: {e}", extra={"sample": f"job_failed:{jobs[0][0]}"})
+
+            with self._cond:
+                self.completed += len(jobs)
+                if failed:
+                    self.failed += len(jobs)
+                for key, _ in jobs:
+                    self._busy.discard(key)
+                    queue = self._queues.get(key)
+                    if queue and not self._held(key):
+                        self._ready.append(key)
+                        self._cond.notify()
+                    elif not queue and queue is not None:
+                        del self._queues[key]
+                if not self._running:
+                    return
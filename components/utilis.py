@@ -1,11 +1,14 @@
+import logging
 import random
 import discord
 from discord import app_commands
 from discord.ext import voice_recv
 import components.voice_transcriber as voice_transcriber
-from datetime import datetime
 from pathlib import Path
-import io
+import asyncio
+import components.transcript_export as transcript_export
+
+log = logging.getLogger(__name__)
 
 async def connect_to_channel(channel: discord.VoiceChannel, guild_id: int) -> discord.VoiceClient:
     
@@ -17,25 +20,25 @@ async def connect_to_channel(channel: discord.VoiceChannel, guild_id: int) -> di
     return vc
 
 def get_file_as_discord_file(file_path):
-    """Get a file as a discord.File object from a given file path."""
+    """Get a file as a discord.File object from a given file path, streamed from disk on upload."""
     try:
-        # Read the file
-        with open(file_path, 'r', encoding='utf-8') as f:
-           content = f.read()
-                        
-         # Create a temporary file-like object
-        file_name = Path(file_path).name
-                            
-        discord_file = discord.File(
-            io.BytesIO(content.encode('utf-8')),
-            filename=file_name
-        )
-
-        return discord_file
+        return discord.File(str(file_path), filename=Path(file_path).name)
     except Exception as e:
-        print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Error reading transcript file '{file_path}': {e}")
+        log.error(f"Error reading transcript file '{file_path}': {e}")
         return None
 
+async def get_transcript_attachments(file_path, limit=transcript_export.DEFAULT_UPLOAD_LIMIT):
+    """Attachments for a transcript that fit the upload limit: the file itself, a gzip of it,
+    or gzipped parts split by time. Returns (files, workdir), pass both to close_transcript_attachments."""
+    loop = asyncio.get_running_loop()
+    exported, workdir = await loop.run_in_executor(None, transcript_export.export_transcript, file_path, limit)
+    return [discord.File(path, filename=name) for path, name in exported], workdir
+
+async def close_transcript_attachments(files, workdir):
+    for discord_file in files:
+        discord_file.close()
+    await asyncio.get_running_loop().run_in_executor(None, transcript_export.cleanup, workdir)
+
 def get_greeting(user: discord.User) -> str:
     """Generate a greeting message for a user."""
     name = user.name
@@ -0,0 +1,119 @@
+import logging
+import heapq
+import itertools
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class UtteranceSegmenter:
+    """Ends a speaker's utterance once no audio arrived for `silence_timeout` seconds.
+
+    Every received frame re-arms the speaker's deadline with touch(). All deadlines
+    share one heap watched by a single thread that sleeps until the earliest one
+    expires, so an idle bot costs no CPU and utterances are flushed on time instead
+    of on the next polling tick. `on_silence(key)` is called from that thread.
+    """
+
+    def __init__(self, silence_timeout, on_silence):
+        self.silence_timeout = silence_timeout
+        self.on_silence = on_silence
+        self._deadlines = {}  # key: deadline (monotonic seconds)
+        self._heap = []  # (deadline, seq, key), at most one entry per key
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def is_running(self):
+        return self._running
+
+    def touch(self, key):
+        """(Re)arm the silence deadline for a speaker"""
+        deadline = time.monotonic() + self.silence_timeout
+        with self._cond:
+            scheduled = key in self._deadlines
+            self._deadlines[key] = deadline
+            if not scheduled:
+                heapq.heappush(self._heap, (deadline, next(self._seq), key))
+                # Only wake the thread if this became the earliest deadline
+                if self._heap[0][2] == key:
+                    self._cond.notify()
+            # An already scheduled key only moved its deadline later, the thread
+            # picks the new value up when the old heap entry expires
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="utterance-segmenter", daemon=True)
+            self._thread.start()
+        log.info("Utterance segmenter started")
+
+    def stop(self):
+        """Stop the timer thread and flush every speaker that still has a pending deadline"""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            thread = self._thread
+            self._thread = None
+            pending = list(self._deadlines)
+            self._deadlines.clear()
+            self._heap.clear()
+            self._cond.notify()
+        if thread is not threading.current_thread():
+            thread.join()
+        for key in pending:
+            self._flush(key)
+        log.info("Utterance segmenter stopped")
+
+    def flush(self, match):
+        """Flush the speakers with a pending deadline for which match(key) is true, now"""
+        with self._cond:
+            keys = [key for key in self._deadlines if match(key)]
+            for key in keys:
+                del self._deadlines[key]  # their heap entries are skipped when they come up
+        for key in keys:
+            self._flush(key)
+
+    def _flush(self, key):
+        try:
+            self.on_silence(key)
+        except Exception as e:
+            log.error(f"Utterance segmenter callback failed for {key}: {e}")
+
+    def _pop_due(self, now):
+        """Pop every speaker whose deadline has passed, called with the lock held"""
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(self._heap)
+            current = self._deadlines.get(key)
+            if current is None:
+                continue
+            if current > deadline:
+                # Re-armed since it was scheduled, wait for the new deadline
+                heapq.heappush(self._heap, (current, next(self._seq), key))
+                continue
+            del self._deadlines[key]
+            expired.append(key)
+        return expired
+
+    def _run(self):
+        while True:
+            with self._cond:
+                expired = []
+                while self._running and not expired:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    now = time.monotonic()
+                    expired = self._pop_due(now)
+                    if not expired and self._heap:
+                        self._cond.wait(self._heap[0][0] - now)
+                if not self._running:
+                    return
+            for key in expired:
+                self._flush(key)
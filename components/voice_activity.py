@@ -0,0 +1,92 @@
+from collections import deque
+import numpy as np
+
+# Frame level speech detection tuned for 20 ms Discord frames
+SPEECH_RATIO = 4.0  # frame energy must be this many times above the noise floor (~6 dB)
+MIN_SPEECH_RMS = 150  # absolute minimum RMS (int16 scale) for a frame to count as speech
+MIN_SPEECH_FRAMES = 3  # consecutive speech frames needed to open speech (filters clicks)
+HANGOVER_FRAMES = 15  # non-speech frames still kept after speech so word endings survive
+PRE_ROLL_FRAMES = 10  # frames kept from before speech was detected so word onsets survive
+NOISE_ATTACK = 0.02  # how fast the noise floor follows louder background noise
+NOISE_RELEASE = 0.5  # how fast it drops when the background gets quieter
+# Noise floor (mean square) before anything was heard. Discord only sends packets while
+# someone transmits, so a speaker's first frame is usually speech and cannot seed the floor;
+# this lets speech above ~300 RMS through from the first frame and adapts from there.
+INITIAL_NOISE_FLOOR = MIN_SPEECH_RMS ** 2
+
+
+def frame_energy(pcm):
+    """Mean square of the int16 samples in a frame"""
+    samples = np.frombuffer(pcm, np.int16).astype(np.float32)
+    if len(samples) == 0:
+        return 0.0
+    return float(np.dot(samples, samples)) / len(samples)
+
+
+class VoiceActivityGate:
+    """Streaming speech detector for a single speaker.
+
+    Compares each frame's energy against an adaptive noise floor. process() returns
+    the frames that should be buffered for transcription: nothing for noise, the
+    pre-roll plus the frame when speech starts, and every frame while speech (or its
+    hangover) lasts.
+    """
+
+    __slots__ = ("noise_floor", "speech_run", "hangover", "active", "pending",
+                 "frames_in", "frames_kept", "speech_starts")
+
+    def __init__(self):
+        self.noise_floor = INITIAL_NOISE_FLOOR
+        self.speech_run = 0
+        self.hangover = 0
+        self.active = False
+        self.pending = deque(maxlen=PRE_ROLL_FRAMES + MIN_SPEECH_FRAMES)
+        self.frames_in = 0
+        self.frames_kept = 0
+        self.speech_starts = 0
+
+    def reset(self):
+        """Forget the current speech state (kept noise floor), used when an utterance ends"""
+        self.active = False
+        self.speech_run = 0
+        self.hangover = 0
+        self.pending.clear()
+
+    def is_speech(self, energy):
+        speech = energy > MIN_SPEECH_RMS ** 2 and energy > self.noise_floor * SPEECH_RATIO
+        if not speech:
+            rate = NOISE_RELEASE if energy < self.noise_floor else NOISE_ATTACK
+            self.noise_floor += (energy - self.noise_floor) * rate
+        return speech
+
+    def process(self, pcm):
+        """Feed one frame, get back the list of frames to buffer"""
+        self.frames_in += 1
+        speech = self.is_speech(frame_energy(pcm))
+
+        if self.active:
+            if speech:
+                self.hangover = HANGOVER_FRAMES
+            else:
+                self.hangover -= 1
+                if self.hangover <= 0:
+                    self.active = False
+                    self.speech_run = 0
+                    self.pending.clear()
+                    return []
+            self.frames_kept += 1
+            return [pcm]
+
+        self.pending.append(pcm)
+        self.speech_run = self.speech_run + 1 if speech else 0
+        if self.speech_run < MIN_SPEECH_FRAMES:
+            return []
+
+        # Speech started, release the pre-roll together with the frames that confirmed it
+        self.active = True
+        self.hangover = HANGOVER_FRAMES
+        self.speech_starts += 1
+        frames = list(self.pending)
+        self.pending.clear()
+        self.frames_kept += len(frames)
+        return frames
@@ -1,82 +1,100 @@
+import logging
 import discord
 import threading
-import concurrent.futures
 from discord.ext import voice_recv
-from faster_whisper import WhisperModel
-import numpy as np
-from scipy.signal import resample, butter, filtfilt, wiener
-import time
+from faster_whisper import WhisperModel, BatchedInferencePipeline
 import os
 from datetime import datetime
 import gc
 from pathlib import Path
 import asyncio
+import time
+from components.audio_buffer import SpeakerBuffer, retained_bytes
+from components.utterance_segmenter import UtteranceSegmenter
+from components.transcription_scheduler import TranscriptionScheduler
+from components.batched_transcription import transcribe_batch
+from components.audio_preprocessing import TARGET_RATE, preprocess_pcm
+from components.voice_activity import VoiceActivityGate
+from components.streaming_transcription import BYTES_PER_SECOND, STREAM_WINDOW_BYTES, OVERLAP_BYTES, find_window_cut, stitch
+from components.transcription_profiles import TRANSCRIPTION_PROFILES, DEFAULT_LANGUAGE, get_profile, model_spec, serves_language
+from faster_whisper.tokenizer import _LANGUAGE_CODES
+from components.transcript_writer import TranscriptWriter
+from components.transcript_store import TranscriptStore
+from components.transcript_catalog import TranscriptCatalog
+from components.model_manager import ModelManager, rss_bytes
+from components.load_shedding import LoadShedder
+from components.process_backend import ProcessPool
+import components.metrics as metrics
+from components.bot_logging import context
 
+log = logging.getLogger(__name__)
 
-whisper_model = None
 
-user_audio_buffers = {}
-user_last_audio_time = {}
+user_audio_buffers = {}  # (user_id, guild_id): SpeakerBuffer
 user_names = {}
+utterance_starts = {}  # (user_id, guild_id): unix time the current utterance's first frame arrived
+last_frame_times = {}  # (user_id, guild_id): unix time the last buffered frame arrived
+speaker_gates = {}  # (user_id, guild_id): VoiceActivityGate
+partial_texts = {}  # (user_id, guild_id): text of the speaker's last streaming window
+streaming_speakers = set()  # speakers whose buffer continues a streaming window
+in_flight_utterances = set()  # Utterances handed to transcription whose line is not written yet
+flush_lock = threading.Lock()  # also guards in_flight_utterances
 SILENCE_TIMEOUT = 0.5  #seconds
+TRANSCRIPTION_WORKERS = None  # None = pick based on the device the model runs on
+BATCH_WINDOW_MS = 150  # how long a worker waits for other speakers to batch with
+MAX_BATCH_SIZE = 8
+MODEL_IDLE_GRACE = 300  # seconds the model stays loaded after the last guild stopped transcribing
+MODEL_MEMORY_BUDGET_MB = 6000  # loaded models above this are evicted, least recently used first
+LANGUAGE_MIN_PROBABILITY = 0.5  # detected languages less certain than this are detected again next time
+TRANSCRIPTION_BACKEND = "thread"  # "process" preprocesses and transcribes in separate worker processes
+TRANSCRIPTION_PROCESSES = 2  # worker processes of the process backend, each holds its own model
+MAX_QUEUED_AUDIO_SECONDS = 120  # per guild, see load_shedding.LoadShedder
+SHED_STRATEGIES = ("skip_beam", "downgrade", "drop_shortest")  # remove one to never apply it
+TRANSCRIPT_MAX_HOLD = 30  # seconds a line at most waits for the lines of utterances that started before it
+STOP_DRAIN_TIMEOUT = 30  # seconds stopping waits for the guild's queued and running utterances before closing its transcript
 
 transcribing_enabled = {}  # guild_id: bool
+guild_profiles = {}  # guild_id: profile name
+guild_languages = {}  # guild_id: whisper language code or "auto"
+speaker_languages = {}  # (user_id, guild_id): language detected on the speaker's first utterance (auto mode)
 current_voice_clients = {}  # guild_id: voice_client
+model_loads = {}  # guild_id: load task of the model the guild's held utterances wait for
 
 transcript_files = {}  # guild_id: (file_path, start_datetime)
+transcript_store = TranscriptStore()  # searchable copy of every transcript line
+# Owns the open transcript handles, writes lines in the order the utterances started
+transcript_writer = TranscriptWriter(reorder_window=TRANSCRIPT_MAX_HOLD, store=transcript_store,
+                                     watermark=lambda guild_id: transcript_watermark(guild_id))
+transcript_catalog = TranscriptCatalog()  # file list shown by /kv_transcript get
+TRANSCRIPTS_PER_PAGE = 25  # discord allows 25 options per select menu
 
-async def load_whisper_model(model_size="turbo", device="cuda", compute_type="float32"):
-    """Load the Whisper model with specified parameters"""
-    global whisper_model
-    try:
-        if whisper_model is not None:
-            print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Whisper model already loaded")
-            return True
-        
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Loading Whisper model: {model_size} on {device}")
-        whisper_model = WhisperModel(model_size, device=device, compute_type=compute_type)
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Whisper model loaded successfully")
-        return True
-    except Exception as e:
-        print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Failed to load Whisper model: {e}")
-        whisper_model = None
-        return False
-    
-async def unload_whisper_model():
-    """Unload the Whisper model and clear CUDA cache"""
-    global whisper_model
+def build_model(spec):
+    """Load a Whisper model (runs in an executor), returns (WhisperModel, BatchedInferencePipeline).
+
+    With the process backend the model is loaded in every worker process and the spec is returned.
+    """
+    if process_pool is not None:
+        process_pool.load(spec)
+        return spec
+    model_size, device, compute_type = spec
+    whisper_model = WhisperModel(model_size, device=device, compute_type=compute_type)
+    return whisper_model, BatchedInferencePipeline(model=whisper_model)
+
+def free_model(spec):
+    """Free a model nobody uses any more and clear the CUDA cache, the workers stop with the last model"""
+    if not model_manager.loaded_specs() and transcription_scheduler.shutdown(only_if_idle=True):
+        log.info("No Whisper model loaded, transcription workers stopped")
+    if process_pool is not None:
+        process_pool.unload(spec)
+        return
+    gc.collect()
     try:
-        # Check if any transcription is still active
-        if is_any_transcribing():
-            print(f"[WARNING - {datetime.now().strftime('%H:%M:%S')}] Cannot unload model - transcription still active in some guilds")
-            return False
-            
-        if whisper_model is not None:
-            print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Unloading Whisper model")
-
-            del whisper_model
-            gc.collect()
-            
-            # Clear CUDA cache if available
-            try:
-                import torch
-                if torch.cuda.is_available():
-                    torch.cuda.empty_cache()
-                    print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] CUDA cache cleared")
-            except Exception as e:
-                print(f"[WARNING - {datetime.now().strftime('%H:%M:%S')}] CUDA cache clear failed: {e}")
-
-            whisper_model = None
-            
-            print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Whisper model unloaded successfully")
-            return True
-        else:
-            print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Whisper model is not loaded")
-            return True
-            
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+            log.info("CUDA cache cleared")
     except Exception as e:
-        print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Critical error during model unloading: {e}")
-        return False
+        log.warning(f"CUDA cache clear failed: {e}")
 
 def get_transcript_file(guild_id):
     # If already open, return path
@@ -89,17 +107,21 @@ def get_transcript_file(guild_id):
     os.makedirs(f"transcripts/Guild_{guild_id}", exist_ok=True)
     file_path = os.path.join("transcripts", f"Guild_{guild_id}", f"{date_str}.txt")
     transcript_files[guild_id] = (file_path, start_dt)
-    # Touch the file
-    with open(file_path, "a", encoding="utf-8") as f:
-        f.write(f"# Transcription started at {start_dt.isoformat()}\n")
+    header = f"# Transcription started at {start_dt.isoformat()}\n"
+    transcript_catalog.register(guild_id, file_path)
+    transcript_catalog.record_write(guild_id, file_path, len(header.encode("utf-8")))
+    transcript_writer.open(guild_id, file_path, header)
     return file_path
 
 def close_transcript_file(guild_id):
+    """Write out the guild's pending lines and fsync the file (blocks until the writer is done)"""
     if guild_id in transcript_files:
-        file_path, start_dt = transcript_files[guild_id]
-        with open(file_path, "a", encoding="utf-8") as f:
-            f.write(f"# Transcription ended at {datetime.now().isoformat()}\n")
-        del transcript_files[guild_id]
+        file_path, _ = transcript_files.pop(guild_id)
+        footer = f"# Transcription ended at {datetime.now().isoformat()}\n"
+        if not transcript_writer.close(guild_id, footer):
+            log.warning(f"Timed out closing the transcript of guild {guild_id}", extra=context(guild_id=guild_id))
+        transcript_catalog.record_write(guild_id, file_path, len(footer.encode("utf-8")))
+        transcript_catalog.save(guild_id)
 
 class WhisperSink(voice_recv.BasicSink):
     def __init__(self):
@@ -114,141 +136,454 @@ class WhisperSink(voice_recv.BasicSink):
         user_id = user.id
         user_name = user.name
         pcm = data.pcm
-        now = time.time()
         # Use (user_id, guild_id) as the key
         key = (user_id, guild_id)
-        if key not in user_audio_buffers:
-            user_audio_buffers[key] = b""
-            user_last_audio_time[key] = now
-        user_audio_buffers[key] += pcm
-        user_last_audio_time[key] = now
+        metrics.voice_frames.mark(key)
+        gate = speaker_gates.get(key)
+        if gate is None:
+            gate = speaker_gates[key] = VoiceActivityGate()
+        frames = gate.process(pcm)
+        if not frames:
+            # Noise/silence is never buffered and does not extend the utterance
+            return
+        buffer = user_audio_buffers.get(key)
+        if buffer is None:
+            buffer = user_audio_buffers[key] = SpeakerBuffer()
+        for frame in frames:
+            buffer.append(frame)
         user_names[key] = user_name
+        now = time.time()
+        if key not in utterance_starts:
+            # Pre-roll frames released together with this one were spoken before it
+            utterance_starts[key] = now - sum(len(frame) for frame in frames[:-1]) / BYTES_PER_SECOND
+        last_frame_times[key] = now
+        segmenter.touch(key)
+        # Long monologues are transcribed in windows instead of one giant buffer
+        if len(buffer) >= STREAM_WINDOW_BYTES:
+            flush_speaker(key, partial=True)
 
-    def process_buffer(self, guild_id, user_id, user_name, buffer_data):
-        try:
-            # Check if model is loaded before processing
-            if whisper_model is None:
-                print(f"[WARNING - {datetime.now().strftime('%H:%M:%S')}] Whisper model not loaded, skipping transcription for {user_name}")
-                return
-            
-            raw = buffer_data
-            audio_data = np.frombuffer(raw, np.int16)
-            if audio_data.ndim == 1 and len(audio_data) % 2 == 0:
-                audio_data = audio_data.reshape(-1, 2)
-                audio_data = audio_data.mean(axis=1)
-            audio_data = audio_data.astype(np.float32) / 32768.0
-            
-            # --- ADD RMS THRESHOLD CHECK ---
-            rms = np.sqrt(np.mean(audio_data ** 2))
-            if rms < 0.003:  # Skip very quiet audio (adjust as needed)
+class Utterance:
+    """A speaker's buffered audio handed over to transcription"""
+    __slots__ = ("guild_id", "channel_id", "user_id", "user_name", "pcm", "start_time", "end_time", "continues", "partial")
+
+    def __init__(self, guild_id, channel_id, user_id, user_name, pcm, start_time, end_time, continues=False, partial=False):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.user_id = user_id
+        self.user_name = user_name
+        self.pcm = pcm  # view into the speaker's buffer, released once preprocessed
+        self.start_time = start_time  # unix time of the first and last frame
+        self.end_time = end_time
+        self.continues = continues  # continues the speaker's previous streaming window
+        self.partial = partial  # a streaming window, more of the utterance follows
+
+def release_buffer(utterance):
+    """Give the storage back to the speaker buffer so the next utterance reuses it"""
+    buffer = user_audio_buffers.get((utterance.user_id, utterance.guild_id))
+    if buffer is not None:
+        buffer.release(utterance.pcm)
+
+def transcript_watermark(guild_id):
+    """Start time of the guild's earliest utterance that may still produce a line, None if there is none.
+
+    That is a speaker still talking or an utterance still being transcribed, the writer
+    holds every line that started after it so overlapping speakers come out in order.
+    """
+    with flush_lock:
+        starts = [utterance.start_time for utterance in in_flight_utterances if utterance.guild_id == guild_id]
+        starts += [start for (_, gid), start in list(utterance_starts.items()) if gid == guild_id]
+    return min(starts, default=None)
+
+def finish_utterance(utterance):
+    """The utterance will not produce (more) text, stop holding later lines for it"""
+    with flush_lock:
+        in_flight_utterances.discard(utterance)
+
+def write_transcript_line(utterance, text):
+    """Queue a line stamped with the utterance's start and end time, the writer sorts lines by start"""
+    if text and utterance.guild_id:
+        if utterance.guild_id not in transcript_files:
+            # Only start_recording opens a transcript, a line finishing after the close is not appended behind the footer
+            log.warning(f"Dropping line of {utterance.user_name}, the transcript is closed: {text}", extra=context(guild_id=utterance.guild_id))
+            return
+        file_path = transcript_files[utterance.guild_id][0]
+        start_str = datetime.fromtimestamp(utterance.start_time).strftime("%H:%M:%S")
+        end_str = datetime.fromtimestamp(utterance.end_time).strftime("%H:%M:%S")
+        line = f"{start_str}-{end_str} - {utterance.user_name}: {text}\n"
+        record = (utterance.guild_id, utterance.channel_id, utterance.user_id, utterance.user_name,
+                  utterance.start_time, utterance.end_time, text)
+        transcript_writer.write(utterance.guild_id, utterance.start_time, line, record)
+        transcript_catalog.record_write(utterance.guild_id, file_path, len(line.encode("utf-8")))
+
+# Decoding options shared by the single and the batched path, beam settings come from the guild's profile
+# and the language from the guild's setting (or the speaker's detected language)
+TRANSCRIBE_OPTIONS = {
+    "task": "transcribe",
+    "temperature": 0.0,  # Lower temperature = more conservative
+    "without_timestamps": True,
+    "no_repeat_ngram_size": 4,
+    "log_prob_threshold": -1.5,     # Higher threshold = stricter filtering
+    "compression_ratio_threshold": 2.0,  # Lower = stricter
+    "no_speech_threshold": 0.4,     # Lower = more likely to detect speech
+}
+
+def emit_text(utterance, text):
+    """Write a recognized window, removing words it shares with the speaker's previous window"""
+    key = (utterance.user_id, utterance.guild_id)
+    previous = partial_texts.pop(key, "") if utterance.continues else ""
+    if utterance.partial:
+        partial_texts[key] = text
+    text = stitch(previous, text)
+    if utterance.partial and text:
+        text += " …"
+    write_transcript_line(utterance, text)
+    finish_utterance(utterance)
+
+def utterance_language(utterance):
+    """Language to decode an utterance in, None when it still has to be detected"""
+    language = get_guild_language(utterance.guild_id)
+    if language != "auto":
+        return language
+    return speaker_languages.get((utterance.user_id, utterance.guild_id))
+
+def remember_language(utterance, language, probability):
+    """Cache the language whisper detected on a speaker's first utterance"""
+    if language is not None and probability >= LANGUAGE_MIN_PROBABILITY:
+        speaker_languages[(utterance.user_id, utterance.guild_id)] = language
+        log.info(f"Detected language '{language}' ({probability:.0%}) for {utterance.user_name} ({utterance.guild_id})",
+                 extra=context(guild_id=utterance.guild_id, user_id=utterance.user_id))
+
+def queued_audio_seconds(guild_id):
+    """Seconds of the guild's audio waiting for a transcription worker"""
+    return sum(len(utterance.pcm) for key, (utterance,) in transcription_scheduler.queued_jobs()
+               if key[1] == guild_id) / BYTES_PER_SECOND
+
+def shed_queue(guild_id):
+    """Drop queued utterances of a guild that is over its queue budget, shortest first"""
+    def choose(jobs):
+        queued = [((key, args), len(args[0].pcm) / BYTES_PER_SECOND) for key, args in jobs if key[1] == guild_id]
+        return load_shedder.pick_drops(guild_id, queued)
+    for _, (utterance,) in transcription_scheduler.drop_queued(choose):
+        finish_utterance(utterance)
+        release_buffer(utterance)
+
+def process_buffer(utterance):
+    try:
+        # Audio recorded while the guild's model loads is held in the scheduler, see hold_until_loaded
+        with model_manager.use(utterance.guild_id) as models:
+            if models is None:
+                log.warning(f"Whisper model not loaded, skipping transcription for {utterance.user_name}",
+                            extra=context(guild_id=utterance.guild_id, user_id=utterance.user_id, sample=f"model_missing:{utterance.guild_id}"))
                 return
-            
-            gain = 15.0
-            audio_data = np.clip(audio_data * gain, -1.0, 1.0)
-            orig_sr = 48000
-            target_sr = 16000
-            if len(audio_data) > 0 and orig_sr != target_sr:
-                num_samples = int(len(audio_data) * target_sr / orig_sr)
-                audio_data = resample(audio_data, num_samples)
-
-            # Add noise reduction and normalization
-            def enhance_audio(audio_data):
-                # Normalize to prevent clipping
-                max_val = np.max(np.abs(audio_data))
-                if max_val > 0:
-                    audio_data = audio_data / max_val * 0.95
-
-                # High-pass filter (remove low-frequency noise)
-                b, a = butter(4, 100, btype='high', fs=16000)  # Slightly higher cutoff
-                audio_data = filtfilt(b, a, audio_data)
-                
-                # Low-pass filter (remove high-frequency noise)
-                b, a = butter(4, 7000, btype='low', fs=16000)
-                audio_data = filtfilt(b, a, audio_data)
-                
-                # Apply Wiener filter for noise reduction (optional)
-                try:
-                    audio_data = wiener(audio_data, noise=0.01)
-                except:
-                    pass  # Skip if wiener filter fails
-                
-                return audio_data.astype(np.float32)
-
-            # Use it before transcription:
-            audio_data = enhance_audio(audio_data)
-
-            segments, _ = whisper_model.transcribe(
-                audio_data,
-                language="pl",
-                task="transcribe",
-                temperature=0.0,  # Lower temperature = more conservative
-                beam_size=25,      # Reduce beam size for faster, more focused results
-                best_of=25,                
-                patience=2.0,     # Lower patience
-                condition_on_previous_text=False, 
-                without_timestamps=True,
-                no_repeat_ngram_size=4,
-                log_prob_threshold=-1.5,     # Higher threshold = stricter filtering
-                compression_ratio_threshold=2.0,  # Lower = stricter
-                no_speech_threshold=0.4,     # Lower = more likely to detect speech
-                vad_filter=True,
-                vad_parameters={
-                    "threshold": 0.6, 
-                    "min_speech_duration_ms": 250,  # Minimum speech duration
-                    "min_silence_duration_ms": 100 
-                }, 
+            profile = load_shedder.degrade(utterance.guild_id, get_guild_profile(utterance.guild_id),
+                                           queued_audio_seconds(utterance.guild_id))
+            language = utterance_language(utterance)
+            options = dict(
+                language=language,
+                condition_on_previous_text=False,
+                vad_filter=profile["vad_filter"],
+                vad_parameters=profile["vad_parameters"],
+                **TRANSCRIBE_OPTIONS,
+                **profile["options"],
             )
-            text = "".join([s.text for s in segments]).strip()
-            if text and guild_id:
-                file_path = get_transcript_file(guild_id)
-                now_str = datetime.now().strftime("%H:%M:%S")
-                with open(file_path, "a", encoding="utf-8") as f:
-                    f.write(f"{now_str} - {user_name}: {text}\n")
+            audio_seconds = len(utterance.pcm) / BYTES_PER_SECOND
+            if process_pool is not None:
+                # models is the spec, preprocessing happens in the worker process too
+                text, detected, probability, preprocess, inference = process_pool.transcribe(models, utterance.pcm, options)
+            else:
+                whisper_model, _ = models
+                start = time.perf_counter()
+                audio_data = preprocess_pcm(utterance.pcm)
+                preprocess = time.perf_counter() - start
+                if audio_data is None:
+                    metrics.preprocess_seconds.observe(preprocess)
+                    emit_text(utterance, "")
+                    return
+                start = time.perf_counter()
+                segments, info = whisper_model.transcribe(audio_data, **options)
+                text = "".join([s.text for s in segments]).strip()
+                inference = time.perf_counter() - start
+                detected, probability = info.language, info.language_probability
+            metrics.observe_transcription(audio_seconds, [preprocess], inference)
+            if language is None:
+                remember_language(utterance, detected, probability)
+        emit_text(utterance, text)
+    except Exception as e:
+        log.error(f"Exception in process_buffer for {utterance.user_name} ({utterance.guild_id}): {e}",
+                  extra=context(guild_id=utterance.guild_id, user_id=utterance.user_id))
+    finally:
+        finish_utterance(utterance)
+        release_buffer(utterance)
+
+def process_batch(jobs):
+    """Transcribe utterances of several speakers in one batched call per model and language"""
+    ready = []  # (utterance, audio, preprocess_seconds)
+    for (utterance,) in jobs:
+        if utterance_language(utterance) is None:
+            # The batched pipeline detects one language for the whole batch, detect this speaker's alone
+            process_buffer(utterance)
+            continue
+        try:
+            start = time.perf_counter()
+            audio_data = preprocess_pcm(utterance.pcm)
+            preprocess = time.perf_counter() - start
+            if audio_data is not None:
+                ready.append((utterance, audio_data, preprocess))
+            else:
+                metrics.preprocess_seconds.observe(preprocess)
+                emit_text(utterance, "")
+        except Exception as e:
+            log.error(f"Exception preparing audio for {utterance.user_name} ({utterance.guild_id}): {e}",
+                      extra=context(guild_id=utterance.guild_id, user_id=utterance.user_id))
+            finish_utterance(utterance)
+        finally:
+            release_buffer(utterance)
+    # Utterances are only batched with others decoded by the same model, profile and language
+    groups = {}  # (spec, profile name, language): (profile, items)
+    queued = {}  # guild_id: queued audio seconds, the load the profile is degraded by
+    for utterance, audio, preprocess in ready:
+        if utterance.guild_id not in queued:
+            queued[utterance.guild_id] = queued_audio_seconds(utterance.guild_id)
+        profile = load_shedder.degrade(utterance.guild_id, get_guild_profile(utterance.guild_id), queued[utterance.guild_id])
+        key = (model_manager.guild_spec(utterance.guild_id), profile["name"], utterance_language(utterance))
+        groups.setdefault(key, (profile, []))[1].append((utterance, audio, preprocess))
+
+    for (_, _, language), (profile, items) in groups.items():
+        guild_id = items[0][0].guild_id
+        try:
+            with model_manager.use(guild_id) as models:
+                if models is None:
+                    log.warning(f"Whisper model not loaded, skipping transcription of {len(items)} utterances",
+                                extra=context(guild_id=guild_id, sample=f"model_missing:{guild_id}"))
+                    for utterance, _, _ in items:
+                        finish_utterance(utterance)
+                    continue
+                _, batched_model = models
+                start = time.perf_counter()
+                texts = transcribe_batch(
+                    batched_model,
+                    [audio for _, audio, _ in items],
+                    batch_size=MAX_BATCH_SIZE,
+                    language=language,
+                    vad_filter=profile["vad_filter"],
+                    vad_parameters=profile["vad_parameters"],
+                    **TRANSCRIBE_OPTIONS,
+                    **profile["options"],
+                )
+                metrics.observe_transcription(sum(len(audio) for _, audio, _ in items) / TARGET_RATE,
+                                              [preprocess for _, _, preprocess in items], time.perf_counter() - start)
         except Exception as e:
-            print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Exception in process_buffer for {user_name} ({guild_id}): {e}")
+            log.error(f"Exception in batched transcription of {len(items)} utterances: {e}", extra=context(guild_id=guild_id))
+            for utterance, _, _ in items:
+                finish_utterance(utterance)
+            continue
+        for (utterance, _, _), text in zip(items, texts):
+            emit_text(utterance, text)
 
-# Create a dictionary to hold per-user executors
-user_executors = {}
+def default_worker_count(device):
+    """How many transcriptions may run against the model at the same time"""
+    if device == "cuda":
+        return 2
+    # CTranslate2 already uses several threads per call on CPU
+    return max(1, (os.cpu_count() or 1) // 4)
 
-def get_user_executor(user_id):
-    # Each user gets their own single-thread executor
-    if user_id not in user_executors:
-        user_executors[user_id] = concurrent.futures.ThreadPoolExecutor(max_workers=1)
-    return user_executors[user_id]
+def size_workers():
+    """Size the worker pool for the devices of the loaded models, before their first utterance is submitted"""
+    if process_pool is not None:
+        workers = process_pool.size
+    else:
+        devices = {spec[1] for spec in model_manager.loaded_specs()}
+        workers = TRANSCRIPTION_WORKERS or max((default_worker_count(device) for device in devices), default=1)
+    transcription_scheduler.resize(workers)
 
-# Silence watcher: also copy and clear buffer before processing
-def silence_watcher():
-    while True:
-        now = time.time()
-        for key in list(user_audio_buffers.keys()):
-            user_id, guild_id = key
-            last = user_last_audio_time.get(key, now)
-            if len(user_audio_buffers[key]) > 0 and now - last > SILENCE_TIMEOUT:
-                buffer_copy = user_audio_buffers[key]
-                user_audio_buffers[key] = b""
-                user_name = user_names.get(key, "unknown")
-                executor = get_user_executor(user_id)
-                try:
-                    executor.submit(WhisperSink().process_buffer, guild_id, user_id, user_name, buffer_copy)
-                except Exception as e:
-                    print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Failed to submit process_buffer for {user_name} ({guild_id}): {e}")
-        time.sleep(0.2)
-
-threading.Thread(target=silence_watcher, daemon=True).start()
+process_pool = ProcessPool(TRANSCRIPTION_PROCESSES) if TRANSCRIPTION_BACKEND == "process" else None
+
+# One shared pool for all speakers, utterances of the same speaker stay sequential.
+# The process backend transcribes one utterance per process, so it does not batch.
+transcription_scheduler = TranscriptionScheduler(
+    process_buffer,
+    workers=default_worker_count("cuda"),
+    batch_handler=process_batch if process_pool is None else None,
+    batch_window=BATCH_WINDOW_MS / 1000,
+    max_batch_size=MAX_BATCH_SIZE,
+)
+
+metrics.gauge("transcription_queue_depth", "Utterances waiting for a transcription worker",
+              func=lambda: transcription_scheduler.get_stats()["queued"])
+metrics.gauge("transcription_workers_busy", "Transcription workers currently running a job",
+              func=lambda: transcription_scheduler.get_stats()["running"])
+metrics.gauge("speaker_buffer_retained_bytes", "PCM storage speaker buffers keep for their next utterance",
+              func=retained_bytes)
+
+load_shedder = LoadShedder(MAX_QUEUED_AUDIO_SECONDS, SHED_STRATEGIES)
+
+if process_pool is None:
+    model_manager = ModelManager(build_model, free_model, idle_grace=MODEL_IDLE_GRACE, memory_budget_mb=MODEL_MEMORY_BUDGET_MB)
+else:
+    # Every worker process holds its own copy of each model, their memory counts against the budget
+    model_manager = ModelManager(build_model, free_model, idle_grace=MODEL_IDLE_GRACE, memory_budget_mb=MODEL_MEMORY_BUDGET_MB,
+                                 memory=lambda: rss_bytes() + process_pool.rss_bytes(), copies=process_pool.size)
+
+def flush_speaker(key, partial=False):
+    """Hand a speaker's finished utterance (or, with partial, a streaming window) over to transcription"""
+    with flush_lock:
+        buffer = user_audio_buffers.get(key)
+        if buffer is None or len(buffer) == 0:
+            if not partial:
+                # Nothing buffered (e.g. the callback raced the flush), a start left behind would hold back the watermark
+                utterance_starts.pop(key, None)
+            return
+        end_time = last_frame_times.get(key) or time.time()
+        if partial:
+            if len(buffer) < STREAM_WINDOW_BYTES:
+                return
+            # Cut at a pause and keep an overlap buffered so the next window has context
+            upto = find_window_cut(buffer.view())
+            end_time -= (len(buffer) - upto) / BYTES_PER_SECOND
+            start_time = utterance_starts.get(key, end_time)
+            utterance_starts[key] = end_time - min(OVERLAP_BYTES, upto) / BYTES_PER_SECOND
+            buffer_copy = buffer.take(upto=upto, carry=OVERLAP_BYTES)
+        else:
+            start_time = utterance_starts.pop(key, end_time)
+            buffer_copy = buffer.take()
+            # The utterance ended, the next frame has to prove it is speech again
+            gate = speaker_gates.get(key)
+            if gate is not None:
+                gate.reset()
+        continues = key in streaming_speakers
+        if partial:
+            streaming_speakers.add(key)
+        else:
+            streaming_speakers.discard(key)
+        user_id, guild_id = key
+        user_name = user_names.get(key, "unknown")
+        vc = current_voice_clients.get(guild_id)
+        channel_id = vc.channel.id if vc is not None and vc.channel is not None else None
+        utterance = Utterance(guild_id, channel_id, user_id, user_name, buffer_copy, start_time, end_time, continues, partial)
+        # Registered before utterance_starts stops covering it, the watermark never skips it
+        in_flight_utterances.add(utterance)
+    try:
+        transcription_scheduler.submit(key, utterance)
+    except Exception as e:
+        finish_utterance(utterance)
+        log.error(f"Failed to submit process_buffer for {user_name} ({guild_id}): {e}", extra=context(guild_id=guild_id, user_id=user_id))
+        return
+    shed_queue(guild_id)
+
+segmenter = UtteranceSegmenter(SILENCE_TIMEOUT, flush_speaker)
+recording_guilds = set()  # guild_ids with an active WhisperSink
 
 def is_transcribing(guild_id):
     return transcribing_enabled.get(guild_id, False)
 
+def get_vad_stats(guild_id=None):
+    """How much received audio the voice activity gate kept, optionally for one guild"""
+    gates = [gate for (_, gid), gate in list(speaker_gates.items()) if guild_id is None or gid == guild_id]
+    frames_in = sum(gate.frames_in for gate in gates)
+    frames_kept = sum(gate.frames_kept for gate in gates)
+    return {
+        "frames_in": frames_in,
+        "frames_kept": frames_kept,
+        "dropped_ratio": 1 - frames_kept / frames_in if frames_in else 0.0,
+        "speech_starts": sum(gate.speech_starts for gate in gates),
+    }
+
+def get_queue_stats():
+    """Transcription queue depth and wait time metrics"""
+    return transcription_scheduler.get_stats()
+
+def get_backpressure_stats(guild_id):
+    """How far the guild's transcript is behind, its queued audio and what load shedding did"""
+    with flush_lock:
+        ends = [utterance.end_time for utterance in in_flight_utterances if utterance.guild_id == guild_id]
+    queued = queued_audio_seconds(guild_id)
+    return {
+        "lag": time.time() - min(ends) if ends else 0.0,  # age of the oldest speech not transcribed yet
+        "queued_seconds": queued,
+        "max_queued_seconds": load_shedder.max_queued_seconds,
+        "strategy": load_shedder.strategy(queued),
+        **load_shedder.get_stats(guild_id),
+    }
+
+def get_frame_rates(guild_id=None):
+    """user_name: voice frames per second received from each active speaker, optionally of one guild"""
+    return {user_names.get(key, "unknown"): rate for key, rate in metrics.voice_frames.rates().items()
+            if guild_id is None or key[1] == guild_id}
+
 def is_any_transcribing():
     """Check if any guild is currently transcribing"""
     return any(transcribing_enabled.values())
 
+def get_guild_profile(guild_id):
+    """Resolved transcription profile of a guild (default depends on the detected device)"""
+    return get_profile(guild_profiles.get(guild_id), get_guild_language(guild_id))
+
+def set_guild_profile(guild_id, profile_name):
+    if profile_name not in TRANSCRIPTION_PROFILES:
+        return False
+    guild_profiles[guild_id] = profile_name
+    return True
+
+def get_guild_language(guild_id):
+    return guild_languages.get(guild_id, DEFAULT_LANGUAGE)
+
+def set_guild_language(guild_id, language):
+    """Set the language a guild speaks, "auto" detects it per speaker. False if whisper does not know it"""
+    if language != "auto" and language not in _LANGUAGE_CODES:
+        return False
+    guild_languages[guild_id] = language
+    for key in [key for key in speaker_languages if key[1] == guild_id]:
+        del speaker_languages[key]
+    return True
+
+def get_speaker_languages(guild_id):
+    """user_name: detected language of the guild's speakers (auto mode)"""
+    return {user_names.get(key, "unknown"): language for key, language in list(speaker_languages.items()) if key[1] == guild_id}
+
+def hold_until_loaded(guild_id, task):
+    """Keep the guild's utterances queued until its model load task is done.
+
+    They stay in the scheduler without taking a worker, other guilds' utterances
+    keep being transcribed meanwhile.
+    """
+    if task.done():
+        if model_loads.pop(guild_id, None) is not None:
+            transcription_scheduler.unhold(guild_id)
+        return
+    model_loads[guild_id] = task
+    transcription_scheduler.hold(guild_id, lambda key: key[1] == guild_id)
+
+    def loaded(_):
+        # A later acquire() may have replaced the load this guild waits for
+        if model_loads.get(guild_id) is task:
+            del model_loads[guild_id]
+            transcription_scheduler.unhold(guild_id)
+    task.add_done_callback(loaded)
+
 async def set_transcribing(guild_id, value : bool):
-    transcribing_enabled[guild_id] = value
+    """Turn transcription on or off, the model loads (or is kept warm) in the background.
+
+    Returns False when the guild's model does not fit the memory budget and no loaded
+    model speaks its language, transcription stays as it was then.
+    """
     if value:
-        await load_whisper_model()
+        profile = get_guild_profile(guild_id)
+        task = model_manager.acquire(guild_id, model_spec(profile),
+                                     can_share=lambda spec: serves_language(spec, profile["language"]))
+        if task is None:
+            return False
+        hold_until_loaded(guild_id, task)
+        size_workers()
     else:
-        await unload_whisper_model()
+        model_manager.release(guild_id)
+    transcribing_enabled[guild_id] = value
+    return True
+
+def get_model_stats(guild_id=None):
+    """State, load time and resident memory of the guild's Whisper model, or of all loaded models"""
+    if guild_id is not None:
+        return model_manager.model_stats(guild_id)
+    return model_manager.get_stats()
 
 async def start_recording(vc, guild_id):
     current_voice_clients[guild_id] = vc
@@ -256,44 +591,61 @@ async def start_recording(vc, guild_id):
     get_transcript_file(guild_id)
     while not vc.is_connected():
         await asyncio.sleep(0.1)
+    load_shedder.reset(guild_id)
+    # The segmenter thread only runs while at least one guild is recording
+    recording_guilds.add(guild_id)
+    segmenter.start()
     vc.listen(WhisperSink())
         
 
+def has_in_flight(guild_id):
+    """Whether utterances of the guild are still queued or being transcribed"""
+    with flush_lock:
+        return any(utterance.guild_id == guild_id for utterance in in_flight_utterances)
+
 async def stop_recording(vc, guild_id):
     vc.stop_listening()
+    recording_guilds.discard(guild_id)
+    # Hand the guild's unfinished utterances over now, other guilds keep their deadlines
+    segmenter.flush(lambda key: key[1] == guild_id)
+    if not recording_guilds:
+        segmenter.stop()
     current_voice_clients.pop(guild_id, None)
-    close_transcript_file(guild_id)
-
-def get_transcripts(guild_id):
-    """Get a list of transcript files for the given guild ID"""   
-    guild_folder = f"transcripts/Guild_{guild_id}"
-    transcript_files = []
-    if not os.path.exists(guild_folder):
-        return []
-            
-    for file_path in Path(guild_folder).glob("*.txt"):
-        stat = file_path.stat()
-        transcript_files.append((file_path, stat.st_mtime))
-
-    if not transcript_files:
-        return []
-    transcript_files.sort(key=lambda x: x[1], reverse=True)
+    # Their lines still have to be written before the footer
+    deadline = time.monotonic() + STOP_DRAIN_TIMEOUT
+    while has_in_flight(guild_id):
+        if time.monotonic() >= deadline:
+            log.warning("Closing the transcript with utterances still being transcribed, their lines are dropped", extra=context(guild_id=guild_id))
+            break
+        await asyncio.sleep(0.1)
+    # Closing fsyncs the file, keep that off the event loop
+    await asyncio.get_running_loop().run_in_executor(None, close_transcript_file, guild_id)
+
+async def search_transcripts(guild_id, text):
+    """Find transcript lines of a guild matching text, see TranscriptStore.search"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, transcript_store.search, guild_id, text)
+
+def get_transcript_count(guild_id):
+    return len(transcript_catalog.entries(guild_id))
+
+def get_transcripts(guild_id, page=0):
+    """Select options for one page of the guild's transcript files, newest first"""
+    entries = transcript_catalog.entries(guild_id)
+    first = page * TRANSCRIPTS_PER_PAGE
 
     options = []
-    # Limit to the last 25 files - discord has a limit of 25 options per select menu
-    for i, (file_path, mtime) in enumerate(transcript_files[:25]):
+    for file_path, mtime, size in entries[first:first + TRANSCRIPTS_PER_PAGE]:
         file_date = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M")
-        file_size = file_path.stat().st_size
-        size_kb = file_size / 1024
-        
+        size_kb = size / 1024
+
         # Create label with date and size
-        label = f"{file_path.stem} ({size_kb:.1f}KB)"
+        label = f"{Path(file_path).stem} ({size_kb:.1f}KB)"
         description = f"Modified: {file_date}"
-        
+
         options.append(discord.SelectOption(
             label=label,
             description=description,
             value=str(file_path)
         ))
     return options
-
@@ -1,11 +1,19 @@
+import logging
 import discord
 import yt_dlp
 import asyncio
 import imageio_ffmpeg
 from discord import FFmpegPCMAudio, PCMVolumeTransformer
 import components.audio_manager as audio_mgr
-from datetime import datetime
+import components.metrics as metrics
+from components.bot_logging import context
+from components.read_ahead import ReadAheadSource
+from components.track_chain import TrackChain
+from components.extraction_pool import ExtractionPool
 import time
+import re
+
+log = logging.getLogger(__name__)
 
 # Get bundled FFmpeg executable
 ffmpeg_executable = imageio_ffmpeg.get_ffmpeg_exe()
@@ -30,11 +38,38 @@ ffmpeg_options = {
     'options': '-vn',
 }
 
+MAX_ENQUEUE_SONGS = 100  # songs one /kv_enqueue adds at most, longer playlists are cut
+PROGRESS_INTERVAL = 2.0  # seconds between progress reports of a bulk enqueue
+UNAVAILABLE_TITLES = ("[Deleted video]", "[Private video]")  # placeholders flat playlist listings keep
+
+# Playlists and searches are only listed (id, title, duration, uploader), their songs resolved when they play
+ytdl_flat_options = {
+    **ytdl_format_options,
+    'extract_flat': 'in_playlist',
+    'playlistend': MAX_ENQUEUE_SONGS,
+}
+
 ytdl = yt_dlp.YoutubeDL(ytdl_format_options)
+# All extractions run here instead of the default executor, a few at a time
+extraction_pool = ExtractionPool()
+metrics.gauge("ytdlp_extractions_queued", "yt-dlp extractions waiting for the extraction pool",
+              func=lambda: extraction_pool.get_stats()["queued"])
+metrics.gauge("ytdlp_extractions_running", "yt-dlp extractions currently running",
+              func=lambda: extraction_pool.get_stats()["running"])
+PREFETCH_SECONDS = 10  # the next queued song starts decoding this long before the current one ends
+CROSSFADE_SECONDS = 0  # above 0, songs fade into each other for this long instead of being spliced
+
+def extract_info(url, *, download=False, flat=False):
+    """Blocking yt-dlp extraction, run it through extraction_pool"""
+    options = ytdl_flat_options if flat else ytdl_format_options
+    ytdl_instance = extraction_pool.per_thread(flat, lambda: yt_dlp.YoutubeDL(options))
+    with metrics.ytdlp_seconds.time():
+        return ytdl_instance.extract_info(url, download=download)
 
 class YTAudio:
-    def __init__(self, source, data, time_played=0):
+    def __init__(self, source, data, time_played=0, chain=None):
         self.source = source
+        self.chain = chain  # the TrackChain playing this song, and the queued songs after it
         self.data = data  # Store the full YouTube data
         self.title = data.get('title')
         self.url = data.get('url')  # This is the stream URL
@@ -51,7 +86,13 @@ class YTAudio:
             self.time_played += time.time() - self.start_time
             self.is_paused = True
             self.start_time = None
-            print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Yt audio paused at {self.time_played:.1f}s")
+            log.info(f"Yt audio paused at {self.time_played:.1f}s")
+
+    def unpause(self):
+        """Count playback time again after the paused stream continued"""
+        if self.is_paused:
+            self.start_time = time.time()
+            self.is_paused = False
 
     def get_time_played(self):
         """Get current playback time"""
@@ -59,34 +100,6 @@ class YTAudio:
             return self.time_played
         return self.time_played + (time.time() - self.start_time)
 
-    async def resume(self, voice_client):
-        """Resume playback from current position"""
-        current_time = self.get_time_played()
-        seek_time = max(0, min(current_time, self.duration-1))
-
-        print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Yt audio resuming from {seek_time:.1f}s")
-        
-        try:
-            # Create new source with seek
-            seek_options = ffmpeg_options.copy()
-            if seek_time > 0:
-                seek_options['before_options'] = f'-ss {seek_time} ' + seek_options.get('before_options', '')
-            
-            # Use the original stream URL from data
-            filename = self.data['url']
-            
-            source = FFmpegPCMAudio(
-                filename,
-                executable=ffmpeg_executable,
-                **seek_options
-            )
-
-            await play(voice_client, voice_client.guild.id, YTDLSource(source, data=self.data), start_time=seek_time)
-
-        except Exception as e:
-            print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Error resuming: {e}")
-            return False
-
 class YTDLSource(PCMVolumeTransformer):
     def __init__(self, source, *, data, volume=0.5):
         super().__init__(source, volume)
@@ -95,26 +108,57 @@ class YTDLSource(PCMVolumeTransformer):
         self.url = data.get('url')
         self.duration = data.get('duration')
         self.uploader = data.get('uploader')
+        self.entry = None  # the QueueEntry this was resolved from, None if it was not queued
 
-    @classmethod
-    async def from_url(cls, url, *, loop=None, stream=False):
-        loop = loop or asyncio.get_event_loop()
-        data = await loop.run_in_executor(None, lambda: ytdl.extract_info(url, download=not stream))
+    @staticmethod
+    async def extract(url, *, download=False):
+        """Run yt-dlp on a URL or search query, the first item of a playlist"""
+        data = await extraction_pool.run(lambda: extract_info(url, download=download))
 
         if 'entries' in data:
             # Take first item from a playlist
             data = data['entries'][0]
+        return data
+
+    @classmethod
+    async def from_url(cls, url, *, loop=None, stream=False):
+        data = await cls.extract(url, download=not stream)
 
         filename = data['url'] if stream else ytdl.prepare_filename(data)
         
-        # Use bundled FFmpeg executable
-        source = FFmpegPCMAudio(
+        # Use bundled FFmpeg executable, decoded ahead so pausing keeps the stream open
+        source = ReadAheadSource(FFmpegPCMAudio(
             filename, 
             executable=ffmpeg_executable,
             **ffmpeg_options
-        )
+        ))
         
         return cls(source, data=data)
+
+class QueueEntry:
+    """A queued song: only what the queue shows, the stream is resolved right before it plays.
+
+    Stream URLs expire and every FFmpegPCMAudio is a process, so neither is kept
+    for songs that are still waiting.
+    """
+    __slots__ = ("title", "uploader", "duration", "webpage_url")
+
+    def __init__(self, title, uploader, duration, webpage_url):
+        self.title = title
+        self.uploader = uploader
+        self.duration = duration
+        self.webpage_url = webpage_url
+
+    @classmethod
+    def from_info(cls, data):
+        return cls(data.get('title'), data.get('uploader') or data.get('channel'), data.get('duration'),
+                   data.get('webpage_url') or data.get('url'))
+
+    async def resolve(self):
+        """Extract a fresh stream URL and open it"""
+        source = await YTDLSource.from_url(self.webpage_url, stream=True)
+        source.entry = self
+        return source
     
 async def play(voice_client, guild_id, source, start_time=0):
     """Play a song in the voice channel"""
@@ -123,28 +167,72 @@ async def play(voice_client, guild_id, source, start_time=0):
         if guild_id in audio_mgr.music_volumes:
             source.volume = audio_mgr.music_volumes[guild_id]
 
-        # Stop whatever is playing
-        audio_mgr.stop_audio(voice_client)
-        
+        loop = asyncio.get_running_loop()
+        duration = source.duration - start_time if source.duration else None
+        # Queued songs follow this one in the same chain, opened PREFETCH_SECONDS before it ends
+        chain = TrackChain(
+            source, duration, prefetch_seconds=PREFETCH_SECONDS, crossfade_seconds=CROSSFADE_SECONDS,
+            on_near_end=lambda: asyncio.run_coroutine_threadsafe(prefetch_next(guild_id, chain), loop),
+            on_switch=lambda track: loop.call_soon_threadsafe(track_started, guild_id, chain, track),
+        )
+
         # Create YTAudio with proper data
-        yt_audio = YTAudio(source, source.data, time_played=start_time)
+        yt_audio = YTAudio(source, source.data, time_played=start_time, chain=chain)
         audio_mgr.current_youtube_players[guild_id] = yt_audio
-        loop = asyncio.get_running_loop()
 
         def after_playing(error):
             if error:
-                print(f'[ERROR - {datetime.now().strftime("%H:%M:%S")}] Player error: {error}')
-            # Only proceed if this source is still the current one
-            if audio_mgr.current_youtube_players.get(guild_id) == yt_audio:
+                log.error(f"Player error: {error}", extra=context(guild_id=guild_id))
+            # Only proceed if this chain is still the one playing
+            current = audio_mgr.current_youtube_players.get(guild_id)
+            if current is not None and current.chain is chain:
                 audio_mgr.current_youtube_players.pop(guild_id, None)
-                print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Launching play_next() after {yt_audio.title}")
+                log.info(f"Launching play_next() after {current.title}", extra=context(guild_id=guild_id))
                 fut = asyncio.run_coroutine_threadsafe(play_next(voice_client, guild_id), loop)
             else:
-                print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Skipping callback - {yt_audio.title} is no longer current")
+                log.info(f"Skipping callback - {yt_audio.title} is no longer current", extra=context(guild_id=guild_id))
 
-        voice_client.play(source, after=after_playing)
+        # Replaces the song playing now, speech and background music keep playing
+        audio_mgr.mix(voice_client, chain, "youtube", after=after_playing, replace=True)
+    except Exception as e:
+        log.error(f"Error playing song: {e}", extra=context(guild_id=guild_id))
+
+async def prefetch_next(guild_id, chain):
+    """Resolve the first queued song and hand it to the chain decoding, so it follows without a gap"""
+    current = audio_mgr.current_youtube_players.get(guild_id)
+    queue = audio_mgr.music_queues.get(guild_id)
+    if current is None or current.chain is not chain or chain.upcoming is not None or not queue:
+        return
+    entry = queue[0]
+    try:
+        source = await entry.resolve()
     except Exception as e:
-        print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Error playing song: {e}")
+        log.error(f"Error prefetching {entry.title}: {e}", extra=context(guild_id=guild_id))
+        return  # play_next() tries again when the current song ended
+    # The song, the queue or the chain may have changed while yt-dlp ran
+    current = audio_mgr.current_youtube_players.get(guild_id)
+    queue = audio_mgr.music_queues.get(guild_id)
+    if current is None or current.chain is not chain or chain.upcoming is not None or not queue or queue[0] is not entry:
+        source.cleanup()
+        return
+    if guild_id in audio_mgr.music_volumes:
+        source.volume = audio_mgr.music_volumes[guild_id]
+    source.original.start()
+    replaced = chain.set_next(source, source.duration)
+    if replaced is not None:
+        replaced.cleanup()
+    log.info(f"Prefetching next song: {source.title}", extra=context(guild_id=guild_id))
+
+def track_started(guild_id, chain, source):
+    """The chain went on to the prefetched song, it is the current song now"""
+    current = audio_mgr.current_youtube_players.get(guild_id)
+    if current is None or current.chain is not chain:
+        return
+    queue = audio_mgr.music_queues.get(guild_id)
+    if queue and queue[0] is source.entry:
+        queue.pop(0)
+    audio_mgr.current_youtube_players[guild_id] = YTAudio(source, source.data, chain=chain)
+    log.info(f"Playing next song: {source.title} (gapless)", extra=context(guild_id=guild_id))
 
 async def play_instantly(voice_client, guild_id, url):
     """Play a song instantly (stops current music)"""
@@ -153,43 +241,133 @@ async def play_instantly(voice_client, guild_id, url):
         await play(voice_client, guild_id, source)
         return source.title, source.uploader
     except Exception as e:
-        print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Error playing instantly: {e}")
+        log.error(f"Error playing instantly: {e}", extra=context(guild_id=guild_id))
         return None, None
     
 async def play_next(voice_client, guild_id):
     """Play the next song in the queue"""
     try:
         await asyncio.sleep(0.1) 
-        if guild_id in audio_mgr.music_queues and audio_mgr.music_queues.get(guild_id):
-            print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Songs in queue for guild {guild_id}: {len(audio_mgr.music_queues[guild_id])}")
-            if audio_mgr.get_current_audio_type(guild_id) in ['background', None]:
-                source = audio_mgr.music_queues[guild_id].pop(0)
-                print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Playing next song: {source.title} in {voice_client.channel.name}")
-                await play(voice_client, guild_id, source)
-                return source.title, source.uploader
-            elif audio_mgr.get_current_audio_type(guild_id) != 'youtube':
-                loop = asyncio.get_running_loop()
-                fut = asyncio.run_coroutine_threadsafe(play_next(voice_client, guild_id), loop)
-            else:
-                print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] Canceling play_next() because youtube is currently playing in {voice_client.channel.name}")
-        else:
-            print(f"[INFO - {datetime.now().strftime('%H:%M:%S')}] No songs in queue for guild {guild_id}")
+        queue = audio_mgr.music_queues.get(guild_id)
+        if not queue:
+            log.info(f"No songs in queue for guild {guild_id}", extra=context(guild_id=guild_id))
+        while queue:
+            log.info(f"Songs in queue for guild {guild_id}: {len(queue)}", extra=context(guild_id=guild_id))
+            if audio_mgr.is_playing_youtube(guild_id):
+                log.info(f"Canceling play_next() because youtube is currently playing in {voice_client.channel.name}", extra=context(guild_id=guild_id))
+                break
+            entry = queue.pop(0)
+            try:
+                source = await entry.resolve()
+            except Exception as e:
+                log.error(f"Error loading {entry.title}, skipping it: {e}", extra=context(guild_id=guild_id))
+                continue
+            if audio_mgr.is_playing_youtube(guild_id):
+                # Something else started while yt-dlp ran, the song stays first in line
+                source.cleanup()
+                queue.insert(0, entry)
+                log.info(f"Canceling play_next() because youtube is currently playing in {voice_client.channel.name}", extra=context(guild_id=guild_id))
+                break
+            log.info(f"Playing next song: {source.title} in {voice_client.channel.name}", extra=context(guild_id=guild_id))
+            await play(voice_client, guild_id, source)
+            return source.title, source.uploader
     except Exception as e:
-        print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Error playing next song: {e}")
+        log.error(f"Error playing next song: {e}", extra=context(guild_id=guild_id))
     return None, None
     
+async def prefetch_if_near_end(guild_id):
+    """Songs enqueued when the current one is already close to its end are prefetched at once"""
+    current = audio_mgr.current_youtube_players.get(guild_id)
+    if current is not None and current.chain is not None and current.chain.near_end():
+        await prefetch_next(guild_id, current.chain)
+
 async def add_to_queue(guild_id, url):
-    """Add a song to the queue (enqueue)"""
+    """Add a song to the queue (enqueue), its stream is only opened when it is about to play"""
     try:
-        source = await YTDLSource.from_url(url, stream=True)
+        entry = QueueEntry.from_info(await YTDLSource.extract(url))
         if guild_id not in audio_mgr.music_queues:
             audio_mgr.music_queues[guild_id] = []
-        audio_mgr.music_queues[guild_id].append(source)
-        return source.title, source.uploader
+        audio_mgr.music_queues[guild_id].append(entry)
+        await prefetch_if_near_end(guild_id)
+        return entry.title, entry.uploader
     except Exception as e:
-        print(f"[ERROR - {datetime.now().strftime('%H:%M:%S')}] Error adding to queue: {e}")
+        log.error(f"Error adding to queue: {e}", extra=context(guild_id=guild_id))
         return None, None
 
+def split_queries(text):
+    """Several songs in one /kv_enqueue, separated by ';' or new lines"""
+    return [query.strip() for query in re.split(r"[;\n]", text) if query.strip()]
+
+async def list_query(query):
+    """QueueEntries for a URL, search or playlist, and the titles of songs that are unavailable.
+
+    Playlists are listed flat, one request for all their songs; only songs the
+    listing has no title for are extracted one by one, concurrently on the pool.
+    """
+    data = await extraction_pool.run(lambda: extract_info(query, flat=True))
+    items = list(data['entries']) if 'entries' in data else [data]
+    skipped = [item.get('title') or item.get('url') for item in items if item and item.get('title') in UNAVAILABLE_TITLES]
+    items = [item for item in items if item and item.get('title') not in UNAVAILABLE_TITLES]
+
+    async def to_entry(item):
+        if item.get('title'):
+            return QueueEntry.from_info(item)
+        return QueueEntry.from_info(await YTDLSource.extract(item.get('webpage_url') or item['url']))
+
+    entries = []
+    for item, result in zip(items, await asyncio.gather(*(to_entry(item) for item in items), return_exceptions=True)):
+        if isinstance(result, Exception):
+            log.error(f"Error loading {item.get('url')}: {result}")
+            skipped.append(item.get('url'))
+        else:
+            entries.append(result)
+    return entries, skipped
+
+async def enqueue_many(guild_id, queries, on_progress=None):
+    """Add songs, searches and whole playlists to the queue.
+
+    All queries are listed concurrently on the extraction pool. Their songs join the
+    queue in the order of the queries, each query's as soon as it and every query
+    before it are listed, so the first songs can play while the rest still load.
+    `await on_progress(added, failed, done, total)` is called at most every
+    PROGRESS_INTERVAL seconds while queries remain.
+
+    Returns the added entries, the 1-based queue position of each one as the queue
+    stands when all queries are done (None for an entry that already left the queue
+    to play) and the queries or songs that failed.
+    """
+    tasks = [asyncio.create_task(list_query(query)) for query in queries]
+    added, failed = [], []
+    last_progress = time.monotonic()
+    try:
+        for done, (query, task) in enumerate(zip(queries, tasks), 1):
+            try:
+                entries, skipped = await task
+            except Exception as e:
+                log.error(f"Error adding '{query}' to queue: {e}", extra=context(guild_id=guild_id))
+                entries, skipped = [], [query]
+            failed.extend(skipped)
+            entries = entries[:MAX_ENQUEUE_SONGS - len(added)]
+            if entries:
+                if guild_id not in audio_mgr.music_queues:
+                    audio_mgr.music_queues[guild_id] = []
+                queue = audio_mgr.music_queues[guild_id]
+                queue.extend(entries)
+                added.extend(entries)
+                await prefetch_if_near_end(guild_id)
+            if on_progress is not None and done < len(queries) and time.monotonic() - last_progress >= PROGRESS_INTERVAL:
+                last_progress = time.monotonic()
+                await on_progress(len(added), len(failed), done, len(queries))
+    finally:
+        # Only left running when the caller was cancelled
+        for task in tasks:
+            task.cancel()
+    log.info(f"Enqueued {len(added)} songs from {len(queries)} queries, {len(failed)} failed", extra=context(guild_id=guild_id))
+    # Songs played or queued by others while later queries loaded shift the positions
+    index = {id(entry): i for i, entry in enumerate(audio_mgr.music_queues.get(guild_id, []))}
+    positions = [index[id(entry)] + 1 if id(entry) in index else None for entry in added]
+    return added, positions, failed
+
 def get_queue(guild_id):
     """Get current queue for a guild"""
     return audio_mgr.music_queues.get(guild_id, [])
@@ -198,6 +376,12 @@ def clear_queue(guild_id):
     """Clear the queue for a guild"""
     if guild_id in audio_mgr.music_queues:
         audio_mgr.music_queues[guild_id] = []
+    # A prefetched song must not start anymore
+    current = audio_mgr.current_youtube_players.get(guild_id)
+    if current is not None and current.chain is not None:
+        prefetched = current.chain.set_next(None)
+        if prefetched is not None:
+            prefetched.cleanup()
 
 def get_current_song_info(guild_id):
     """Get currently playing song with timing info"""
@@ -4,15 +4,21 @@ import logging
 from dotenv import load_dotenv
 import os
 
+from components.bot_logging import setup_logging
+
+load_dotenv()
+# Before the components are imported so everything they log goes through the queue
+setup_logging()
+log = logging.getLogger("main")
+
 # Import the component modules
 from components.bot_commands import setup_commands
 from components.bot_events import setup_events
+import components.metrics as metrics
 
 
-load_dotenv()
 token = os.getenv('DISCORD_TOKEN')
 
-handler = logging.FileHandler(filename='discord.log', encoding='utf-8', mode='w')
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
@@ -22,28 +28,33 @@ bot = commands.Bot(command_prefix="@@", intents=intents)
 
 @bot.event
 async def on_ready():
-    print(f'\nLogged in as {bot.user.name} - {bot.user.id}')
-    print(f'Connected to {len(bot.guilds)} server(s):')
+    log.info(f'Logged in as {bot.user.name} - {bot.user.id}')
+    log.info(f'Connected to {len(bot.guilds)} server(s):')
     for guild in bot.guilds:
-        print(f'  - {guild.name} (ID: {guild.id}) | Members: {guild.member_count}')
+        log.info(f'  - {guild.name} (ID: {guild.id}) | Members: {guild.member_count}')
     
-    print('-----------')
+    metrics.start_loop_monitor()
+    if os.getenv('METRICS_PORT'):
+        try:
+            await metrics.start_http_server(int(os.getenv('METRICS_PORT')))
+        except Exception as e:
+            log.error(f"Failed to start the metrics endpoint: {e}")
     activity = discord.Game("Ready to solve your np-hard problems | /help")
     await bot.change_presence(status=discord.Status.online, activity=activity)
 
     #bot app status
     import torch
-    print("cuda available:", torch.cuda.is_available())
-    print("cuDNN available:", torch.backends.cudnn.is_available())
+    log.info(f"cuda available: {torch.cuda.is_available()}")
+    log.info(f"cuDNN available: {torch.backends.cudnn.is_available()}")
     try:
         synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} slash commands.")
+        log.info(f"Synced {len(synced)} slash commands.")
     except Exception as e:
-        print(f"Failed to sync commands: {e}")
-    print("-----------\nLogs:\n")
+        log.error(f"Failed to sync commands: {e}")
 
 # Set up commands and events
 setup_commands(bot)
 setup_events(bot)
 
-bot.run(token, log_handler=handler, log_level=logging.DEBUG)
\ No newline at end of file
+# Logging is already set up, discord.py's records go through the same queue
+bot.run(token, log_handler=None)
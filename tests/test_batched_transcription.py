@@ -0,0 +1,71 @@
+"""transcribe_batch against the installed faster_whisper BatchedInferencePipeline.
+
+The pipeline's own transcribe() runs (clip_timestamps parsing, feature extraction,
+batching), only the whisper model is replaced: forward() returns one segment per clip
+whose text names the clip's start, so the test sees which audio every clip covered.
+"""
+import logging
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+faster_whisper = pytest.importorskip("faster_whisper")
+from faster_whisper.feature_extractor import FeatureExtractor
+
+from components.batched_transcription import SAMPLE_RATE, transcribe_batch
+
+
+class FakeWhisper:
+    """The attributes of WhisperModel the batched pipeline reads before decoding"""
+
+    def __init__(self):
+        self.logger = logging.getLogger("fake_whisper")
+        self.feature_extractor = FeatureExtractor()
+        self.hf_tokenizer = None
+        self.model = type("Model", (), {"is_multilingual": False, "n_mels": 80})()
+
+
+class ClipPipeline(faster_whisper.BatchedInferencePipeline):
+    def __init__(self):
+        super().__init__(model=FakeWhisper())
+        self.clips = []
+
+    def forward(self, features, tokenizer, chunks_metadata, options):
+        results = []
+        for chunk in chunks_metadata:
+            self.clips.append((chunk["offset"], chunk["duration"]))
+            results.append([dict(text=f" clip@{chunk['offset']:g}", start=chunk["offset"],
+                                 end=chunk["offset"] + chunk["duration"], tokens=[], avg_logprob=0.0,
+                                 no_speech_prob=0.0, compression_ratio=1.0, seek=0)])
+        return results
+
+
+def noise(seconds, seed=0):
+    return (np.random.default_rng(seed).standard_normal(int(seconds * SAMPLE_RATE)) * 0.1).astype(np.float32)
+
+
+def test_clips_are_passed_in_seconds():
+    pipeline = ClipPipeline()
+    texts = transcribe_batch(pipeline, [noise(1.5), noise(2.0, 1), noise(0.5, 2)], language="en", suppress_tokens=[])
+    assert pipeline.clips == [(0.0, 1.5), (1.5, 2.0), (3.5, 0.5)]
+    assert texts == ["clip@0", "clip@1.5", "clip@3.5"]
+
+
+def test_long_utterance_is_split_into_whisper_windows():
+    pipeline = ClipPipeline()
+    texts = transcribe_batch(pipeline, [noise(1.0), noise(45.0, 1)], language="en", suppress_tokens=[])
+    assert pipeline.clips == [(0.0, 1.0), (1.0, 30.0), (31.0, 15.0)]
+    assert texts == ["clip@0", "clip@1 clip@31"]
+
+
+def test_vad_filter_drops_utterances_without_speech():
+    pipeline = ClipPipeline()
+    silence = np.zeros(2 * SAMPLE_RATE, np.float32)
+    texts = transcribe_batch(pipeline, [silence, silence], language="en", suppress_tokens=[],
+                             vad_filter=True, vad_parameters={"threshold": 0.6, "min_speech_duration_ms": 250})
+    assert pipeline.clips == []
+    assert texts == ["", ""]
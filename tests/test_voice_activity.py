@@ -0,0 +1,55 @@
+"""VoiceActivityGate on synthetic 20 ms Discord frames (48 kHz stereo int16)."""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from components.voice_activity import MIN_SPEECH_FRAMES, VoiceActivityGate
+
+SAMPLES_PER_FRAME = 960
+
+
+def frame(amplitude, index=0):
+    """One stereo frame of a 220 Hz tone, continuous across frame indices"""
+    t = (np.arange(SAMPLES_PER_FRAME) + index * SAMPLES_PER_FRAME) / 48000
+    mono = (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+    return np.repeat(mono, 2).tobytes()
+
+
+def feed(gate, frames):
+    kept = []
+    for pcm in frames:
+        kept.extend(gate.process(pcm))
+    return kept
+
+
+def test_speech_from_first_frame_is_kept():
+    gate = VoiceActivityGate()
+    speech = [frame(3000, i) for i in range(50)]
+
+    kept = feed(gate, speech[:MIN_SPEECH_FRAMES])
+    assert kept == speech[:MIN_SPEECH_FRAMES]
+
+    kept += feed(gate, speech[MIN_SPEECH_FRAMES:])
+    assert kept == speech
+    assert gate.speech_starts == 1
+
+
+def test_quiet_noise_is_dropped():
+    rng = np.random.default_rng(0)
+    noise = [rng.normal(0, 60, SAMPLES_PER_FRAME * 2).astype(np.int16).tobytes() for _ in range(100)]
+    gate = VoiceActivityGate()
+    assert feed(gate, noise) == []
+    assert gate.speech_starts == 0
+
+
+def test_speech_after_noise_keeps_pre_roll():
+    rng = np.random.default_rng(1)
+    noise = [rng.normal(0, 60, SAMPLES_PER_FRAME * 2).astype(np.int16).tobytes() for _ in range(50)]
+    speech = [frame(3000, i) for i in range(20)]
+    gate = VoiceActivityGate()
+    kept = feed(gate, noise + speech)
+    assert kept[-len(speech):] == speech
+    assert gate.speech_starts == 1